@@ -0,0 +1,157 @@
+"""
+Benchmark of building travels table from a 635k-agent, ~2M-travel day:
+previous path (per-agent list cells collected by mesa DataCollector,
+filtered by `astype(str) != '[]'` and flattened by `utils.explode` with
+DataFrame.append + sort_index, both removed since) against
+TripLog.to_dataframe, which needs no list cells at all.
+
+Run from the repository root:
+    python -m benchmarks.benchmark_explode
+"""
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.trip_log import TripLog
+from src.vocabulary import Vocabularies
+
+
+NUM_AGENTS = 635701
+MEAN_TRAVELS = 3.2
+NUM_REGIONS = 375
+NUM_PLACE_TYPES = 17
+
+TRAVELS_COLUMNS = [
+    'start_region', 'start_place_type', 'dest_region',
+    'dest_place_type', 'travel_start_time', 'dest_activity_dur_time',
+    'transport_mode', 'is_driver'
+]
+
+
+def previous_explode(df, lst_cols, fill_value='', preserve_index=False):
+    # removed utils.explode (needs DataFrame.append, removed in pandas 2)
+    if (lst_cols is not None
+        and len(lst_cols) > 0
+        and not isinstance(lst_cols, (list, tuple, np.ndarray, pd.Series))):
+        lst_cols = [lst_cols]
+    idx_cols = df.columns.difference(lst_cols)
+    lens = df[lst_cols[0]].str.len()
+    idx = np.repeat(df.index.values, lens)
+    res = (pd.DataFrame({
+                col:np.repeat(df[col].values, lens)
+                for col in idx_cols},
+                index=idx)
+             .assign(**{col:np.concatenate(df.loc[lens>0, col].values)
+                            for col in lst_cols}))
+    if (lens == 0).any():
+        res = (res.append(df.loc[lens==0, idx_cols], sort=False)
+                  .fillna(fill_value))
+    res = res.sort_index()
+    if not preserve_index:
+        res = res.reset_index(drop=True)
+    return res
+
+
+def get_travels(rng):
+    lens = rng.poisson(MEAN_TRAVELS, NUM_AGENTS)
+    num_travels = int(lens.sum())
+
+    travels = {
+        'agent_id': np.repeat(np.arange(NUM_AGENTS), lens),
+        'start_region': rng.integers(0, NUM_REGIONS, num_travels),
+        'start_place_type': rng.integers(0, NUM_PLACE_TYPES, num_travels),
+        'dest_region': rng.integers(0, NUM_REGIONS, num_travels),
+        'dest_place_type': rng.integers(0, NUM_PLACE_TYPES, num_travels),
+        'travel_start_time': rng.uniform(240, 1440, num_travels),
+        'dest_activity_dur_time': rng.uniform(0, 600, num_travels),
+        'transport_mode': rng.integers(0, 4, num_travels),
+    }
+    travels['is_driver'] = np.where(
+        travels['transport_mode'] == 0,
+        rng.choice(np.array(['0', '1'], dtype=object), num_travels),
+        None
+    )
+
+    return lens, travels
+
+
+def get_list_cells_table(lens, travels):
+    # per-agent lists, as collected by mesa DataCollector
+    offsets = np.concatenate([[0], np.cumsum(lens)])
+    table = {'agent_id': np.arange(NUM_AGENTS)}
+    for column in TRAVELS_COLUMNS:
+        values = travels[column].tolist()
+        table[column] = [
+            values[start:end]
+            for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ]
+
+    return pd.DataFrame(table)
+
+
+def get_trip_log(travels):
+    vocabularies = Vocabularies(regions=[str(i) for i in range(NUM_REGIONS)])
+    for place_type in range(NUM_PLACE_TYPES):
+        vocabularies.place_type.add('place_' + str(place_type))
+
+    trip_log = TripLog(vocabularies, capacity=len(travels['agent_id']))
+    rows = trip_log.extend({
+        column: values for column, values in travels.items()
+        if column not in ['transport_mode', 'is_driver']
+    })
+    trip_log.set_transport_modes(
+        rows, travels['transport_mode'], travels['is_driver']
+    )
+
+    return trip_log
+
+
+def measure(description, function):
+    start = time.perf_counter()
+    result = function()
+    print(f'{description:45s} {time.perf_counter() - start:8.2f} s')
+
+    return result
+
+
+def main():
+    rng = np.random.default_rng(2137)
+    lens, travels = get_travels(rng)
+    print(f'{NUM_AGENTS} agents, {int(lens.sum())} travels, '
+          f'{int((lens == 0).sum())} agents without travels')
+
+    trip_log = get_trip_log(travels)
+    travels_results = measure(
+        'TripLog.to_dataframe', lambda: trip_log.to_dataframe()
+    )
+
+    if not hasattr(pd.DataFrame, 'append'):
+        print('previous path needs pandas < 2 (DataFrame.append)')
+        return
+
+    df = measure(
+        'previous: list cells table (mesa DataCollector)',
+        lambda: get_list_cells_table(lens, travels)
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        previous = measure(
+            'previous: astype(str) filter + explode',
+            lambda: previous_explode(
+                df[df['start_region'].astype(str) != '[]'],
+                TRAVELS_COLUMNS,
+                fill_value=''
+            )
+        )
+
+    # both paths give travels of agents in the same order
+    assert np.array_equal(
+        travels_results['agent_id'].to_numpy(),
+        previous['agent_id'].to_numpy()
+    )
+
+
+if __name__ == '__main__':
+    main()
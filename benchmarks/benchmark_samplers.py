@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of BaseSampler buffer refill: alias table sampling against
+previous `rng.choice(object_ids, size, p=probs)` refill path.
+
+Run from the repository root:
+    python -m benchmarks.benchmark_samplers
+"""
+import timeit
+
+import numpy as np
+from numpy.random import default_rng, MT19937
+
+from src.samplers import AliasTable
+
+
+def choice_refill(rng, object_ids, probs, num_samples):
+    return rng.choice(object_ids, size=num_samples, p=probs)
+
+
+def alias_refill(rng, object_ids, alias_table, num_samples):
+    return object_ids[alias_table.sample(rng, num_samples)]
+
+
+def main():
+    rng = default_rng(MT19937(2137))
+
+    cases = [
+        # (description, number of objects, buffer size)
+        ('GravitySampler (375 regions, buffer 10)', 375, 10),
+        ('AgeSexSampler (13 groups, buffer 32)', 13, 32),
+        ('TransportModeInputsSampler (13 values, buffer 52975)', 13, 52975),
+        ('RegionSampler (375 regions, buffer 635701)', 375, 635701),
+    ]
+
+    for description, num_objects, num_samples in cases:
+        object_ids = np.array([str(i) for i in range(1, num_objects + 1)])
+        probs = rng.random(num_objects)
+        probs = probs / probs.sum()
+        alias_table = AliasTable(probs)
+
+        number = max(1, 200000 // num_samples)
+
+        choice_time = min(timeit.repeat(
+            lambda: choice_refill(rng, object_ids, probs, num_samples),
+            number=number,
+            repeat=5
+        )) / number
+        alias_time = min(timeit.repeat(
+            lambda: alias_refill(rng, object_ids, alias_table, num_samples),
+            number=number,
+            repeat=5
+        )) / number
+        build_time = min(timeit.repeat(
+            lambda: AliasTable(probs),
+            number=10,
+            repeat=3
+        )) / 10
+
+        print(description)
+        print(f'    rng.choice refill: {choice_time * 1e6:12.2f} us')
+        print(f'    alias refill:      {alias_time * 1e6:12.2f} us'
+              f'  (x{choice_time / alias_time:.2f})')
+        print(f'    alias table build: {build_time * 1e6:12.2f} us (once)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+from src.summaries import save_summaries
+
+
+def main():
+    results_path = sys.argv[1]
+    assert type(results_path) == str
+    assert len(results_path) > 0
+    assert os.path.exists(results_path)
+
+    summary_path = sys.argv[2]
+    assert type(summary_path) == str
+    assert len(summary_path) > 0
+
+    num_processes = int(sys.argv[3])
+    assert num_processes > 0
+
+    # replicates are streamed one by one into running means, variances and
+    # quantiles, so memory use does not depend on number of replicates
+    scenarios = save_summaries(
+        results_path=results_path,
+        summary_path=summary_path,
+        num_processes=num_processes
+    )
+    print(
+        'Summarized ' + str(len(scenarios)) + ' scenarios in ' + summary_path
+    )
+
+
+if __name__ == '__main__':
+    main()
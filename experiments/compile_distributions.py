@@ -0,0 +1,24 @@
+import os
+import sys
+
+from src.bundle import compile_bundle, load_bundle
+
+
+def main():
+    in_dir_path = sys.argv[1]
+    assert type(in_dir_path) == str
+    assert len(in_dir_path) > 0
+    in_dir_path = in_dir_path.rstrip('/')
+    assert os.path.exists(in_dir_path)
+
+    # validates distributions and writes them (with interregional
+    # distances and decision tree) into one binary bundle
+    bundle_path = compile_bundle(in_dir_path)
+
+    for name, value in load_bundle(bundle_path).items():
+        print(name + ': ' + type(value).__name__)
+    print('Compiled ' + bundle_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,9 @@ import shutil
 import sys
 from typing import List
 
+from scenario_utils import get_output_folder_postfix
+from src.job_queue import JobQueue
+
 
 def prepare_scenarios(
     distributions: List[str],
@@ -21,21 +24,27 @@ def prepare_scenarios(
     return all_combinations
 
 
-def chunkIt(seq, num):
-    avg = len(seq) / float(num)
-    out = []
-    last = 0.0
-
-    while last < len(seq):
-        out.append(seq[int(last):int(last + avg)])
-        last += avg
-
-    while len(out) > num:
-        la = out.pop(-1)
-        for el in la:
-            out[-1].append(el)
+def add_jobs(
+    queue_path: str,
+    scenarios: List,
+    num_simulations: int
+) -> int:
+    """
+    Adds (scenario, replicate) jobs of all scenarios to JobQueue. Job's
+    scenario is postfix of scenario folders (and key of its seeds, as in
+    run_simulations.py) and its payload is scenario's list of
+    [dist_name-up/down, value].
+    """
+
+    queue = JobQueue(queue_path)
+    num_added = queue.add_jobs(
+        (get_output_folder_postfix(scenario), i+1, scenario)
+        for scenario in scenarios
+        for i in range(num_simulations)
+    )
+    queue.close()
 
-    return out
+    return num_added
 
 
 if __name__ == '__main__':
@@ -60,9 +69,7 @@ if __name__ == '__main__':
         map(float, values_of_change.strip('[]').split(','))
     )
 
-    services_number = int(sys.argv[3])
-
-    output_dir = sys.argv[4]
+    output_dir = sys.argv[3]
     assert type(output_dir) == str
     assert len(output_dir) > 0
     if not output_dir.endswith('/'):
@@ -73,13 +80,24 @@ if __name__ == '__main__':
         shutil.rmtree(output_dir)
         os.makedirs(output_dir)
 
+    queue_path = sys.argv[4]
+    assert type(queue_path) == str
+    assert len(queue_path) > 0
+    if os.path.dirname(queue_path):
+        os.makedirs(os.path.dirname(queue_path), exist_ok=True)
+
+    num_simulations = int(sys.argv[5])
+    assert num_simulations > 0
+
     scenarios = prepare_scenarios(
         distributions,
         values_of_change
     )
 
-    chunked_scenarios = chunkIt(scenarios, services_number)
+    with open(output_dir + 'scenarios.json', 'w') as f:
+        json.dump({'scenarios': scenarios}, f)
 
-    for i, scenarios_list in enumerate(chunked_scenarios):
-        with open(output_dir + 'scenarios_' + str(i+1) + '.json', 'w') as f:
-            json.dump({'scenarios': scenarios_list}, f)
+    # instead of static chunks of scenarios, workers lease jobs from
+    # the queue (see run_worker.py)
+    num_added = add_jobs(queue_path, scenarios, num_simulations)
+    print('Added ' + str(num_added) + ' jobs to ' + queue_path)
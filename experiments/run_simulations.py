@@ -1,49 +1,9 @@
 import ujson as json
 import os
 import sys
-from distutils.dir_util import copy_tree
-from typing import Dict
 
-from src.runners import run
-
-
-def change_dist(
-    dist: Dict[str, Dict[str, float]],
-    value: float
-):
-
-    if value != 0:
-
-        if value < 0:
-            value = abs(value)
-            reverse = False
-        else:
-            reverse = True
-
-        for dist_key in dist.keys():
-            d = dist[dist_key]
-            prev_key = None
-            for k in sorted(d.keys(), reverse=reverse):
-                if prev_key:
-                    change_value = value * d[k]
-                    d[prev_key] = d[prev_key] + change_value
-                    d[k] = d[k] - change_value
-                prev_key = k
-            dist[dist_key] = d
-
-    return dist
-
-
-def get_output_folder_postfix(scenario):
-    postfix = ''
-
-    for [dist, value] in scenario:
-        postfix += '_'
-        postfix += dist.split('/')[-1]
-        postfix += '_'
-        postfix += str(value).replace('.', '_')
-
-    return postfix
+from scenario_utils import get_output_folder_postfix
+from src.runners import run_scenarios
 
 
 def main():
@@ -85,50 +45,39 @@ def main():
     with open(scenarios_full_path, 'r') as f:
         scenarios = json.load(f)['scenarios']
 
-    for i, simulation_scenario in enumerate(scenarios):
+    # results of all scenarios are partitions of datasets in one folder
+    # (scenario=<postfix>, see save_parquet_results)
+    output_folder_path = results_path + scenarios_name
+    os.mkdir(output_folder_path)
 
-        new_distributions_path = input_data_folder_path + scenarios_name \
-            + '_' + str(i + 1)
-        copy_tree(
-            input_data_folder_path + 'base_distributions',
-            new_distributions_path
-        )
-
-        for [dist_name, value] in simulation_scenario:
-            if dist_name.endswith('-up'):
-                dist_name = dist_name.replace('-up', '')
-            elif dist_name.endswith('-down'):
-                value = -1 * value
-                dist_name = dist_name.replace('-down', '')
-            else:
-                raise Exception('No -up or -down in distribution name!')
-
-            dist_path = new_distributions_path + '/' + dist_name + '.json'
-
-            with open(dist_path, 'r') as f:
-                dist = json.load(f)
-            dist = change_dist(dist, value)
-            with open(dist_path, 'w') as f:
-                json.dump(dist, f)
-
-        output_folder_name = scenarios_name + '_' + str(i+1) \
-            + get_output_folder_postfix(simulation_scenario)
-        output_folder_path = results_path + output_folder_name
-        os.mkdir(output_folder_path)
-
-        print('Starts '+str(i+1)+' simulation...')
-        run(
-            in_dir_path=new_distributions_path,
-            out_dir_path=output_folder_path,
-            num_agents=population,
-            sim_start_time=4*60,
-            sim_step_time=60,
-            sim_end_time=24*60,
-            num_simulations=num_simulations,
-            num_processes=num_processes
-        )
-        print('Finished '+str(i+1)+' simulation.')
+    scenarios_jobs = []
+
+    for simulation_scenario in scenarios:
 
+        # scenario's distributions are derived in memory from base
+        # distributions, so they are not copied and rewritten on disk
+        scenarios_jobs.append((
+            # seeds are keyed by scenario content, not by its position in
+            # scenarios file
+            get_output_folder_postfix(simulation_scenario),
+            input_data_folder_path + 'base_distributions',
+            output_folder_path,
+            simulation_scenario
+        ))
+
+    # simulations of all scenarios share one pool of workers
+    print('Starts ' + str(len(scenarios_jobs)) + ' scenarios...')
+    run_scenarios(
+        scenarios=scenarios_jobs,
+        num_agents=population,
+        sim_start_time=4*60,
+        sim_step_time=60,
+        sim_end_time=24*60,
+        num_simulations=num_simulations,
+        num_processes=num_processes,
+        results_format='parquet'
+    )
+    print('Finished ' + str(len(scenarios_jobs)) + ' scenarios.')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
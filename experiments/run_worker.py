@@ -0,0 +1,77 @@
+import os
+import sys
+from functools import partial
+
+from scenario_utils import get_output_folder_postfix
+from src.job_queue import Job
+from src.runners import run_queue
+
+
+def prepare_job(
+    input_data_folder_path: str,
+    results_path: str,
+    job: Job
+):
+    # job's payload is list of [dist_name-up/down, value] applied in
+    # memory to base distributions, results of all scenarios are
+    # partitions of datasets in results folder (scenario=<job.scenario>,
+    # see save_parquet_results), named as in run_simulations.py
+    assert job.scenario == get_output_folder_postfix(job.payload)
+
+    return (
+        input_data_folder_path + 'base_distributions',
+        results_path,
+        job.payload
+    )
+
+
+def main():
+    queue_path = sys.argv[1]
+    assert type(queue_path) == str
+    assert os.path.exists(queue_path)
+
+    input_data_folder_path = sys.argv[2]
+    assert type(input_data_folder_path) == str
+    assert len(input_data_folder_path) > 0
+    if not input_data_folder_path.endswith('/'):
+        input_data_folder_path = input_data_folder_path + '/'
+    assert os.path.exists(input_data_folder_path)
+
+    results_path = sys.argv[3]
+    assert type(results_path) == str
+    assert len(results_path) > 0
+    if not results_path.endswith('/'):
+        results_path = results_path + '/'
+
+    population = int(sys.argv[4])
+    assert population > 0
+
+    num_processes = int(sys.argv[5])
+    assert num_processes > 0
+
+    # workers lease jobs until the queue is empty, so any number of
+    # containers can run this script with the same queue. Replicate r of
+    # all scenarios shares random numbers, so scenarios which change only
+    # transport mode inputs reuse population, schedules and trips cached
+    # in results folder by any container
+    run_queue(
+        queue_path=queue_path,
+        prepare_scenario=partial(
+            prepare_job, input_data_folder_path, results_path
+        ),
+        num_agents=population,
+        sim_start_time=4*60,
+        sim_step_time=60,
+        sim_end_time=24*60,
+        num_processes=num_processes,
+        engine='array',
+        agent_streams=True,
+        results_format='parquet',
+        common_random_numbers=True,
+        cache_dir=results_path + 'stage_cache'
+    )
+
+
+if __name__ == '__main__':
+    main()
+
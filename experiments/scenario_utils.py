@@ -0,0 +1,17 @@
+from typing import List
+
+
+# this module has no dependencies, so scripts which run outside of the
+# simulator image (e.g. prepare_scenarios.py) can import it
+
+
+def get_output_folder_postfix(scenario: List) -> str:
+    postfix = ''
+
+    for [dist, value] in scenario:
+        postfix += '_'
+        postfix += dist.split('/')[-1]
+        postfix += '_'
+        postfix += str(value).replace('.', '_')
+
+    return postfix
@@ -4,11 +4,13 @@ POPULATION=$3
 NUM_SIMULATIONS=$4
 NUM_PROCESSES=$5
 
-python3 ./experiments/prepare_scenarios.py [decision_tree/pub_trans_comfort_dist-up,decision_tree/pub_trans_punctuality_dist-up,decision_tree/household_cars_dist-down] [0.,0.05,0.1,0.15] $SERVICES_NUMBER ./experiments/scenarios
+# all (scenario, replicate) jobs go to one queue in results folder, which
+# is shared by all containers. JobQueue is imported from src package
+PYTHONPATH=. python3 ./experiments/prepare_scenarios.py [decision_tree/pub_trans_comfort_dist-up,decision_tree/pub_trans_punctuality_dist-up,decision_tree/household_cars_dist-down] [0.,0.05,0.1,0.15] ./experiments/scenarios $RESULTS_PATH/jobs.sqlite $NUM_SIMULATIONS
 
 docker build . -t mobility-simulator
 
 for i in $(seq 1 $SERVICES_NUMBER);
 do
-docker run --mount src=$RESULTS_PATH,target=/mobility-project/results,type=bind -d mobility-simulator python3 run_simulations.py /mobility-project/scenarios scenarios_$i /mobility-project/input_data /mobility-project/results $POPULATION $NUM_SIMULATIONS $NUM_PROCESSES;
+docker run --mount src=$RESULTS_PATH,target=/mobility-project/results,type=bind -d mobility-simulator python3 run_worker.py /mobility-project/results/jobs.sqlite /mobility-project/input_data /mobility-project/results $POPULATION $NUM_PROCESSES;
 done
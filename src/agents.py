@@ -1,11 +1,9 @@
-from typing import Dict
-
 from mesa import Agent
 
-from .classifiers import TranportModeDecisionTree
-from .samplers import (AgeSexSampler, DayScheduleSampler, DriverSampler,
-                       GravitySampler, RegionSampler,
-                       TransportModeInputsSampler)
+from .data_models import TransportModeInputs
+from .distances import DistanceMatrix
+from .samplers import DayScheduleSampler, GravitySampler
+from .vocabulary import HOME_PLACE_TYPE_CODE
 
 
 class Person(Agent):
@@ -14,35 +12,29 @@ class Person(Agent):
         self,
         unique_id,
         model,
-        home_region_sampler: RegionSampler,
-        age_sex_sampler: AgeSexSampler,
-        transport_mode_inputs_sampler: TransportModeInputsSampler,
+        home_region: int,
+        age_sex: int,
+        transport_mode_inputs: TransportModeInputs,
         day_schedule_sampler: DayScheduleSampler,
-        transport_mode_clf: TranportModeDecisionTree,
         gravity_sampler: GravitySampler,
-        driver_sampler: DriverSampler,
-        interregional_distances: Dict[str, Dict[str, float]],
+        interregional_distances: DistanceMatrix,
         start_time: int,
         step_time: int
     ):
         super().__init__(unique_id, model)
 
-        self.home_region = home_region_sampler()
-        self.age_sex = age_sex_sampler()
+        self.home_region = home_region
+        self.age_sex = age_sex
         self.schedule = day_schedule_sampler(self.age_sex)
-        self.transport_mode_inputs = transport_mode_inputs_sampler(
-            self.age_sex
-        )
+        self.transport_mode_inputs = transport_mode_inputs
 
-        self.transport_mode_clf = transport_mode_clf
         self.gravity_sampler = gravity_sampler
-        self.driver_sampler = driver_sampler
         self.interregional_distances = interregional_distances
 
         self.step_time = step_time
 
         self.current_region = self.home_region
-        self.current_place_type = 'dom'
+        self.current_place_type = HOME_PLACE_TYPE_CODE
         self.current_time = start_time
 
         # Additional fields for agent data collector
@@ -58,24 +50,25 @@ class Person(Agent):
         self.household_bicycles = self.transport_mode_inputs.household_bicycles
         self.travels_num = len(self.schedule)
 
-        # Additional fields for travels data collector
-        #  self.agent_id already exists
-        self.start_region = []
-        self.start_place_type = []
-        self.dest_region = []
-        self.dest_place_type = []
-        self.travel_start_time = []
-        self.dest_activity_dur_time = []
-        self.transport_mode = []
-        self.is_driver = []
-
     def step(self):
+        self.start_due_travels(time=self.current_time)
+
+        self.current_time += self.step_time
+
+    def start_due_travels(
+        self,
+        time: int
+    ):
         while self._should_start_new_travel(
-            time=self.current_time
+            time=time
         ):
             self._start_new_travel()
 
-        self.current_time += self.step_time
+    def get_next_travel_start_time(self):
+        if len(self.schedule) == 0:
+            return None
+
+        return self.schedule[0].travel_start_time
 
     def _should_start_new_travel(
         self,
@@ -86,7 +79,7 @@ class Person(Agent):
     def _start_new_travel(self):
         schedule_element = self.schedule.pop(0)
 
-        if schedule_element.dest_activity_type == 'dom':
+        if schedule_element.dest_activity_type == HOME_PLACE_TYPE_CODE:
             dest_region = self.home_region
         else:
             dest_region = self.gravity_sampler(
@@ -94,33 +87,28 @@ class Person(Agent):
                 dest_type=schedule_element.dest_activity_type
             )
 
-        distance = self.interregional_distances[
-            self.current_region
-        ][
-            dest_region
-        ]
-
-        travel_mode = self.transport_mode_clf(
-            self.transport_mode_inputs.get_input_vector(
-                distance=distance
-            )
+        distance = self.interregional_distances.get_distance(
+            start_region=self.current_region,
+            dest_region=dest_region
         )
 
-        is_driver = None
-        if travel_mode == 0:
-            is_driver = self.driver_sampler(
-                age_sex=self.age_sex
-            )
+        row = self.model.trip_log.append(
+            agent_id=self.unique_id,
+            start_region=self.current_region,
+            start_place_type=self.current_place_type,
+            dest_region=dest_region,
+            dest_place_type=schedule_element.dest_activity_type,
+            travel_start_time=schedule_element.travel_start_time,
+            dest_activity_dur_time=schedule_element.dest_activity_dur_time
+        )
 
-        # update fields for travels data collector
-        self.start_region.append(self.current_region)
-        self.start_place_type.append(self.current_place_type)
-        self.dest_region.append(dest_region)
-        self.dest_place_type.append(schedule_element.dest_activity_type)
-        self.travel_start_time.append(schedule_element.travel_start_time)
-        self.dest_activity_dur_time.append(schedule_element.dest_activity_dur_time)
-        self.transport_mode.append(travel_mode)
-        self.is_driver.append(is_driver)
+        # transport mode is chosen by the model for all travels started
+        # in current step at once (see TrafficModel.add_pending_travel)
+        self.model.add_pending_travel(
+            agent=self,
+            row=row,
+            distance=distance
+        )
 
         self.current_region = dest_region
         self.current_place_type = schedule_element.dest_activity_type
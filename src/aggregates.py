@@ -0,0 +1,178 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from .vocabulary import Vocabularies
+
+
+# transport modes predicted by TranportModeDecisionTree (0 - car,
+# 1 - public transport, 2 - walking, 3 - bicycle)
+NUM_TRANSPORT_MODES = 4
+
+MINUTES_PER_HOUR = 60
+
+
+def get_num_hours(
+    end_time: int
+) -> int:
+    """
+    Returns number of start hours of travels of simulation ending at
+    end_time minutes (travel can start at end_time, e.g. at midnight).
+    """
+
+    return end_time // MINUTES_PER_HOUR + 1
+
+
+class TripAggregates:
+    """
+    Streaming aggregates of performed travels: counts of travels by
+    (start region, destination region, transport mode, start hour) kept
+    in a dense NumPy tensor, which is updated with each batch of travels
+    (see add), so whole travels table does not have to be saved and
+    reloaded to get origin-destination matrices, mode shares by hour and
+    trip production of regions.
+    """
+
+    def __init__(
+        self,
+        vocabularies: Vocabularies,
+        end_time: int
+    ):
+        """
+        Constructs empty TripAggregates.
+
+        Parameters
+        ----------
+            vocabularies: Vocabularies
+                Vocabularies of model, used to decode regions (region
+                vocabulary must be complete, e.g. built from
+                DistanceMatrix.regions).
+            end_time: int
+                End time of simulation in minutes (travels start not later
+                than end_time).
+        """
+
+        self.vocabularies = vocabularies
+        self.num_hours = get_num_hours(end_time)
+
+        num_regions = len(vocabularies.region)
+        self.od_counts = np.zeros(
+            (num_regions, num_regions, NUM_TRANSPORT_MODES, self.num_hours),
+            dtype=np.int32
+        )
+
+    def add(
+        self,
+        start_region: np.ndarray,
+        dest_region: np.ndarray,
+        transport_mode: np.ndarray,
+        travel_start_time: np.ndarray
+    ):
+        """
+        Adds batch of travels (given as columns of region codes, transport
+        modes and start times in minutes) to counts.
+        """
+
+        hour = np.asarray(travel_start_time) // MINUTES_PER_HOUR
+        cells = np.ravel_multi_index(
+            (
+                np.asarray(start_region, dtype=np.int64),
+                np.asarray(dest_region, dtype=np.int64),
+                np.asarray(transport_mode, dtype=np.int64),
+                hour.astype(np.int64)
+            ),
+            self.od_counts.shape
+        )
+
+        # batches are much smaller than the tensor, so only touched cells
+        # are updated
+        cells, counts = np.unique(cells, return_counts=True)
+        self.od_counts.reshape(-1)[cells] += counts.astype(np.int32)
+
+    def merge(
+        self,
+        other: 'TripAggregates'
+    ) -> 'TripAggregates':
+        """
+        Adds counts of other aggregates (e.g. of another population shard
+        of the same simulation) and returns self.
+        """
+
+        assert self.od_counts.shape == other.od_counts.shape
+        self.od_counts += other.od_counts
+
+        return self
+
+    def _regions(
+        self,
+        codes: np.ndarray
+    ) -> pd.Categorical:
+        return self.vocabularies.region.to_categorical(codes)
+
+    def get_od_counts(self) -> pd.DataFrame:
+        """
+        Returns non-zero counts of travels by start_region, dest_region,
+        transport_mode and hour.
+        """
+
+        start_region, dest_region, transport_mode, hour = np.nonzero(
+            self.od_counts
+        )
+
+        return pd.DataFrame({
+            'start_region': self._regions(start_region),
+            'dest_region': self._regions(dest_region),
+            'transport_mode': transport_mode.astype(np.int8),
+            'hour': hour.astype(np.int8),
+            'count': self.od_counts[
+                start_region, dest_region, transport_mode, hour
+            ]
+        })
+
+    def get_mode_share(self) -> pd.DataFrame:
+        """
+        Returns counts and shares of transport modes in each hour (share
+        is NaN in hours without travels).
+        """
+
+        counts = self.od_counts.sum(axis=(0, 1), dtype=np.int64).T
+        totals = counts.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore'):
+            shares = counts / totals
+
+        hour, transport_mode = np.indices(counts.shape)
+
+        return pd.DataFrame({
+            'hour': hour.ravel().astype(np.int8),
+            'transport_mode': transport_mode.ravel().astype(np.int8),
+            'count': counts.ravel(),
+            'share': shares.ravel()
+        })
+
+    def get_production(self) -> pd.DataFrame:
+        """
+        Returns counts of travels starting in each region by transport
+        mode.
+        """
+
+        counts = self.od_counts.sum(axis=(1, 3), dtype=np.int64)
+        start_region, transport_mode = np.indices(counts.shape)
+
+        return pd.DataFrame({
+            'start_region': self._regions(start_region.ravel()),
+            'transport_mode': transport_mode.ravel().astype(np.int8),
+            'count': counts.ravel()
+        })
+
+    def get_results(self) -> Dict[str, pd.DataFrame]:
+        """
+        Returns all aggregates tables: od_counts, mode_share and
+        production.
+        """
+
+        return {
+            'od_counts': self.get_od_counts(),
+            'mode_share': self.get_mode_share(),
+            'production': self.get_production()
+        }
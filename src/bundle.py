@@ -0,0 +1,621 @@
+import os
+import struct
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+import ujson as json
+
+from src.classifiers import CompiledDecisionTree, load_decision_tree
+from src.distances import DistanceMatrix, load_distance_matrix
+
+
+BUNDLE_MAGIC = b'UMPBUNDL'
+# version of bundle layout, bundles of other versions are recompiled
+BUNDLE_VERSION = 1
+# arrays start at multiples of ALIGNMENT bytes of bundle file
+ALIGNMENT = 64
+
+# maximal difference between sum of distribution's probabilities and 1
+PROBS_SUM_TOLERANCE = 0.01
+
+DECISION_TREE_ARRAYS = [
+    'feature', 'threshold', 'children_left', 'children_right', 'leaf_class'
+]
+
+
+def load_json_distributions(
+    in_dir_path: str
+) -> Dict[str, Any]:
+    """
+    Loads distributions from json files of in_dir_path (see runners.run),
+    interregional distances and decision tree from its parent folder.
+
+    Returns
+    -------
+        distributions: Dict[str, Any]
+            Model parameters of distributions.
+    """
+
+    def flatten_dist(data,prev_keys=list(), sep="", lvl=0, max_level=1, normal=False):
+        if lvl == max_level:
+            # keys of nested levels are kept as tuples (e.g. (dest_type,
+            # start_region)), so they are not concatenated into strings
+            return [
+                (tuple(prev_keys) if len(prev_keys) > 1 else sep.join(prev_keys),
+                ((np.array(list(data.keys())), np.array(list(data.values())))) if not normal else data)
+            ]
+        return [
+            (flat_key, flay_val)
+            for key, value in data.items()
+            for flat_key, flay_val in flatten_dist(value, [*prev_keys, key], sep, lvl + 1, max_level, normal)
+        ]
+
+    def load_dist(name, in_dir='out'):
+        file_name = name if name.endswith('.json') else (name + '.json')
+        file_path = os.path.join(in_dir, file_name)
+
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+
+    # Demography distributions
+    data_dir = in_dir_path + '/demography/'
+
+    data_file = 'population_dist.json'
+    population_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=0)[0][1]
+
+    data_file = 'demography_dist.json'
+    demography_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=0)[0][1]
+
+    # Decision tree distributions
+    data_dir = in_dir_path + '/decision_tree/'
+
+    data_file = 'pub_trans_comfort_dist.json'
+    pub_trans_comfort_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'pub_trans_punctuality_dist.json'
+    pub_trans_punctuality_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'bicycle_infrastr_comfort_dist.json'
+    bicycle_infrastr_comfort_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'pedestrian_inconvenience_dist.json'
+    pedestrian_inconvenience_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'household_persons_dist.json'
+    household_persons_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'household_cars_dist.json'
+    household_cars_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'household_bicycles_dist.json'
+    household_bicycles_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    # Travel planning distributions
+    data_dir = in_dir_path + '/travel_planning/'
+
+    data_file = 'any_travel_dist.json'
+    any_travel_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'travel_chains_dist.json'
+    travel_chains_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'start_hour_dist.json'
+    start_hour_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'other_travels_dist.json'
+    other_travels_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    data_file = 'spend_time_dist_params.json'
+    spend_time_dist_params = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=2, normal=True)
+
+    data_file = 'trip_cancel_prob.json'
+    trip_cancel_prob = load_dist(name=data_file, in_dir=data_dir)
+
+    data_file = 'gravity_dist.json'
+    gravity_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=2)
+
+    data_file = 'drivers_dist.json'
+    drivers_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+
+    # Interregional distances and decision tree classifier
+    data_dir = _get_data_dir(in_dir_path)
+
+    # interregional distances (compiled to memory mapped
+    # interregional_distances.npy on first use)
+    data_file = 'interregional_distances.json'
+    data_path = os.path.join(data_dir, data_file)
+    interregional_distances = load_distance_matrix(data_path)
+
+    # decision tree (compiled to decision_tree.npz on first use)
+    data_file = 'decision_tree.pickle'
+    data_path = os.path.join(data_dir, data_file)
+    decision_tree = load_decision_tree(data_path)
+
+    return {
+        'population_dist': population_dist,
+        'demography_dist': demography_dist,
+        'pub_trans_comfort_dist': pub_trans_comfort_dist,
+        'pub_trans_punctuality_dist': pub_trans_punctuality_dist,
+        'bicycle_infrastr_comfort_dist': bicycle_infrastr_comfort_dist,
+        'pedestrian_inconvenience_dist': pedestrian_inconvenience_dist,
+        'household_persons_dist': household_persons_dist,
+        'household_cars_dist': household_cars_dist,
+        'household_bicycles_dist': household_bicycles_dist,
+        'any_travel_dist': any_travel_dist,
+        'travel_chains_dist': travel_chains_dist,
+        'start_hour_dist': start_hour_dist,
+        'other_travels_dist': other_travels_dist,
+        'spend_time_dist_params': spend_time_dist_params,
+        'trip_cancel_prob': trip_cancel_prob,
+        'decision_tree': decision_tree,
+        'gravity_dist': gravity_dist,
+        'drivers_dist': drivers_dist,
+        'interregional_distances': interregional_distances,
+    }
+
+
+def _get_data_dir(
+    in_dir_path: str
+) -> str:
+    return in_dir_path.replace(in_dir_path.split('/')[-1], '')
+
+
+def _is_dist(value: Any) -> bool:
+    return isinstance(value, tuple) and len(value) == 2 \
+        and isinstance(value[0], np.ndarray)
+
+
+def _check_probs(
+    name: str,
+    keys: List[Any],
+    probs: np.ndarray,
+    offsets: np.ndarray
+):
+    errors = []
+    labels = [name if key is None else f'{name}[{key}]' for key in keys]
+
+    sizes = np.diff(offsets)
+    for i in np.flatnonzero(sizes == 0):
+        errors.append(f'{labels[i]}: empty distribution')
+
+    for i in np.unique(np.searchsorted(
+        offsets, np.flatnonzero(~np.isfinite(probs) | (probs < 0)),
+        side='right'
+    ) - 1):
+        errors.append(f'{labels[i]}: negative or not finite probability')
+
+    sums = np.bincount(
+        np.repeat(np.arange(len(keys)), sizes),
+        weights=probs,
+        minlength=len(keys)
+    )
+    sums[sizes == 0] = 1.
+    for i in np.flatnonzero(np.abs(sums - 1) > PROBS_SUM_TOLERANCE):
+        errors.append(
+            f'{labels[i]}: probabilities sum to {sums[i]}, not 1'
+        )
+
+    if errors:
+        raise ValueError(
+            'Invalid distributions:\n' + '\n'.join(errors[:20])
+            + ('\n...' if len(errors) > 20 else '')
+        )
+
+
+def validate_distributions(
+    distributions: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Checks that probabilities of each distribution are finite,
+    non-negative and sum to 1 (within PROBS_SUM_TOLERANCE), that trip
+    cancel probabilities are in [0, 1] and spend time scales are
+    non-negative.
+
+    Returns
+    -------
+        distributions: Dict[str, Any]
+            Copy of distributions with probabilities (as float64)
+            normalized to sum exactly to 1.
+
+    Raises
+    ------
+        ValueError
+            With list of invalid distributions.
+    """
+
+    validated = {}
+
+    for name, value in distributions.items():
+        if _is_dist(value):
+            object_ids, probs = value
+            probs = np.asarray(probs, dtype=np.float64)
+            _check_probs(name, [None], probs, np.array([0, len(probs)]))
+            validated[name] = (object_ids, probs / probs.sum())
+
+        elif isinstance(value, list) and value and _is_dist(value[0][1]):
+            keys = [key for key, _ in value]
+            probs = [np.asarray(p, dtype=np.float64) for _, (_, p) in value]
+            offsets = np.concatenate(
+                [[0], np.cumsum([len(p) for p in probs])]
+            )
+            _check_probs(name, keys, np.concatenate(probs), offsets)
+            validated[name] = [
+                (key, (object_ids, p / p.sum()))
+                for (key, (object_ids, _)), p in zip(value, probs)
+            ]
+
+        elif name == 'trip_cancel_prob':
+            invalid = [
+                key for key, prob in value.items() if not 0 <= prob <= 1
+            ]
+            if invalid:
+                raise ValueError(
+                    f'Invalid distributions:\n{name}{invalid}: '
+                    'probabilities not in [0, 1]'
+                )
+            validated[name] = value
+
+        elif name == 'spend_time_dist_params':
+            invalid = [key for key, params in value if params['scale'] < 0]
+            if invalid:
+                raise ValueError(
+                    f'Invalid distributions:\n{name}{invalid}: '
+                    'negative scale'
+                )
+            validated[name] = value
+
+        else:
+            validated[name] = value
+
+    return validated
+
+
+class _BundleWriter:
+    # collects arrays and their places in bundle file
+
+    def __init__(self):
+        self.arrays: List[np.ndarray] = []
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.size = 0
+
+    def add(
+        self,
+        name: str,
+        array: np.ndarray
+    ) -> str:
+        array = np.ascontiguousarray(array)
+        self.size = -(-self.size // ALIGNMENT) * ALIGNMENT
+        self.entries[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': self.size
+        }
+        self.arrays.append(array)
+        self.size += array.nbytes
+
+        return name
+
+    def write(
+        self,
+        path: str,
+        header: Dict[str, Any]
+    ):
+        header = json.dumps({**header, 'arrays': self.entries}).encode()
+        data_offset = -(
+            -(len(BUNDLE_MAGIC) + 8 + len(header)) // ALIGNMENT
+        ) * ALIGNMENT
+
+        with open(path, 'wb') as f:
+            f.write(BUNDLE_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for array, entry in zip(self.arrays, self.entries.values()):
+                f.write(b'\0' * (data_offset + entry['offset'] - f.tell()))
+                f.write(array.tobytes())
+
+
+def _encode_key(key: Any) -> Any:
+    return list(key) if isinstance(key, tuple) else key
+
+
+def _decode_key(key: Any) -> Any:
+    return tuple(key) if isinstance(key, list) else key
+
+
+def save_bundle(
+    distributions: Dict[str, Any],
+    path: str
+):
+    """
+    Saves distributions (see load_json_distributions) into one binary
+    bundle file: a json header (vocabularies of keys and object ids,
+    places of arrays) followed by aligned raw arrays, so they can be
+    memory mapped. Distributions with many keys are stored as one array
+    of object id codes and one of probabilities with offsets of keys.
+    """
+
+    writer = _BundleWriter()
+    header = {'version': BUNDLE_VERSION, 'distributions': {}}
+
+    for name, value in distributions.items():
+        if hasattr(value, 'tree_'):
+            # fitted sklearn DecisionTreeClassifier
+            value = CompiledDecisionTree.from_sklearn(value)
+
+        if _is_dist(value):
+            object_ids, probs = value
+            entry = {
+                'kind': 'dist',
+                'object_ids': np.asarray(object_ids).tolist(),
+                'probs': writer.add(name + '/probs', probs)
+            }
+
+        elif isinstance(value, list) and value and _is_dist(value[0][1]):
+            vocabulary = {}
+            codes = [
+                np.fromiter(
+                    (
+                        vocabulary.setdefault(object_id, len(vocabulary))
+                        for object_id in object_ids.tolist()
+                    ),
+                    dtype=np.int32
+                )
+                for _, (object_ids, _) in value
+            ]
+            entry = {
+                'kind': 'dists',
+                'keys': [_encode_key(key) for key, _ in value],
+                'object_ids': list(vocabulary),
+                'offsets': writer.add(
+                    name + '/offsets',
+                    np.concatenate([[0], np.cumsum([len(c) for c in codes])])
+                ),
+                'codes': writer.add(name + '/codes', np.concatenate(codes)),
+                'probs': writer.add(
+                    name + '/probs',
+                    np.concatenate([probs for _, (_, probs) in value])
+                )
+            }
+
+        elif isinstance(value, DistanceMatrix):
+            entry = {
+                'kind': 'distance_matrix',
+                'regions': value.regions.tolist(),
+                'matrix': writer.add(name + '/matrix', value.matrix)
+            }
+
+        elif isinstance(value, CompiledDecisionTree):
+            entry = {
+                'kind': 'decision_tree',
+                'arrays': {
+                    array_name: writer.add(
+                        name + '/' + array_name, getattr(value, array_name)
+                    )
+                    for array_name in DECISION_TREE_ARRAYS
+                }
+            }
+
+        else:
+            # small distributions (e.g. spend_time_dist_params,
+            # trip_cancel_prob) are kept in header
+            entry = {
+                'kind': 'json',
+                'value': [
+                    [_encode_key(key), params] for key, params in value
+                ] if isinstance(value, list) else value
+            }
+
+        header['distributions'][name] = entry
+
+    # written under unique temporary name and renamed, so processes (also
+    # in other containers, whose PIDs may be equal) loading or compiling
+    # the bundle at the same time never read or write a partial file
+    fd, tmp_path = tempfile.mkstemp(
+        suffix='.tmp',
+        prefix=os.path.basename(path) + '.',
+        dir=os.path.dirname(os.path.abspath(path))
+    )
+    try:
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        writer.write(tmp_path, header)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_bundle(
+    path: str
+) -> Dict[str, Any]:
+    """
+    Loads distributions saved by save_bundle. Arrays are views of the
+    memory mapped bundle file, so all processes share one page-cached
+    copy.
+
+    Raises
+    ------
+        ValueError
+            If file is not a bundle or bundle version is not
+            BUNDLE_VERSION.
+    """
+
+    with open(path, 'rb') as f:
+        magic = f.read(len(BUNDLE_MAGIC))
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(path + ' is not a distributions bundle')
+        header_size, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size))
+
+    if header['version'] != BUNDLE_VERSION:
+        raise ValueError(
+            f'{path} has bundle version {header["version"]}, '
+            f'expected {BUNDLE_VERSION}'
+        )
+
+    data_offset = -(
+        -(len(BUNDLE_MAGIC) + 8 + header_size) // ALIGNMENT
+    ) * ALIGNMENT
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+    def get_array(name):
+        entry = header['arrays'][name]
+        return np.ndarray(
+            shape=tuple(entry['shape']),
+            dtype=np.dtype(entry['dtype']),
+            buffer=buffer,
+            offset=data_offset + entry['offset']
+        )
+
+    distributions = {}
+
+    for name, entry in header['distributions'].items():
+        kind = entry['kind']
+
+        if kind == 'dist':
+            value = (
+                np.array(entry['object_ids']),
+                get_array(entry['probs'])
+            )
+
+        elif kind == 'dists':
+            object_ids = np.array(entry['object_ids'])
+            offsets = get_array(entry['offsets']).tolist()
+            codes = get_array(entry['codes'])
+            probs = get_array(entry['probs'])
+
+            # keys usually have the same object ids (e.g. all regions of
+            # gravity_dist), so they share one decoded array
+            decoded_object_ids = {}
+
+            def decode_object_ids(key_codes):
+                codes_bytes = key_codes.tobytes()
+                if codes_bytes not in decoded_object_ids:
+                    decoded_object_ids[codes_bytes] = object_ids[key_codes]
+                return decoded_object_ids[codes_bytes]
+
+            value = [
+                (
+                    _decode_key(key),
+                    (decode_object_ids(codes[start:end]), probs[start:end])
+                )
+                for key, start, end in zip(
+                    entry['keys'], offsets[:-1], offsets[1:]
+                )
+            ]
+
+        elif kind == 'distance_matrix':
+            matrix_entry = header['arrays'][entry['matrix']]
+            # separate memmap, so DistanceMatrix is pickled as its place
+            # in bundle file
+            value = DistanceMatrix(
+                regions=entry['regions'],
+                matrix=np.memmap(
+                    path,
+                    dtype=np.dtype(matrix_entry['dtype']),
+                    mode='r',
+                    offset=data_offset + matrix_entry['offset'],
+                    shape=tuple(matrix_entry['shape'])
+                )
+            )
+
+        elif kind == 'decision_tree':
+            value = CompiledDecisionTree(**{
+                array_name: get_array(array)
+                for array_name, array in entry['arrays'].items()
+            })
+
+        else:
+            value = entry['value']
+            if isinstance(value, list):
+                value = [(_decode_key(key), params) for key, params in value]
+
+        distributions[name] = value
+
+    return distributions
+
+
+def get_bundle_path(
+    in_dir_path: str
+) -> str:
+    """
+    Returns path of bundle of in_dir_path (e.g. base_distributions ->
+    base_distributions.bundle).
+    """
+
+    return os.path.normpath(in_dir_path) + '.bundle'
+
+
+def _get_source_paths(
+    in_dir_path: str
+) -> List[str]:
+    data_dir = _get_data_dir(in_dir_path)
+    paths = [
+        os.path.join(data_dir, 'interregional_distances.json'),
+        os.path.join(data_dir, 'decision_tree.pickle')
+    ]
+    for dir_path, _, file_names in os.walk(in_dir_path):
+        paths.extend(
+            os.path.join(dir_path, file_name) for file_name in file_names
+            if file_name.endswith('.json')
+        )
+
+    return [path for path in paths if os.path.exists(path)]
+
+
+def compile_bundle(
+    in_dir_path: str
+) -> str:
+    """
+    Loads json distributions of in_dir_path, validates and normalizes
+    them (see validate_distributions) and saves them into bundle next to
+    in_dir_path (see get_bundle_path).
+
+    Returns
+    -------
+        bundle_path: str
+    """
+
+    bundle_path = get_bundle_path(in_dir_path)
+    save_bundle(
+        validate_distributions(load_json_distributions(in_dir_path)),
+        bundle_path
+    )
+
+    return bundle_path
+
+
+def load_distributions(
+    in_dir_path: str
+) -> Dict[str, Any]:
+    """
+    Loads distributions of in_dir_path from its bundle. The bundle is
+    compiled only if it does not exist, has other version or is older
+    than any of json files (or decision tree and interregional distances)
+    it is compiled from.
+
+    Parameters
+    ----------
+        in_dir_path: str
+            Folder of distributions (see runners.run).
+
+    Returns
+    -------
+        distributions: Dict[str, Any]
+    """
+
+    bundle_path = get_bundle_path(in_dir_path)
+
+    if os.path.exists(bundle_path) and all(
+        os.path.getmtime(path) <= os.path.getmtime(bundle_path)
+        for path in _get_source_paths(in_dir_path)
+    ):
+        try:
+            return load_bundle(bundle_path)
+        except ValueError:
+            pass
+
+    return load_bundle(compile_bundle(in_dir_path))
+
@@ -1,5 +1,441 @@
+import os
+import pickle
+import tempfile
+from typing import TYPE_CHECKING, Union
+
 import numpy as np
-from sklearn.tree import DecisionTreeClassifier
+
+if TYPE_CHECKING:
+    from sklearn.tree import DecisionTreeClassifier
+
+
+class CompiledDecisionTree:
+    """
+    Fitted decision tree flattened into NumPy arrays. It gives the same
+    predictions as sklearn DecisionTreeClassifier.predict, but does not
+    need sklearn and all inputs are evaluated together, one tree level
+    at a time.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children_left: np.ndarray,
+        children_right: np.ndarray,
+        leaf_class: np.ndarray
+    ):
+        """
+        Constructs CompiledDecisionTree from tree nodes arrays.
+
+        Parameters
+        ----------
+            feature: np.ndarray
+                Feature index used for split in each node.
+            threshold: np.ndarray
+                Split threshold of each node (left child is chosen if
+                feature value <= threshold).
+            children_left: np.ndarray
+                Left child index of each node (-1 for leaves).
+            children_right: np.ndarray
+                Right child index of each node (-1 for leaves).
+            leaf_class: np.ndarray
+                Predicted class of each node.
+        """
+
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.leaf_class = leaf_class
+
+        # leaves point to themselves and always pass the split test, so
+        # traversal of all inputs can go on until none of them moves
+        is_leaf = children_left == -1
+        nodes = np.arange(len(feature))
+        self._next_left = np.where(is_leaf, nodes, children_left)
+        self._next_right = np.where(is_leaf, nodes, children_right)
+        self._split_feature = np.where(is_leaf, 0, feature)
+        self._split_threshold = np.where(is_leaf, np.inf, threshold)
+
+    @classmethod
+    def from_sklearn(
+        cls,
+        decision_tree: 'DecisionTreeClassifier'
+    ) -> 'CompiledDecisionTree':
+        """
+        Compiles fitted sklearn DecisionTreeClassifier.
+        """
+
+        tree = decision_tree.tree_
+
+        return cls(
+            feature=tree.feature.astype(np.int64),
+            threshold=tree.threshold.astype(np.float64),
+            children_left=tree.children_left.astype(np.int64),
+            children_right=tree.children_right.astype(np.int64),
+            leaf_class=np.asarray(decision_tree.classes_).take(
+                np.argmax(tree.value[:, 0, :], axis=1)
+            ).astype(np.int64)
+        )
+
+    def save(
+        self,
+        path: str
+    ):
+        """
+        Saves tree arrays to (uncompressed) .npz file.
+        """
+
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                feature=self.feature,
+                threshold=self.threshold,
+                children_left=self.children_left,
+                children_right=self.children_right,
+                leaf_class=self.leaf_class
+            )
+
+    @classmethod
+    def load(
+        cls,
+        path: str
+    ) -> 'CompiledDecisionTree':
+        """
+        Loads tree saved with save().
+        """
+
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def predict(
+        self,
+        inputs: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns predictions for (n_samples x n_features) inputs matrix.
+        """
+
+        # sklearn evaluates trees on float32 inputs
+        inputs = np.asarray(inputs, dtype=np.float32)
+        flat_inputs = inputs.ravel()
+        rows_offsets = np.arange(len(inputs)) * inputs.shape[1]
+        nodes = np.zeros(len(inputs), dtype=np.int64)
+
+        while True:
+            next_nodes = np.where(
+                flat_inputs[rows_offsets + self._split_feature[nodes]]
+                <= self._split_threshold[nodes],
+                self._next_left[nodes],
+                self._next_right[nodes]
+            )
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+
+        return self.leaf_class[nodes]
+
+
+def compile_decision_tree(
+    decision_tree_path: str
+) -> str:
+    """
+    Compiles pickled sklearn decision tree and saves it as .npz file next
+    to the pickle (e.g. decision_tree.pickle -> decision_tree.npz).
+
+    Parameters
+    ----------
+        decision_tree_path: str
+            Path to pickled DecisionTreeClassifier.
+
+    Returns
+    -------
+        compiled_path: str
+            Path to compiled tree.
+    """
+
+    with open(decision_tree_path, 'rb') as f:
+        decision_tree = pickle.load(f)
+
+    compiled_path = os.path.splitext(decision_tree_path)[0] + '.npz'
+
+    # written under unique temporary name and renamed, so processes (also
+    # in other containers, whose PIDs may be equal) loading or compiling
+    # the tree at the same time never read or write a partial file
+    fd, tmp_path = tempfile.mkstemp(
+        suffix='.tmp',
+        prefix=os.path.basename(compiled_path) + '.',
+        dir=os.path.dirname(os.path.abspath(compiled_path))
+    )
+    try:
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        CompiledDecisionTree.from_sklearn(decision_tree).save(tmp_path)
+        os.replace(tmp_path, compiled_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return compiled_path
+
+
+def load_decision_tree(
+    decision_tree_path: str
+) -> CompiledDecisionTree:
+    """
+    Loads compiled decision tree. The pickled tree is compiled (it needs
+    sklearn) only if there is no up to date .npz file next to it.
+
+    Parameters
+    ----------
+        decision_tree_path: str
+            Path to pickled DecisionTreeClassifier.
+
+    Returns
+    -------
+        decision_tree: CompiledDecisionTree
+    """
+
+    compiled_path = os.path.splitext(decision_tree_path)[0] + '.npz'
+
+    if not os.path.exists(compiled_path) or (
+        os.path.exists(decision_tree_path)
+        and os.path.getmtime(compiled_path)
+        < os.path.getmtime(decision_tree_path)
+    ):
+        compile_decision_tree(decision_tree_path)
+
+    return CompiledDecisionTree.load(compiled_path)
+
+
+class ModeChoiceCache:
+    """
+    Cache of transport mode choices for agents' input profiles. All inputs
+    except distance are fixed for agent's whole day, so for each distinct
+    profile the tree is reduced to sorted distance thresholds and modes
+    for intervals between them. Profiles with the same intervals and modes
+    share one row of modes per tree distance interval, so mode of a travel
+    is found with a single search on distance and a table lookup.
+    """
+
+    def __init__(
+        self,
+        decision_tree: CompiledDecisionTree,
+        distance_feature: int = 8
+    ):
+        """
+        Constructs empty ModeChoiceCache.
+
+        Parameters
+        ----------
+            decision_tree: CompiledDecisionTree
+                Transport mode classifier.
+            distance_feature: int
+                Index of distance in classifier inputs (the last one in
+                TransportModeInputs.get_input_vector() result).
+        """
+
+        self.decision_tree = decision_tree
+        self.distance_feature = distance_feature
+
+        # all distance thresholds of the tree split distance axis into
+        # intervals, thresholds of every profile are a subset of them
+        self.tree_thresholds = np.unique(
+            decision_tree.threshold[
+                (decision_tree.feature == distance_feature)
+                & (decision_tree.children_left != -1)
+            ]
+        )
+
+        self.profile_ids = {}
+        self.profile_rows = np.empty(0, dtype=np.int64)
+        self.rows_ids = {}
+        self.modes = np.empty(
+            (0, len(self.tree_thresholds) + 1), dtype=np.int64
+        )
+
+    def get_profile_ids(
+        self,
+        inputs: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns profile ids of given inputs. Intervals of new profiles are
+        computed for all of them at once.
+
+        Parameters
+        ----------
+            inputs: np.ndarray
+                (n x 8) matrix of classifier inputs without distance.
+
+        Returns
+        -------
+            profile_ids: np.ndarray
+        """
+
+        inputs = np.asarray(inputs, dtype=np.float64)
+        order = np.lexsort(inputs.T[::-1])
+        is_first = np.ones(len(inputs), dtype=bool)
+        is_first[1:] = np.any(np.diff(inputs[order], axis=0) != 0, axis=1)
+        unique_inputs = inputs[order[is_first]]
+        inverse = np.empty(len(inputs), dtype=np.int64)
+        inverse[order] = np.cumsum(is_first) - 1
+
+        new_profiles = [
+            profile for profile in map(tuple, unique_inputs)
+            if profile not in self.profile_ids
+        ]
+        if len(new_profiles) > 0:
+            self._add_profiles(np.array(new_profiles, dtype=np.float64))
+
+        unique_ids = np.array(
+            [self.profile_ids[profile] for profile in map(tuple, unique_inputs)],
+            dtype=np.int64
+        )
+
+        return unique_ids[inverse]
+
+    def _add_profiles(
+        self,
+        profiles: np.ndarray
+    ):
+        tree = self.decision_tree
+
+        # find distance thresholds of all nodes reachable for each profile
+        profiles_32 = profiles.astype(np.float32)
+        rows = np.arange(len(profiles))
+        nodes = np.zeros(len(profiles), dtype=np.int64)
+        threshold_rows = []
+        threshold_values = []
+
+        while len(rows) > 0:
+            is_split = tree.children_left[nodes] != -1
+            rows = rows[is_split]
+            nodes = nodes[is_split]
+
+            features = tree.feature[nodes]
+            is_distance = features == self.distance_feature
+            fixed = ~is_distance
+
+            threshold_rows.append(rows[is_distance])
+            threshold_values.append(tree.threshold[nodes[is_distance]])
+
+            go_left = profiles_32[
+                rows[fixed], features[fixed]
+            ] <= tree.threshold[nodes[fixed]]
+
+            distance_nodes = nodes[is_distance]
+            rows = np.concatenate([
+                rows[fixed], rows[is_distance], rows[is_distance]
+            ])
+            nodes = np.concatenate([
+                np.where(
+                    go_left,
+                    tree.children_left[nodes[fixed]],
+                    tree.children_right[nodes[fixed]]
+                ),
+                tree.children_left[distance_nodes],
+                tree.children_right[distance_nodes]
+            ])
+
+        threshold_rows = np.concatenate(threshold_rows)
+        threshold_ranks = np.searchsorted(
+            self.tree_thresholds, np.concatenate(threshold_values)
+        )
+        order = np.lexsort([threshold_ranks, threshold_rows])
+        threshold_rows = threshold_rows[order]
+        threshold_ranks = threshold_ranks[order]
+        is_unique = np.ones(len(order), dtype=bool)
+        is_unique[1:] = (np.diff(threshold_rows) != 0) \
+            | (np.diff(threshold_ranks) != 0)
+        threshold_rows = threshold_rows[is_unique]
+        threshold_ranks = threshold_ranks[is_unique]
+        counts = np.bincount(threshold_rows, minlength=len(profiles))
+
+        # every interval (t_prev, t] is represented by the largest float32
+        # value <= t (inputs are compared as float32 numbers), the last one
+        # (t_max, inf) by inf
+        threshold_values = self.tree_thresholds[threshold_ranks]
+        representatives = threshold_values.astype(np.float32)
+        rounded_up = representatives > threshold_values
+        representatives[rounded_up] = np.nextafter(
+            representatives[rounded_up], np.float32(-np.inf)
+        )
+        intervals_offsets = np.concatenate([[0], np.cumsum(counts + 1)])
+        intervals_distances = np.full(
+            intervals_offsets[-1], np.inf, dtype=np.float32
+        )
+        intervals_distances[
+            np.arange(len(threshold_rows)) + threshold_rows
+        ] = representatives
+
+        inputs = np.empty(
+            (len(intervals_distances), self.distance_feature + 1),
+            dtype=np.float32
+        )
+        inputs[:, :self.distance_feature] = profiles_32[
+            np.repeat(np.arange(len(profiles)), counts + 1)
+        ]
+        inputs[:, self.distance_feature] = intervals_distances
+        intervals_modes = tree.predict(inputs)
+
+        # profiles with the same thresholds and modes share row of modes
+        # for all tree distance intervals
+        thresholds_offsets = intervals_offsets - np.arange(len(profiles) + 1)
+        profile_rows = np.empty(len(profiles), dtype=np.int64)
+        new_rows = []
+        all_ranks = np.arange(len(self.tree_thresholds) + 1)
+
+        for i in range(len(profiles)):
+            ranks = threshold_ranks[
+                thresholds_offsets[i]:thresholds_offsets[i + 1]
+            ]
+            modes = intervals_modes[
+                intervals_offsets[i]:intervals_offsets[i + 1]
+            ]
+            key = ranks.tobytes() + modes.tobytes()
+
+            if key not in self.rows_ids:
+                self.rows_ids[key] = len(self.modes) + len(new_rows)
+                new_rows.append(
+                    modes[np.searchsorted(ranks, all_ranks)]
+                )
+            profile_rows[i] = self.rows_ids[key]
+
+        first_id = len(self.profile_rows)
+        self.profile_ids.update({
+            profile: first_id + i
+            for i, profile in enumerate(map(tuple, profiles))
+        })
+        self.profile_rows = np.concatenate([self.profile_rows, profile_rows])
+        if len(new_rows) > 0:
+            self.modes = np.concatenate([self.modes, np.stack(new_rows)])
+
+    def predict(
+        self,
+        profile_ids: np.ndarray,
+        distances: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns transport modes for travels of given profiles and distances.
+
+        Parameters
+        ----------
+            profile_ids: np.ndarray
+                Profile ids (see get_profile_ids) of travelling agents.
+            distances: np.ndarray
+                Travels distances.
+
+        Returns
+        -------
+            predictions: np.ndarray
+                Transport modes, the same as classifier predictions.
+        """
+
+        distances = np.asarray(distances, dtype=np.float32).astype(np.float64)
+        intervals = np.searchsorted(self.tree_thresholds, distances)
+
+        return self.modes[self.profile_rows[profile_ids], intervals]
 
 
 class TranportModeDecisionTree:
@@ -10,19 +446,20 @@ class TranportModeDecisionTree:
 
     def __init__(
         self,
-        decision_tree: DecisionTreeClassifier
+        decision_tree: Union['DecisionTreeClassifier', CompiledDecisionTree]
     ):
         """
         Constructs TranportModeDecisionTree.
 
         Parameters
         ----------
-            decision_tree: DecisionTreeClassifier
+            decision_tree: DecisionTreeClassifier or CompiledDecisionTree
                 Trained sklearn decision tree for transport mode
-                classification.
+                classification or its compiled version.
         """
 
         self.decision_tree = decision_tree
+        self.mode_choice_cache = None
 
     def __call__(
         self,
@@ -52,3 +489,81 @@ class TranportModeDecisionTree:
         predicition = self.decision_tree.predict([inputs])[0]
 
         return int(predicition)
+
+    def predict_batch(
+        self,
+        inputs: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns decision tree predicitions for many travels with a single
+        classifier call.
+
+        Parameters
+        ----------
+            inputs: np.ndarray
+                (n_travels x 9) inputs matrix, each row structured equal to
+                TransportModeInputs.get_input_vector() result.
+
+        Returns
+        -------
+            predictions: np.ndarray
+                Predictons of transport mode coded as int (see __call__).
+        """
+
+        if len(inputs) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        return self.decision_tree.predict(inputs).astype(np.int64)
+
+    def get_profile_ids(
+        self,
+        inputs: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns ids of agents' input profiles used by predict_profiles.
+
+        Parameters
+        ----------
+            inputs: np.ndarray
+                (n_agents x 8) inputs matrix structured equal to
+                TransportModeInputs.get_input_vector() result without
+                distance.
+
+        Returns
+        -------
+            profile_ids: np.ndarray
+        """
+
+        if self.mode_choice_cache is None:
+            decision_tree = self.decision_tree
+            if not isinstance(decision_tree, CompiledDecisionTree):
+                decision_tree = CompiledDecisionTree.from_sklearn(
+                    decision_tree
+                )
+            self.mode_choice_cache = ModeChoiceCache(decision_tree)
+
+        return self.mode_choice_cache.get_profile_ids(inputs)
+
+    def predict_profiles(
+        self,
+        profile_ids: np.ndarray,
+        distances: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns decision tree predicitions for travels of agents with given
+        input profiles (see ModeChoiceCache).
+
+        Parameters
+        ----------
+            profile_ids: np.ndarray
+                Input profiles ids returned by get_profile_ids.
+            distances: np.ndarray
+                Travels distances.
+
+        Returns
+        -------
+            predictions: np.ndarray
+                Predictons of transport mode coded as int (see __call__).
+        """
+
+        return self.mode_choice_cache.predict(profile_ids, distances)
@@ -1,13 +1,15 @@
 import pickle
-from typing import Dict
+from typing import Any, Dict
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 from pytest import fixture
 from shapely import wkt
 from sklearn.tree import DecisionTreeClassifier
 
 from .data_models import TransportModeInputs
+from .distances import DistanceMatrix
 
 
 @fixture(scope='session')
@@ -517,3 +519,95 @@ def drivers_dist() -> Dict[str, Dict[str, float]]:
             "1": 0
         }
     }
+
+
+
+def _to_dist_tuple(dist: Dict[str, float]):
+    return np.array(list(dist.keys())), np.array(list(dist.values()))
+
+
+def _to_dist_tuples(dists: Dict[str, Dict[str, float]]):
+    return [(key, _to_dist_tuple(dist)) for key, dist in dists.items()]
+
+
+@fixture(scope='session')
+def model_params(
+    region_prob_dist: Dict[str, float],
+    pub_trans_comfort_dist: Dict[str, Dict[str, float]],
+    pub_trans_punctuality_dist: Dict[str, Dict[str, float]],
+    bicycle_infrastr_comfort_dist: Dict[str, Dict[str, float]],
+    pedestrian_inconvenience_dist: Dict[str, Dict[str, float]],
+    household_persons_dist: Dict[str, Dict[str, float]],
+    household_cars_dist: Dict[str, Dict[str, float]],
+    household_bicycles_dist: Dict[str, Dict[str, float]],
+    any_travel_dist: Dict[str, Dict[str, float]],
+    travel_chains_dist: Dict[str, Dict[str, float]],
+    start_hour_dist: Dict[str, Dict[str, float]],
+    other_travels_dist: Dict[str, Dict[str, float]],
+    spend_time_dist_params: Dict[str, Dict[str, Dict[str, int]]],
+    trip_cancel_prob: Dict[str, float],
+    decision_tree: DecisionTreeClassifier,
+    drivers_dist: Dict[str, Dict[str, float]]
+) -> Dict[str, Any]:
+    """
+    TrafficModel parameters (in the form prepared by runners.run) for
+    small 3-region city.
+    """
+
+    regions = list(region_prob_dist.keys())
+    dest_types = [
+        'praca', 'culture_and_entertainment',
+        'gastronomy', 'grocery_shopping'
+    ]
+    gravity_dist = [
+        ((dest_type, start_region), _to_dist_tuple(
+            {region: 1 / len(regions) for region in regions}
+        ))
+        for dest_type in dest_types
+        for start_region in regions
+    ]
+    interregional_distances = DistanceMatrix.from_dict({
+        start_region: {
+            dest_region: 1500. * abs(int(start_region) - int(dest_region))
+            for dest_region in regions
+        }
+        for start_region in regions
+    })
+
+    return {
+        'N': 500,
+        'population_dist': _to_dist_tuple(region_prob_dist),
+        'demography_dist': _to_dist_tuple(
+            {"0-5": 0.2, "16-19_K": 0.4, "45-65_M": 0.4}
+        ),
+        'pub_trans_comfort_dist': _to_dist_tuples(pub_trans_comfort_dist),
+        'pub_trans_punctuality_dist': _to_dist_tuples(
+            pub_trans_punctuality_dist
+        ),
+        'bicycle_infrastr_comfort_dist': _to_dist_tuples(
+            bicycle_infrastr_comfort_dist
+        ),
+        'pedestrian_inconvenience_dist': _to_dist_tuples(
+            pedestrian_inconvenience_dist
+        ),
+        'household_persons_dist': _to_dist_tuples(household_persons_dist),
+        'household_cars_dist': _to_dist_tuples(household_cars_dist),
+        'household_bicycles_dist': _to_dist_tuples(household_bicycles_dist),
+        'any_travel_dist': _to_dist_tuples(any_travel_dist),
+        'travel_chains_dist': _to_dist_tuples(travel_chains_dist),
+        'start_hour_dist': _to_dist_tuples(start_hour_dist),
+        'other_travels_dist': _to_dist_tuples(other_travels_dist),
+        'spend_time_dist_params': [
+            ((age_sex, place_type), params)
+            for age_sex, place_types in spend_time_dist_params.items()
+            for place_type, params in place_types.items()
+        ],
+        'trip_cancel_prob': trip_cancel_prob,
+        'decision_tree': decision_tree,
+        'gravity_dist': gravity_dist,
+        'drivers_dist': _to_dist_tuples(drivers_dist),
+        'interregional_distances': interregional_distances,
+        'start_time': 4 * 60,
+        'step_time': 60,
+        'end_time': 24 * 60
+    }
@@ -3,6 +3,19 @@ from dataclasses import dataclass
 import numpy as np
 
 
+MISSING_INPUT = -1
+INPUT_VECTOR_FIELDS = [
+    'pub_trans_comfort',
+    'pub_trans_punctuality',
+    'bicycle_infrastr_comfort',
+    'pedestrian_inconvenience',
+    'household_persons',
+    'age',
+    'household_cars',
+    'household_bicycles'
+]
+
+
 @dataclass
 class TransportModeInputs:
     """
@@ -150,14 +163,129 @@ class ScheduleElement:
             second and each next travel the start time field is a time 
             of destination activity start without estimation of travel
             time between activities.
-        dest_activity_type: str
-            Travel destination type like "szkola", "uczelnia", "dom",
-            "praca", "inne"
+        dest_activity_type: int
+            Code of travel destination type like "szkola", "uczelnia",
+            "dom", "praca", "inne"
         dest_activity_dur_time: int
             Duration time (minutes) of activity that is this travel
             destination. Default value is 0.
     """
 
     travel_start_time: int
-    dest_activity_type: str
+    dest_activity_type: int
     dest_activity_dur_time: int = 0
+
+
+@dataclass
+class Population:
+    """
+    Class for keeping attributes of whole synthesized population as
+    columns - i-th element of every array describes i-th agent.
+
+    Attributes
+    ----------
+        home_region: np.ndarray
+            Home region codes (see Vocabularies).
+        age_sex: np.ndarray
+            Codes of age and sex combination strings like "0-5",
+            "16-19_K"...
+        age: np.ndarray
+            Age mapped to int 0-5 value (see TransportModeInputs).
+        pub_trans_comfort: np.ndarray
+        pub_trans_punctuality: np.ndarray
+        bicycle_infrastr_comfort: np.ndarray
+        pedestrian_inconvenience: np.ndarray
+        household_persons: np.ndarray
+        household_cars: np.ndarray
+        household_bicycles: np.ndarray
+            Transport mode classifier inputs (see TransportModeInputs).
+            Agents without inputs ("0-5" group) have MISSING_INPUT values.
+    """
+
+    home_region: np.ndarray
+    age_sex: np.ndarray
+    age: np.ndarray
+    pub_trans_comfort: np.ndarray
+    pub_trans_punctuality: np.ndarray
+    bicycle_infrastr_comfort: np.ndarray
+    pedestrian_inconvenience: np.ndarray
+    household_persons: np.ndarray
+    household_cars: np.ndarray
+    household_bicycles: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.home_region)
+
+    def get_transport_mode_inputs(
+        self,
+        idx: int
+    ) -> TransportModeInputs:
+        """
+        Returns transport mode classifier inputs of idx-th agent.
+
+        Parameters
+        ----------
+            idx: int
+                Agent index.
+
+        Returns
+        -------
+            inputs: TransportModeInputs
+                Inputs with None values if agent has no inputs.
+        """
+
+        values = {
+            name: getattr(self, name)[idx]
+            for name in TransportModeInputs.__dataclass_fields__
+        }
+
+        return TransportModeInputs(**{
+            name: None if (name != 'age' and value == MISSING_INPUT)
+            else int(value)
+            for name, value in values.items()
+        })
+
+    def get_input_matrix(self) -> np.ndarray:
+        """
+        Returns transport mode classifier inputs of all agents as
+        (num_agents x 8) matrix with columns ordered as in
+        TransportModeInputs.get_input_vector() result (without distance).
+        """
+
+        return np.column_stack([
+            getattr(self, name) for name in INPUT_VECTOR_FIELDS
+        ])
+
+
+@dataclass
+class Schedules:
+    """
+    Class for keeping day schedules of whole population in CSR layout -
+    schedule of i-th agent consists of elements from offsets[i] to
+    offsets[i+1] (excluded) of flat arrays. Fields of flat arrays are
+    the same as ScheduleElement fields.
+
+    Attributes
+    ----------
+        offsets: np.ndarray
+            Start index of each agent's schedule, length is equal to number
+            of agents + 1.
+        travel_start_time: np.ndarray
+        dest_activity_type: np.ndarray
+        dest_activity_dur_time: np.ndarray
+    """
+
+    offsets: np.ndarray
+    travel_start_time: np.ndarray
+    dest_activity_type: np.ndarray
+    dest_activity_dur_time: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_lengths(self) -> np.ndarray:
+        """
+        Returns number of schedule elements of each agent.
+        """
+
+        return np.diff(self.offsets)
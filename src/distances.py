@@ -0,0 +1,235 @@
+import os
+import tempfile
+from typing import Any, Dict, Iterable
+
+import numpy as np
+import ujson as json
+
+
+class DistanceMatrix:
+    """
+    Interregional distances kept as a dense float32 (region x region)
+    matrix with a region id <-> matrix index vocabulary. Matrix loaded
+    from .npy file is memory mapped, so all simulation processes share
+    one page-cached copy. Distances are looked up by region indices
+    (codes of region vocabulary started with DistanceMatrix.regions,
+    see Vocabularies).
+    """
+
+    def __init__(
+        self,
+        regions: Iterable[str],
+        matrix: np.ndarray
+    ):
+        """
+        Constructs DistanceMatrix.
+
+        Parameters
+        ----------
+            regions: Iterable[str]
+                Region ids ordered as matrix rows and columns.
+            matrix: np.ndarray
+                (n_regions x n_regions) distances matrix.
+        """
+
+        self.regions = np.asarray(regions, dtype=str)
+        self.region_index = {
+            region: i for i, region in enumerate(self.regions)
+        }
+        self.matrix = matrix
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # memory mapped matrix is passed to other processes as its place
+        # in file (.npy file or distributions bundle), so they map the
+        # same file instead of receiving a copy
+        state = self.__dict__.copy()
+        if isinstance(self.matrix, np.memmap):
+            state['matrix'] = (
+                self.matrix.filename,
+                self.matrix.offset,
+                self.matrix.dtype.str,
+                self.matrix.shape
+            )
+
+        return state
+
+    def __setstate__(
+        self,
+        state: Dict[str, Any]
+    ):
+        if isinstance(state['matrix'], tuple):
+            filename, offset, dtype, shape = state['matrix']
+            state['matrix'] = np.memmap(
+                filename, dtype=dtype, mode='r', offset=offset, shape=shape
+            )
+
+        self.__dict__.update(state)
+
+    @classmethod
+    def from_dict(
+        cls,
+        interregional_distances: Dict[str, Dict[str, float]]
+    ) -> 'DistanceMatrix':
+        """
+        Creates DistanceMatrix from nested dict in format
+        {start_region: {dest_region: distance}}.
+        """
+
+        regions = sorted(interregional_distances)
+        region_index = {region: i for i, region in enumerate(regions)}
+
+        matrix = np.full((len(regions), len(regions)), np.nan, dtype=np.float32)
+        for start_region, distances in interregional_distances.items():
+            row = matrix[region_index[start_region]]
+            for dest_region, distance in distances.items():
+                row[region_index[dest_region]] = distance
+
+        return cls(regions=regions, matrix=matrix)
+
+    def save(
+        self,
+        path: str
+    ):
+        """
+        Saves matrix as .npy file and regions next to it
+        (e.g. distances.npy and distances_regions.npy).
+        """
+
+        np.save(path, self.matrix)
+        np.save(_get_regions_path(path), self.regions)
+
+    @classmethod
+    def load(
+        cls,
+        path: str
+    ) -> 'DistanceMatrix':
+        """
+        Loads DistanceMatrix saved by save method. Matrix is opened in
+        read only memory mapped mode.
+        """
+
+        return cls(
+            regions=np.load(_get_regions_path(path)),
+            matrix=np.load(path, mmap_mode='r')
+        )
+
+    def get_indices(
+        self,
+        regions: Iterable[str]
+    ) -> np.ndarray:
+        """
+        Returns matrix indices of given regions.
+        """
+
+        return np.fromiter(
+            (self.region_index[region] for region in regions),
+            dtype=np.int64
+        )
+
+    def get_distance(
+        self,
+        start_region: int,
+        dest_region: int
+    ) -> float:
+        """
+        Returns distance between two regions with given indices.
+        """
+
+        return float(self.matrix[start_region, dest_region])
+
+    def get_distances(
+        self,
+        start_regions: np.ndarray,
+        dest_regions: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns distances between many pairs of regions with given indices
+        with a single matrix lookup.
+        """
+
+        return self.matrix[start_regions, dest_regions]
+
+
+def _get_regions_path(
+    path: str
+) -> str:
+    return os.path.splitext(path)[0] + '_regions.npy'
+
+
+def compile_distance_matrix(
+    distances_path: str
+) -> str:
+    """
+    Compiles interregional distances .json file into DistanceMatrix and
+    saves it as .npy file next to it (e.g. interregional_distances.json ->
+    interregional_distances.npy).
+
+    Parameters
+    ----------
+        distances_path: str
+            Path to interregional distances json file.
+
+    Returns
+    -------
+        compiled_path: str
+            Path to compiled matrix.
+    """
+
+    with open(distances_path, 'r') as f:
+        interregional_distances = json.load(f)
+
+    compiled_path = os.path.splitext(distances_path)[0] + '.npy'
+
+    # files are written under unique temporary names and renamed, so
+    # processes (also in other containers, whose PIDs may be equal) loading
+    # or compiling the matrix at the same time never read or write a
+    # partial file
+    fd, tmp_path = tempfile.mkstemp(
+        suffix='.tmp.npy',
+        prefix=os.path.basename(os.path.splitext(distances_path)[0]) + '.',
+        dir=os.path.dirname(os.path.abspath(distances_path))
+    )
+    try:
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        DistanceMatrix.from_dict(interregional_distances).save(tmp_path)
+        os.replace(
+            _get_regions_path(tmp_path), _get_regions_path(compiled_path)
+        )
+        os.replace(tmp_path, compiled_path)
+    except BaseException:
+        for path in [tmp_path, _get_regions_path(tmp_path)]:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return compiled_path
+
+
+def load_distance_matrix(
+    distances_path: str
+) -> DistanceMatrix:
+    """
+    Loads memory mapped DistanceMatrix. The json file is compiled only if
+    there is no up to date .npy file next to it.
+
+    Parameters
+    ----------
+        distances_path: str
+            Path to interregional distances json file.
+
+    Returns
+    -------
+        distance_matrix: DistanceMatrix
+    """
+
+    compiled_path = os.path.splitext(distances_path)[0] + '.npy'
+
+    if not os.path.exists(compiled_path) or (
+        os.path.exists(distances_path)
+        and os.path.getmtime(compiled_path)
+        < os.path.getmtime(distances_path)
+    ):
+        compile_distance_matrix(distances_path)
+
+    return DistanceMatrix.load(compiled_path)
@@ -0,0 +1,324 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import ujson as json
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass(frozen=True)
+class Job:
+    """
+    Leased (scenario, replicate) job.
+    """
+
+    id: int
+    scenario: str
+    replicate: int
+    payload: Any
+    attempts: int
+
+
+class JobQueue:
+    """
+    Pull-based queue of (scenario, replicate) jobs kept in a SQLite file,
+    so any number of worker processes or containers sharing the file can
+    take jobs without static partitioning. A worker leases a job for
+    lease_timeout seconds and extends the lease with heartbeats while it
+    works on it. Jobs with expired leases (e.g. of a killed worker) are
+    given to other workers again.
+
+    SQLite locking needs a local filesystem (or a volume bind mounted to
+    containers of one host), it does not work reliably over NFS.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_timeout: float = 600.,
+        max_attempts: int = 3
+    ):
+        """
+        Opens (and creates if needed) job queue.
+
+        Parameters
+        ----------
+            path: str
+                Path to SQLite file.
+            lease_timeout: float
+                Seconds after which a lease without heartbeat expires.
+            max_attempts: int
+                Number of failed attempts after which job is marked as
+                failed instead of being given to workers again.
+        """
+
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        self.connection = sqlite3.connect(
+            path, timeout=60., isolation_level=None
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scenario TEXT NOT NULL,
+                replicate INTEGER NOT NULL,
+                payload TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (scenario, replicate)
+            )
+            '''
+        )
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # write lock is taken at the beginning, so two workers can not
+        # lease the same job
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        else:
+            self.connection.execute('COMMIT')
+
+    def add_jobs(
+        self,
+        jobs: Iterable[Tuple[str, int, Any]]
+    ) -> int:
+        """
+        Adds (scenario, replicate, payload) jobs, payload must be JSON
+        serializable. Jobs already in the queue are skipped, so adding
+        jobs again is safe.
+
+        Returns
+        -------
+            num_added: int
+        """
+
+        with self._transaction() as connection:
+            num_jobs = self._count_jobs(connection)
+            connection.executemany(
+                'INSERT OR IGNORE INTO jobs (scenario, replicate, payload) '
+                'VALUES (?, ?, ?)',
+                (
+                    (str(scenario), int(replicate), json.dumps(payload))
+                    for scenario, replicate, payload in jobs
+                )
+            )
+
+            return self._count_jobs(connection) - num_jobs
+
+    @staticmethod
+    def _count_jobs(connection: sqlite3.Connection) -> int:
+        return connection.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    def lease(
+        self,
+        worker_id: str
+    ) -> Optional[Job]:
+        """
+        Leases the oldest pending job (after requeueing expired leases).
+
+        Returns
+        -------
+            job: Job or None
+                None if there are no pending jobs.
+        """
+
+        now = time.time()
+
+        with self._transaction() as connection:
+            self._requeue_expired(connection, now)
+
+            row = connection.execute(
+                'SELECT id, scenario, replicate, payload, attempts FROM jobs '
+                'WHERE status = ? ORDER BY id LIMIT 1',
+                (PENDING,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            connection.execute(
+                'UPDATE jobs SET status = ?, worker = ?, lease_expires = ? '
+                'WHERE id = ?',
+                (LEASED, worker_id, now + self.lease_timeout, row[0])
+            )
+
+        job_id, scenario, replicate, payload, attempts = row
+
+        return Job(
+            id=job_id,
+            scenario=scenario,
+            replicate=replicate,
+            payload=json.loads(payload),
+            attempts=attempts
+        )
+
+    def heartbeat(
+        self,
+        job: Job,
+        worker_id: str
+    ) -> bool:
+        """
+        Extends lease of job.
+
+        Returns
+        -------
+            is_leased: bool
+                False if the lease was lost (expired and job was given to
+                another worker).
+        """
+
+        cursor = self.connection.execute(
+            'UPDATE jobs SET lease_expires = ? '
+            'WHERE id = ? AND status = ? AND worker = ?',
+            (time.time() + self.lease_timeout, job.id, LEASED, worker_id)
+        )
+
+        return cursor.rowcount == 1
+
+    def complete(
+        self,
+        job: Job,
+        worker_id: str
+    ) -> bool:
+        """
+        Marks leased job as done.
+
+        Returns
+        -------
+            is_completed: bool
+                False if the lease was lost in the meantime.
+        """
+
+        cursor = self.connection.execute(
+            'UPDATE jobs SET status = ?, lease_expires = NULL '
+            'WHERE id = ? AND status = ? AND worker = ?',
+            (DONE, job.id, LEASED, worker_id)
+        )
+
+        return cursor.rowcount == 1
+
+    def release(
+        self,
+        job: Job,
+        worker_id: str
+    ):
+        """
+        Gives back job that failed. It becomes pending again or failed
+        after max_attempts attempts.
+        """
+
+        self.connection.execute(
+            'UPDATE jobs SET status = CASE WHEN attempts + 1 >= ? '
+            'THEN ? ELSE ? END, attempts = attempts + 1, worker = NULL, '
+            'lease_expires = NULL WHERE id = ? AND status = ? AND worker = ?',
+            (self.max_attempts, FAILED, PENDING, job.id, LEASED, worker_id)
+        )
+
+    def requeue_expired(self) -> int:
+        """
+        Makes jobs with expired leases pending again.
+
+        Returns
+        -------
+            num_requeued: int
+        """
+
+        with self._transaction() as connection:
+            return self._requeue_expired(connection, time.time())
+
+    def _requeue_expired(
+        self,
+        connection: sqlite3.Connection,
+        now: float
+    ) -> int:
+        cursor = connection.execute(
+            'UPDATE jobs SET status = CASE WHEN attempts + 1 >= ? '
+            'THEN ? ELSE ? END, attempts = attempts + 1, worker = NULL, '
+            'lease_expires = NULL WHERE status = ? AND lease_expires < ?',
+            (self.max_attempts, FAILED, PENDING, LEASED, now)
+        )
+
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns number of jobs in each status.
+        """
+
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(self.connection.execute(
+            'SELECT status, COUNT(*) FROM jobs GROUP BY status'
+        ).fetchall())
+
+        return counts
+
+    @contextmanager
+    def keep_alive(
+        self,
+        job: Job,
+        worker_id: str,
+        interval: Optional[float] = None
+    ) -> Iterator[None]:
+        """
+        Sends heartbeats of job from a background thread (with its own
+        connection) while the block runs.
+
+        Parameters
+        ----------
+            interval: float
+                Seconds between heartbeats, by default a third of
+                lease_timeout.
+        """
+
+        if interval is None:
+            interval = self.lease_timeout / 3
+        stop = threading.Event()
+
+        def send_heartbeats():
+            queue = JobQueue(self.path, self.lease_timeout, self.max_attempts)
+            try:
+                while not stop.wait(interval):
+                    if not queue.heartbeat(job, worker_id):
+                        break
+            finally:
+                queue.close()
+
+        thread = threading.Thread(target=send_heartbeats, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+def get_worker_id() -> str:
+    """
+    Returns id of current process unique across hosts and containers.
+    """
+
+    return socket.gethostname() + ':' + str(os.getpid())
@@ -1,22 +1,135 @@
-from typing import Dict, List, Tuple
+import random
+from collections import defaultdict
+from typing import (TYPE_CHECKING, Callable, Dict, List, Optional, Tuple,
+                    Union)
 
+import numpy as np
+from numpy.random import MT19937, SeedSequence, default_rng
+import pandas as pd
 from mesa import Model
 from mesa.datacollection import DataCollector
 from mesa.time import RandomActivation
-from sklearn.tree import DecisionTreeClassifier
 
 from .agents import Person
-from .classifiers import TranportModeDecisionTree
-from .samplers import (AgeSexSampler, DayScheduleSampler, DriverSampler,
-                       GravitySampler, RegionSampler,
-                       TransportModeInputsSampler, DistributionFloatTuple)
+from .aggregates import TripAggregates
+from .classifiers import CompiledDecisionTree, TranportModeDecisionTree
+from .data_models import (MISSING_INPUT, Population, Schedules,
+                          TransportModeInputs)
+from .distances import DistanceMatrix
+from .samplers import (GLOBAL_SEED, AgeSexSampler, DayScheduleSampler,
+                       DriverSampler, GravitySampler, PopulationSampler,
+                       RegionSampler, TransportModeInputsSampler,
+                       DistributionFloatTuple)
+from .stage_cache import StageCache, get_stage_keys
+from .streams import DEST_REGION_STREAM, DRIVER_STREAM, AgentRandomStreams
+from .trip_log import TripLog
+from .vocabulary import HOME_PLACE_TYPE_CODE, Vocabularies
 
+if TYPE_CHECKING:
+    from sklearn.tree import DecisionTreeClassifier
 
 
+# results columns with integer codes and names of their vocabularies
+CATEGORICAL_COLUMNS = {
+    'home_region': 'region',
+    'age_sex': 'age_sex',
+    'start_region': 'region',
+    'start_place_type': 'place_type',
+    'dest_region': 'region',
+    'dest_place_type': 'place_type'
+}
+
+
+class TravelEventQueue:
+    """
+    Time-bucketed queue of agents' next travels. Agent is kept in the
+    bucket of the first simulation step at which its next travel is due,
+    so taking agents with due travels costs O(number of due agents)
+    instead of O(number of agents).
+    """
+
+    def __init__(
+        self,
+        start_time: int,
+        step_time: int
+    ):
+        """
+        Constructs TravelEventQueue for given simulation time grid.
+
+        Parameters
+        ----------
+            start_time: int
+                Simulation start time (minutes).
+            step_time: int
+                Simulation step duration (minutes).
+        """
+
+        self.start_time = start_time
+        self.step_time = step_time
+        self.buckets = defaultdict(list)
+
+    def push(
+        self,
+        agents: np.ndarray,
+        travel_start_times: np.ndarray
+    ):
+        """
+        Adds agents with their next travel start times. Travels that start
+        before simulation start time are due at the first step.
+        """
+
+        if len(agents) == 0:
+            return
+
+        step_nums = np.maximum(
+            np.ceil(
+                (np.asarray(travel_start_times) - self.start_time)
+                / self.step_time
+            ),
+            0
+        ).astype(np.int64)
+
+        order = np.argsort(step_nums, kind='stable')
+        step_nums = step_nums[order]
+        agents = np.asarray(agents)[order]
+        bounds = np.flatnonzero(np.diff(step_nums)) + 1
+
+        for step_num, step_agents in zip(
+            step_nums[np.r_[0, bounds]],
+            np.split(agents, bounds)
+        ):
+            self.buckets[step_num].append(step_agents)
+
+    def pop(
+        self,
+        time: int
+    ) -> np.ndarray:
+        """
+        Removes and returns agents whose next travel is due at the step
+        that starts at given time.
+        """
+
+        step_num = (time - self.start_time) // self.step_time
+        chunks = self.buckets.pop(step_num, [])
+
+        if len(chunks) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        return np.concatenate(chunks)
+
 
 class TrafficModel(Model):
     """A model with some number of agents."""
 
+    SUPPORTS_AGENT_STREAMS = False
+
+    def __new__(cls, *args, **kwargs):
+        # mesa seeds model.random with 'seed' argument, which here can be
+        # a SeedSequence - it is seeded in __init__ instead
+        kwargs.pop('seed', None)
+
+        return super().__new__(cls, *args, **kwargs)
+
     def __init__(
         self,
         N: int,
@@ -33,16 +146,71 @@ class TrafficModel(Model):
         travel_chains_dist: List[Tuple[str, DistributionFloatTuple]],
         start_hour_dist: List[Tuple[str, DistributionFloatTuple]],
         other_travels_dist: List[Tuple[str, DistributionFloatTuple]],
-        spend_time_dist_params: List[Tuple[str,  Dict[str, int]]],
-        trip_cancel_prob: List[Tuple[str, float]],
-        decision_tree: DecisionTreeClassifier,
-        gravity_dist: List[Tuple[str,  DistributionFloatTuple]],
+        spend_time_dist_params: List[Tuple[Tuple[str, str], Dict[str, int]]],
+        trip_cancel_prob: Dict[str, float],
+        decision_tree: Union['DecisionTreeClassifier', CompiledDecisionTree],
+        gravity_dist: List[Tuple[Tuple[str, str], DistributionFloatTuple]],
         drivers_dist: List[Tuple[str, DistributionFloatTuple]],
-        interregional_distances: Dict[str, Dict[str, float]],
+        interregional_distances: DistanceMatrix,
         start_time: int = 4 * 60,
         step_time: int = 60,
-        end_time: int = 23 * 60
+        end_time: int = 23 * 60,
+        event_driven: bool = False,
+        seed: Union[int, SeedSequence] = GLOBAL_SEED,
+        agent_streams: bool = False,
+        first_agent_id: int = 0,
+        aggregate: bool = False,
+        common_random_numbers: bool = False,
+        stage_cache: Optional[StageCache] = None
     ):
+        """
+        Constructs TrafficModel. If event_driven is set, step visits only
+        agents with a due travel (see TravelEventQueue) instead of
+        activating all agents. All categories (regions, age_sex, place
+        types, travel chains) are interned to integer codes once, while
+        building samplers (see Vocabularies), and decoded only in results.
+
+        All samplers draw from one generator created from seed (see
+        get_replicate_seed, GLOBAL_SEED by default), and mesa activation
+        order is seeded from it too, so the replicate is reproducible on
+        its own. If agent_streams
+        is set, agents' randomness comes from counter-based streams keyed
+        by seed and agent id instead (see AgentRandomStreams), so results
+        do not depend on order of agents or on population split.
+
+        With agent streams the model can simulate a shard of a population:
+        N agents with ids starting from first_agent_id. Results of shards
+        concatenated in order of ids are the same as results of the whole
+        population.
+
+        If common_random_numbers is set (needs agent_streams), samplers
+        map agents' streams to categories by inverse CDF (see
+        AgentRandomStreams), so models of different scenarios run with
+        the same seed differ only in decisions drawn from changed
+        distributions, mostly in few agents.
+
+        If stage_cache is given (needs agent_streams), population, mode
+        inputs, schedules and trips are reused from cache when inputs of
+        their stages and seed are unchanged (see StageCache), e.g. when a
+        scenario with common random numbers changes only transport mode
+        inputs distributions.
+
+        If aggregate is set, counts of travels by origin, destination,
+        transport mode and hour are updated as travels happen (see
+        TripAggregates and get_trip_aggregates).
+        """
+
+        if agent_streams and not self.SUPPORTS_AGENT_STREAMS:
+            raise ValueError(
+                f'{type(self).__name__} does not support agent_streams.'
+            )
+        if first_agent_id != 0 and not agent_streams:
+            raise ValueError('Population shards need agent_streams.')
+        if common_random_numbers and not agent_streams:
+            raise ValueError('Common random numbers need agent_streams.')
+        if stage_cache is not None and not agent_streams:
+            raise ValueError('Stage cache needs agent_streams.')
+
         self.num_agents = N
         self.schedule = RandomActivation(self)
         self.running = True
@@ -51,15 +219,33 @@ class TrafficModel(Model):
         self.step_time = step_time
         self.end_time = end_time
         self.current_time = self.start_time
+        self.event_driven = event_driven
+
+        self.seed_sequence = (
+            seed if isinstance(seed, SeedSequence) else SeedSequence(seed)
+        )
+        self.rng = default_rng(MT19937(self.seed_sequence))
+        self.random = random.Random(
+            int(self.seed_sequence.generate_state(1, np.uint64)[0])
+        )
+
+        # region codes are equal to distance matrix indices
+        self.vocabularies = Vocabularies(
+            regions=interregional_distances.regions.tolist()
+        )
 
         # All Agent subclasses init
         self.home_region_sampler = RegionSampler(
             prob_dist=population_dist,
-            num_samples=self.num_agents
+            vocabulary=self.vocabularies.region,
+            num_samples=self.num_agents,
+            rng=self.rng
         )
         self.age_sex_sampler = AgeSexSampler(
             prob_dist=demography_dist,
-            num_samples=self.num_agents
+            vocabulary=self.vocabularies.age_sex,
+            num_samples=self.num_agents,
+            rng=self.rng
         )
         self.mode_inputs_sampler = TransportModeInputsSampler(
             pub_trans_comfort_dist=pub_trans_comfort_dist,
@@ -69,7 +255,9 @@ class TrafficModel(Model):
             household_persons_dist=household_persons_dist,
             household_cars_dist=household_cars_dist,
             household_bicycles_dist=household_bicycles_dist,
-            num_samples=self.num_agents
+            age_sex_vocabulary=self.vocabularies.age_sex,
+            num_samples=self.num_agents,
+            rng=self.rng
         )
         self.day_schedule_sampler = DayScheduleSampler(
             any_travel_dist=any_travel_dist,
@@ -77,35 +265,168 @@ class TrafficModel(Model):
             start_hour_dist=start_hour_dist,
             other_travels_dist=other_travels_dist,
             spend_time_dist_params=spend_time_dist_params,
-            trip_cancel_prob=trip_cancel_prob
+            trip_cancel_prob=trip_cancel_prob,
+            vocabularies=self.vocabularies,
+            rng=self.rng
         )
         self.transport_mode_clf = TranportModeDecisionTree(
             decision_tree=decision_tree
         )
         self.gravity_sampler = GravitySampler(
-            gravity_dist=gravity_dist
+            gravity_dist=gravity_dist,
+            vocabularies=self.vocabularies,
+            rng=self.rng
         )
         self.driver_sampler = DriverSampler(
-            drivers_dist=drivers_dist
+            drivers_dist=drivers_dist,
+            age_sex_vocabulary=self.vocabularies.age_sex,
+            rng=self.rng
         )
         self.interregional_distances = interregional_distances
+        self.population_sampler = PopulationSampler(
+            home_region_sampler=self.home_region_sampler,
+            age_sex_sampler=self.age_sex_sampler,
+            transport_mode_inputs_sampler=self.mode_inputs_sampler
+        )
+
+        # Synthesize whole population at once and create agents
+        self.agent_ids = np.arange(
+            first_agent_id, first_agent_id + self.num_agents
+        )
+        if agent_streams:
+            # first child of seed sequence (without spawning it, which
+            # would change the passed sequence)
+            self.streams = AgentRandomStreams(
+                SeedSequence(
+                    self.seed_sequence.entropy,
+                    spawn_key=(*self.seed_sequence.spawn_key, 0)
+                ),
+                inverse_cdf=common_random_numbers
+            )
+        else:
+            self.streams = None
+
+        self.stage_cache = stage_cache
+        if stage_cache is not None:
+            # codes of categories in artifacts are valid only with the
+            # same vocabularies
+            self.stage_keys = get_stage_keys(
+                context=(
+                    self.streams.key,
+                    first_agent_id,
+                    N,
+                    common_random_numbers,
+                    [
+                        vocabulary.categories
+                        for vocabulary in [
+                            self.vocabularies.region,
+                            self.vocabularies.age_sex,
+                            self.vocabularies.place_type,
+                            self.vocabularies.travel_chain
+                        ]
+                    ]
+                ),
+                stages_inputs={
+                    'population': (population_dist, demography_dist),
+                    'mode_inputs': (
+                        pub_trans_comfort_dist,
+                        pub_trans_punctuality_dist,
+                        bicycle_infrastr_comfort_dist,
+                        pedestrian_inconvenience_dist,
+                        household_persons_dist,
+                        household_cars_dist,
+                        household_bicycles_dist
+                    ),
+                    'schedules': (
+                        any_travel_dist,
+                        travel_chains_dist,
+                        start_hour_dist,
+                        other_travels_dist,
+                        spend_time_dist_params,
+                        trip_cancel_prob
+                    ),
+                    'trips': (
+                        gravity_dist,
+                        interregional_distances,
+                        start_time,
+                        step_time,
+                        end_time
+                    )
+                }
+            )
+
+        if agent_streams:
+            demography = self._get_stage_artifact(
+                'population',
+                lambda: self.population_sampler.sample_demography_from_streams(
+                    self.agent_ids, self.streams
+                )
+            )
+            mode_inputs = self._get_stage_artifact(
+                'mode_inputs',
+                lambda: self.mode_inputs_sampler.sample_from_streams(
+                    demography['age_sex'], self.agent_ids, self.streams
+                )
+            )
+            self.population = Population(**demography, **mode_inputs)
+        else:
+            self.population = self.population_sampler(self.num_agents)
+
+        self.trip_aggregates = (
+            TripAggregates(self.vocabularies, end_time) if aggregate else None
+        )
+        self._create_agents()
+
+    def _get_stage_artifact(
+        self,
+        stage: str,
+        compute: Callable[[], Dict[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        # artifact is computed only if it is not cached
+        if self.stage_cache is None:
+            return compute()
+
+        return self.stage_cache.get(stage, self.stage_keys[stage], compute)
+
+    def _create_agents(self):
+        self.agents = []
+        home_regions = self.population.home_region.tolist()
+        age_sexes = self.population.age_sex.tolist()
 
-        # Create agents
         for i in range(self.num_agents):
-            self.schedule.add(Person(
+            self.agents.append(Person(
                 unique_id=i,
                 model=self,
-                home_region_sampler=self.home_region_sampler,
-                age_sex_sampler=self.age_sex_sampler,
-                transport_mode_inputs_sampler=self.mode_inputs_sampler,
+                home_region=home_regions[i],
+                age_sex=age_sexes[i],
+                transport_mode_inputs=(
+                    self.population.get_transport_mode_inputs(i)
+                ),
                 day_schedule_sampler=self.day_schedule_sampler,
-                transport_mode_clf=self.transport_mode_clf,
                 gravity_sampler=self.gravity_sampler,
-                driver_sampler=self.driver_sampler,
                 interregional_distances=self.interregional_distances,
                 start_time=self.start_time,
                 step_time=self.step_time
             ))
+            self.schedule.add(self.agents[-1])
+
+        self.mode_profiles = self.transport_mode_clf.get_profile_ids(
+            self.population.get_input_matrix()
+        )
+        self.trip_log = TripLog(
+            self.vocabularies,
+            capacity=sum(len(agent.schedule) for agent in self.agents)
+        )
+        self.pending_travels_agents = []
+        self.pending_travels_rows = []
+        self.pending_travels_distances = []
+
+        if self.event_driven:
+            self.travel_queue = TravelEventQueue(
+                start_time=self.start_time,
+                step_time=self.step_time
+            )
+            self._push_next_travels(self.schedule.agents)
 
         self.agent_data_collector = DataCollector(
             agent_reporters={
@@ -125,24 +446,454 @@ class TrafficModel(Model):
 
         self.agent_data_collector.collect(self)
 
-        self.travels_data_collector = DataCollector(
-            agent_reporters={
-                'agent_id': 'agent_id',
-                'start_region': 'start_region',
-                'start_place_type': 'start_place_type',
-                'dest_region': 'dest_region',
-                'dest_place_type': 'dest_place_type',
-                'travel_start_time': 'travel_start_time',
-                'dest_activity_dur_time': 'dest_activity_dur_time',
-                'transport_mode': 'transport_mode',
-                'is_driver': 'is_driver'
-            }
+    def step(self):
+        if self.event_driven:
+            agents = [
+                self.agents[agent_id]
+                for agent_id in self.travel_queue.pop(self.current_time)
+            ]
+            for agent in agents:
+                agent.start_due_travels(time=self.current_time)
+            self._push_next_travels(agents)
+        else:
+            self.schedule.step()
+
+        self._choose_transport_modes()
+
+        self.current_time += self.step_time
+
+    def add_pending_travel(
+        self,
+        agent: Person,
+        row: int,
+        distance: float
+    ):
+        """
+        Registers travel started by agent in current step. Transport modes
+        of all such travels are chosen at the end of the step with a single
+        classifier call.
+
+        Parameters
+        ----------
+            agent: Person
+                Travelling agent.
+            row: int
+                Row of travel in trip log.
+            distance: float
+                Travel distance.
+        """
+
+        self.pending_travels_agents.append(agent)
+        self.pending_travels_rows.append(row)
+        self.pending_travels_distances.append(distance)
+
+    def _choose_transport_modes(self):
+        num_travels = len(self.pending_travels_agents)
+        agent_ids = np.fromiter(
+            (agent.unique_id for agent in self.pending_travels_agents),
+            dtype=np.int64,
+            count=num_travels
+        )
+
+        transport_modes = self.transport_mode_clf.predict_profiles(
+            self.mode_profiles[agent_ids],
+            self.pending_travels_distances
+        )
+
+        is_driver = np.full(num_travels, None, dtype=object)
+        by_car = transport_modes == 0
+        is_driver[by_car] = self.driver_sampler.sample(
+            self.population.age_sex[agent_ids[by_car]]
+        )
+
+        self._set_transport_modes(
+            np.array(self.pending_travels_rows, dtype=np.int64),
+            transport_modes,
+            is_driver
+        )
+
+        self.pending_travels_agents = []
+        self.pending_travels_rows = []
+        self.pending_travels_distances = []
+
+    def _set_transport_modes(
+        self,
+        rows: np.ndarray,
+        transport_modes: np.ndarray,
+        is_driver: np.ndarray
+    ):
+        # travels in rows are complete once their transport modes are set,
+        # so they are counted in aggregates
+        self.trip_log.set_transport_modes(rows, transport_modes, is_driver)
+
+        if self.trip_aggregates is not None:
+            columns = self.trip_log.columns
+            self.trip_aggregates.add(
+                columns['start_region'][rows],
+                columns['dest_region'][rows],
+                transport_modes,
+                columns['travel_start_time'][rows]
+            )
+
+    def _push_next_travels(
+        self,
+        agents: List[Person]
+    ):
+        next_travels = [
+            (agent.unique_id, agent.get_next_travel_start_time())
+            for agent in agents
+        ]
+        next_travels = [
+            next_travel for next_travel in next_travels
+            if next_travel[1] is not None
+        ]
+
+        self.travel_queue.push(
+            np.array([agent_id for agent_id, _ in next_travels], dtype=np.int64),
+            np.array([time for _, time in next_travels], dtype=np.float64)
+        )
+
+    def _decode_categories(
+        self,
+        results: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Replaces integer codes of categorical columns of results with
+        pandas Categorical columns.
+        """
+
+        for column, vocabulary_name in CATEGORICAL_COLUMNS.items():
+            if column in results:
+                results[column] = getattr(
+                    self.vocabularies, vocabulary_name
+                ).to_categorical(results[column].to_numpy(dtype=np.int64))
+
+        return results
+
+    def get_agents_results(self) -> pd.DataFrame:
+        """
+        Returns agents attributes table indexed by (Step, AgentID).
+        """
+
+        return self._decode_categories(
+            self.agent_data_collector.get_agent_vars_dataframe()
+        )
+
+    def get_travels_results(self) -> pd.DataFrame:
+        """
+        Returns travels table with one row per performed travel.
+        """
+
+        return self.trip_log.to_dataframe(self.agent_ids)
+
+    def get_trip_aggregates(self) -> Optional[TripAggregates]:
+        """
+        Returns aggregates of performed travels (None if model does not
+        aggregate).
+        """
+
+        return self.trip_aggregates
+
+
+class ArrayTrafficModel(TrafficModel):
+    """
+    TrafficModel variant that keeps agents' state in NumPy columns instead
+    of mesa Person objects. Day schedules are stored in CSR layout
+    (see Schedules). Accepts the same parameters as TrafficModel and
+    produces the same agents and travels results. Steps are always
+    event-driven. Supports counter-based agents' random streams.
+    """
+
+    SUPPORTS_AGENT_STREAMS = True
+
+    def _create_agents(self):
+        if self.streams is None:
+            self.schedules = self.day_schedule_sampler.sample_schedules(
+                self.population.age_sex
+            )
+        else:
+            self.schedules = Schedules(**self._get_stage_artifact(
+                'schedules',
+                lambda: vars(
+                    self.day_schedule_sampler.sample_schedules_from_streams(
+                        self.population.age_sex, self.agent_ids, self.streams
+                    )
+                )
+            ))
+
+        # trips do not depend on transport modes, so cached trips are
+        # replayed step by step (see step) and only their transport modes
+        # are chosen, otherwise trips of all steps are recorded and cached
+        # after the last step
+        self.num_steps = 0
+        self.cached_trips = None
+        self.recorded_trips = None
+        if self.stage_cache is not None:
+            self.cached_trips = self.stage_cache.load(
+                'trips', self.stage_keys['trips']
+            )
+            if self.cached_trips is None:
+                self.recorded_trips = []
+            else:
+                self.cached_trips_offsets = np.concatenate(
+                    [[0], np.cumsum(self.cached_trips.pop('step_sizes'))]
+                )
+
+        self.travel_queue = TravelEventQueue(
+            start_time=self.start_time,
+            step_time=self.step_time
+        )
+        has_travels = self.schedules.get_lengths() > 0
+        self.travel_queue.push(
+            np.flatnonzero(has_travels),
+            self.schedules.travel_start_time[
+                self.schedules.offsets[:-1][has_travels]
+            ]
+        )
+
+        self.current_region = self.population.home_region.copy()
+        self.current_place_type = np.full(
+            self.num_agents, HOME_PLACE_TYPE_CODE, dtype=np.int64
+        )
+        self.next_travel = self.schedules.offsets[:-1].copy()
+        self.schedules_end = self.schedules.offsets[1:]
+
+        self.mode_profiles = self.transport_mode_clf.get_profile_ids(
+            self.population.get_input_matrix()
+        )
+
+        # scheduled travels are the upper bound of performed travels
+        self.trip_log = TripLog(
+            self.vocabularies, capacity=int(self.schedules.offsets[-1])
         )
 
     def step(self):
-        self.schedule.step()
+        if self.cached_trips is None:
+            travels = self._start_due_travels()
+        else:
+            travels = self._get_cached_travels()
 
-        if self.current_time >= self.end_time:
-            self.travels_data_collector.collect(self)
+        if self.recorded_trips is not None:
+            self.recorded_trips.append(travels)
+
+        if travels is not None:
+            self._log_travels(travels)
 
         self.current_time += self.step_time
+        self.num_steps += 1
+
+        if self.recorded_trips is not None \
+                and self.current_time > self.end_time:
+            self._save_trips()
+
+    def _start_due_travels(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Starts travels due in current step and returns them as columns
+        (None if there are none).
+        """
+
+        agents = self.travel_queue.pop(self.current_time)
+        travels_chunks = []
+
+        # an agent can have more than one travel due in single step, so
+        # travels are processed in rounds (one travel per agent in round)
+        while len(agents) > 0:
+            travels_chunks.append(self._start_new_travels(agents))
+            agents = self._get_agents_with_due_travel(agents)
+
+        if len(travels_chunks) == 0:
+            return None
+
+        return {
+            column: np.concatenate([chunk[column] for chunk in travels_chunks])
+            for column in travels_chunks[0]
+        }
+
+    def _get_cached_travels(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns cached travels of current step (None if there are none).
+        """
+
+        if self.num_steps + 1 >= len(self.cached_trips_offsets):
+            return None
+
+        rows = slice(
+            self.cached_trips_offsets[self.num_steps],
+            self.cached_trips_offsets[self.num_steps + 1]
+        )
+        if rows.start == rows.stop:
+            return None
+
+        return {
+            column: values[rows]
+            for column, values in self.cached_trips.items()
+        }
+
+    def _save_trips(self):
+        """
+        Saves travels started in all steps (without transport modes) as
+        trips artifact (see StageCache).
+        """
+
+        step_travels = [
+            travels for travels in self.recorded_trips if travels is not None
+        ]
+        columns = {
+            column: np.concatenate(
+                [travels[column] for travels in step_travels]
+            )
+            for column in step_travels[0]
+        } if len(step_travels) > 0 else {}
+
+        self.stage_cache.save('trips', self.stage_keys['trips'], {
+            **columns,
+            'step_sizes': np.array([
+                0 if travels is None else len(travels['agent_id'])
+                for travels in self.recorded_trips
+            ], dtype=np.int64)
+        })
+        self.recorded_trips = None
+
+    def _get_agents_with_due_travel(
+        self,
+        agents: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns agents whose next travel is due at current time. Agents with
+        later travels are pushed back to the travel queue.
+        """
+
+        has_travel = self.next_travel[agents] < self.schedules_end[agents]
+        agents = agents[has_travel]
+        start_time = self.schedules.travel_start_time[self.next_travel[agents]]
+        is_due = start_time <= self.current_time
+
+        self.travel_queue.push(agents[~is_due], start_time[~is_due])
+
+        return agents[is_due]
+
+    def _start_new_travels(
+        self,
+        agents: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        travels = self.next_travel[agents]
+        dest_place_type = self.schedules.dest_activity_type[travels]
+        start_region = self.current_region[agents]
+        dest_region = self.population.home_region[agents].copy()
+
+        travel_nums = travels - self.schedules.offsets[agents]
+
+        away = np.flatnonzero(dest_place_type != HOME_PLACE_TYPE_CODE)
+        if self.streams is None:
+            dest_region[away] = [
+                self.gravity_sampler(start_region=region, dest_type=place_type)
+                for region, place_type in zip(
+                    start_region[away].tolist(),
+                    dest_place_type[away].tolist()
+                )
+            ]
+        else:
+            dest_region[away] = self.gravity_sampler.sample_from_uniforms(
+                start_regions=start_region[away],
+                dest_types=dest_place_type[away],
+                uniforms=self.streams.uniforms(
+                    self.agent_ids[agents[away]],
+                    DEST_REGION_STREAM,
+                    travel_nums[away]
+                ),
+                inverse_cdf=self.streams.inverse_cdf
+            )
+
+        distance = self.interregional_distances.get_distances(
+            start_regions=start_region,
+            dest_regions=dest_region
+        )
+
+        travels_chunk = {
+            'agent_id': agents,
+            'start_region': start_region,
+            'start_place_type': self.current_place_type[agents],
+            'dest_region': dest_region,
+            'dest_place_type': dest_place_type,
+            'travel_start_time': self.schedules.travel_start_time[travels],
+            'dest_activity_dur_time': (
+                self.schedules.dest_activity_dur_time[travels]
+            ),
+            'distance': distance,
+            'travel_num': travel_nums
+        }
+
+        self.current_region[agents] = dest_region
+        self.current_place_type[agents] = dest_place_type
+        self.next_travel[agents] = travels + 1
+
+        return travels_chunk
+
+    def _log_travels(
+        self,
+        travels: Dict[str, np.ndarray]
+    ):
+        """
+        Chooses transport modes of travels started in current step with
+        cached classifier decisions and appends them to trip log.
+        """
+
+        agents = travels['agent_id']
+
+        transport_modes = self.transport_mode_clf.predict_profiles(
+            self.mode_profiles[agents],
+            travels['distance']
+        )
+        travel_nums = travels['travel_num']
+
+        is_driver = np.full(len(agents), None, dtype=object)
+        by_car = transport_modes == 0
+        if self.streams is None:
+            is_driver[by_car] = self.driver_sampler.sample(
+                self.population.age_sex[agents[by_car]]
+            )
+        else:
+            is_driver[by_car] = (
+                self.driver_sampler.sample_from_uniforms(
+                    self.population.age_sex[agents[by_car]],
+                    self.streams.uniforms(
+                        self.agent_ids[agents[by_car]],
+                        DRIVER_STREAM,
+                        travel_nums[by_car]
+                    ),
+                    self.streams.inverse_cdf
+                )
+            )
+
+        rows = self.trip_log.extend(travels)
+        self._set_transport_modes(rows, transport_modes, is_driver)
+
+    def get_agents_results(self) -> pd.DataFrame:
+        """
+        Returns agents attributes table indexed by (Step, AgentID).
+        """
+
+        # missing inputs are None, as attributes of mesa agents, and
+        # columns get the same dtypes as in DataCollector tables (float
+        # with NaN only if any input is missing)
+        agents_results = pd.DataFrame({
+            'agent_id': self.agent_ids,
+            'home_region': self.population.home_region,
+            'age_sex': self.population.age_sex,
+            **{
+                name: np.where(
+                    getattr(self.population, name) == MISSING_INPUT,
+                    None,
+                    getattr(self.population, name)
+                )
+                for name in TransportModeInputs.__dataclass_fields__
+                if name != 'age'
+            },
+            'travels_num': self.schedules.get_lengths()
+        }).infer_objects()
+        agents_results.index = pd.MultiIndex.from_arrays(
+            [np.zeros(self.num_agents, dtype=np.int64), agents_results['agent_id']],
+            names=['Step', 'AgentID']
+        )
+
+        return self._decode_categories(agents_results)
@@ -0,0 +1,246 @@
+import os
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import pyarrow
+
+
+RESULTS_FORMATS = ('pickle', 'parquet')
+
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_ROW_GROUP_SIZE = 128 * 1024
+PARQUET_FILE_NAME = 'part-0.parquet'
+
+# storage types of results columns in Parquet files, 'category' columns
+# are dictionary encoded, integer columns with missing values (e.g.
+# ratings of children) are nullable
+CATEGORY = 'category'
+
+AGENTS_RESULTS_TYPES = {
+    'agent_id': np.int64,
+    'home_region': CATEGORY,
+    'age_sex': CATEGORY,
+    'pub_trans_comfort': np.int8,
+    'pub_trans_punctuality': np.int8,
+    'bicycle_infrastr_comfort': np.int8,
+    'pedestrian_inconvenience': np.int8,
+    'household_persons': np.int8,
+    'household_cars': np.int8,
+    'household_bicycles': np.int8,
+    'travels_num': np.int16
+}
+
+# times are whole minutes of a day (and durations are shorter than a day)
+TRAVELS_RESULTS_TYPES = {
+    'agent_id': np.int64,
+    'start_region': CATEGORY,
+    'start_place_type': CATEGORY,
+    'dest_region': CATEGORY,
+    'dest_place_type': CATEGORY,
+    'travel_start_time': np.int16,
+    'dest_activity_dur_time': np.int16,
+    'transport_mode': np.int8,
+    'is_driver': CATEGORY
+}
+
+# aggregates tables (see TripAggregates.get_results)
+OD_COUNTS_RESULTS_TYPES = {
+    'start_region': CATEGORY,
+    'dest_region': CATEGORY,
+    'transport_mode': np.int8,
+    'hour': np.int8,
+    'count': np.int32
+}
+
+MODE_SHARE_RESULTS_TYPES = {
+    'hour': np.int8,
+    'transport_mode': np.int8,
+    'count': np.int32,
+    'share': np.float64
+}
+
+PRODUCTION_RESULTS_TYPES = {
+    'start_region': CATEGORY,
+    'transport_mode': np.int8,
+    'count': np.int32
+}
+
+RESULTS_TYPES = {
+    'agents': AGENTS_RESULTS_TYPES,
+    'travels': TRAVELS_RESULTS_TYPES,
+    'od_counts': OD_COUNTS_RESULTS_TYPES,
+    'mode_share': MODE_SHARE_RESULTS_TYPES,
+    'production': PRODUCTION_RESULTS_TYPES
+}
+
+
+def results_to_arrow(
+    results: pd.DataFrame,
+    types: Dict[str, Any]
+) -> 'pyarrow.Table':
+    """
+    Converts results table to pyarrow Table with given column types (see
+    AGENTS_RESULTS_TYPES). Index of results is dropped. Values which do
+    not fit given integer types raise pyarrow.ArrowInvalid, so they are
+    never silently truncated.
+    """
+
+    import pyarrow as pa
+
+    arrays = {}
+
+    for column, dtype in types.items():
+        values = results[column]
+
+        if dtype == CATEGORY:
+            values = values.astype(CATEGORY)
+            codes = values.cat.codes.to_numpy()
+            arrays[column] = pa.DictionaryArray.from_arrays(
+                # missing values have code -1
+                pa.array(codes, mask=codes == -1),
+                pa.array(
+                    [str(category) for category in values.cat.categories],
+                    type=pa.string()
+                )
+            )
+        else:
+            arrays[column] = pa.array(
+                values.to_numpy(),
+                mask=values.isna().to_numpy()
+            ).cast(pa.from_numpy_dtype(dtype))
+
+    return pa.table(arrays)
+
+
+def get_partition_path(
+    dataset_path: str,
+    scenario: Union[int, str],
+    run_num: int
+) -> str:
+    """
+    Returns folder of (scenario, replicate) partition of results dataset
+    (Hive layout, e.g. <dataset_path>/scenario=0/replicate=1), so readers
+    get scenario and replicate as columns and may filter by them.
+    """
+
+    return os.path.join(
+        dataset_path,
+        'scenario=' + str(scenario),
+        'replicate=' + str(run_num)
+    )
+
+
+def write_parquet(
+    table: 'pyarrow.Table',
+    path: str,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+    compression: str = PARQUET_COMPRESSION
+):
+    """
+    Writes compressed Parquet file in row groups of row_group_size rows.
+    File is written to a uniquely named temporary file first, so readers
+    (and workers which rerun the same job, also in other containers, whose
+    PIDs may be equal) never see a partially written file.
+    """
+
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(
+        suffix='.tmp',
+        prefix=os.path.basename(path) + '.',
+        dir=os.path.dirname(path)
+    )
+    try:
+        os.close(fd)
+        # results are read by other users than workers (mkstemp creates
+        # files readable only by their owner)
+        os.chmod(tmp_path, 0o644)
+        pq.write_table(
+            table,
+            tmp_path,
+            row_group_size=row_group_size,
+            compression=compression
+        )
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def save_parquet_results(
+    results_tables: Dict[str, pd.DataFrame],
+    scenario: Union[int, str],
+    run_num: int,
+    out_dir_path: str
+):
+    """
+    Saves results tables of a simulation (e.g. {'agents': ...,
+    'travels': ...}, see RESULTS_TYPES) as partitions of Parquet datasets:
+        - <out_dir_path>/agents/scenario=<scenario>/replicate=<run_num>/
+        - <out_dir_path>/travels/scenario=<scenario>/replicate=<run_num>/
+    Many scenarios can share one out_dir_path.
+    """
+
+    for table_name, results in results_tables.items():
+        write_parquet(
+            results_to_arrow(results, RESULTS_TYPES[table_name]),
+            os.path.join(
+                get_partition_path(
+                    os.path.join(out_dir_path, table_name), scenario, run_num
+                ),
+                PARQUET_FILE_NAME
+            )
+        )
+
+
+def read_parquet_results(
+    out_dir_path: str,
+    table_name: str = 'travels',
+    columns: Optional[List[str]] = None,
+    filters: Optional[List] = None
+) -> pd.DataFrame:
+    """
+    Reads results dataset saved by save_parquet_results.
+
+    Parameters
+    ----------
+        out_dir_path: str
+            Folder of results datasets.
+        table_name: str
+            Name of results table (see RESULTS_TYPES).
+        columns: List[str]
+            Columns to read (all if None), scenario and replicate columns
+            come from partitions.
+        filters: List
+            pyarrow.parquet filters, e.g. [('scenario', '=', '0')], only
+            matching partitions are read.
+
+    Returns
+    -------
+        results: pd.DataFrame
+            Results with dictionary encoded columns as Categorical.
+    """
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    # scenarios are read as strings (also numbered ones), so filters do
+    # not depend on types inferred from partitions' names
+    partitioning = ds.partitioning(
+        pa.schema([('scenario', pa.string()), ('replicate', pa.int32())]),
+        flavor='hive'
+    )
+
+    return pq.read_table(
+        os.path.join(out_dir_path, table_name),
+        columns=columns,
+        filters=filters,
+        partitioning=partitioning
+    ).to_pandas()
@@ -1,11 +1,53 @@
-import ujson as json
 import os
-import pickle
-from multiprocessing import Pool
+import time
+import traceback
+from collections import OrderedDict
+from functools import reduce
+from multiprocessing import Pool, Process
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Sequence,
+                    Tuple, Union)
 import numpy as np
+import pandas as pd
+
+from src.aggregates import TripAggregates, get_num_hours
+from src.bundle import load_distributions
+from src.job_queue import Job, JobQueue, get_worker_id
+from src.models import ArrayTrafficModel, TrafficModel
+from src.results_writer import RESULTS_FORMATS, save_parquet_results
+from src.samplers import GLOBAL_SEED, get_replicate_seed
+from src.scenarios import apply_scenario
+from src.stage_cache import StageCache
+from src.summaries import (CONFIDENCE, METRICS_AXES, Welford,
+                           get_ci_half_width, get_results_metrics)
+
+
+ENGINES = {
+    'mesa': TrafficModel,
+    'array': ArrayTrafficModel
+}
+
+# results a simulation can output, 'aggregates' are streaming counts of
+# travels (see TripAggregates) saved as od_counts, mode_share and
+# production tables
+OUTPUTS = ('agents', 'travels', 'aggregates')
+
+# model parameters, engine, outputs and results format shared by all
+# tasks of a pool worker, set once by _init_worker
+_worker_params = None
+_worker_engine = None
+_worker_outputs = None
+_worker_results_format = None
+
+# with common random numbers, replicate r of every scenario uses the seed
+# of replicate r of this scenario
+COMMON_SCENARIO = 0
+
+# run_scenarios workers load base parameters on demand and keep the most
+# recently used ones
+SCENARIOS_CACHE_SIZE = 2
+_worker_settings = None
+_worker_scenarios = None
 
-from src.models import TrafficModel
-from src.utils import explode
 
 def run(
     in_dir_path: str = '../experiments/input_data/base_distributions',
@@ -15,8 +57,24 @@ def run(
     sim_step_time: int = 60,
     sim_end_time: int = 24*60,
     num_simulations: int = 100,
-    num_processes: int = 3
-):
+    num_processes: int = 3,
+    engine: str = 'mesa',
+    event_driven: bool = False,
+    seed: int = GLOBAL_SEED,
+    scenario: Union[int, str] = 0,
+    agent_streams: bool = False,
+    common_random_numbers: bool = False,
+    num_shards: int = 1,
+    changes: List = (),
+    outputs: Sequence[str] = ('agents', 'travels'),
+    results_format: str = 'pickle',
+    precision: Optional[Dict[str, float]] = None,
+    min_simulations: int = 10,
+    batch_size: int = 10,
+    confidence: float = CONFIDENCE,
+    cache_dir: Optional[str] = None,
+    verbose: bool = False
+) -> int:
     """
         Parameters
         ----------
@@ -48,141 +106,517 @@ def run(
                 (e.g. '../experiments/results/base_distributions')
                 If this folder does not exist, it will be created.
                 In it, files will be created:
-                    - 'agents_results_<sim_num>.csv'
-                    - 'travels_results_<sim_num>.csv'
+                    - 'agents_results_<sim_num>.pkl'
+                    - 'travels_results_<sim_num>.pkl'
                 Where <sim_num> means the simulation number and the number
                 of such files depends on the parameter: num_simulations.
+                (and 'od_counts_results_<sim_num>.pkl',
+                'mode_share_results_<sim_num>.pkl' and
+                'production_results_<sim_num>.pkl' with 'aggregates'
+                output).
+                With 'parquet' results_format, results are partitions of
+                datasets (see save_parquet_results):
+                    - agents/scenario=<scenario>/replicate=<sim_num>/
+                    - travels/scenario=<scenario>/replicate=<sim_num>/
+            engine: str
+                'mesa' - agents are mesa Person objects (TrafficModel),
+                'array' - agents' state is kept in NumPy columns
+                (ArrayTrafficModel), which needs much less memory.
+            event_driven: bool
+                If True, in each step only agents with a due travel are
+                visited (ArrayTrafficModel is always event-driven). It
+                allows to use short (even 1-minute) sim_step_time.
+            seed: int
+                Root seed of all scenarios and simulations.
+            scenario: int or str
+                Scenario number or name. Seed of each simulation is keyed
+                by (scenario, simulation number) (see get_replicate_seed),
+                so any simulation can be reproduced on its own, on any
+                worker or node.
+            agent_streams: bool
+                If True, agents' randomness comes from counter-based
+                streams keyed by seed and agent id, so results do not
+                depend on agents order (only 'array' engine).
+            common_random_numbers: bool
+                If True, simulation number r of every scenario uses the
+                same seed (see COMMON_SCENARIO) and agents' streams are
+                mapped to categories by inverse CDF, so results of
+                scenarios differ only in decisions drawn from changed
+                distributions and differences between scenarios need
+                far fewer simulations. Needs agent_streams.
+            num_shards: int
+                Number of shards of population of each simulation. Shards
+                are simulated in parallel by pool workers and their
+                results are merged, so a single simulation can use many
+                cores. Needs agent_streams, so merged results are the same
+                as results of not sharded simulation.
+            changes: List
+                Scenario as list of [dist_name-up/down, value] (e.g.
+                ['decision_tree/household_cars_dist-down', 0.1]), applied
+                in memory to distributions from in_dir_path (see
+                apply_scenario).
+            outputs: Sequence[str]
+                Results saved for each simulation (see OUTPUTS):
+                'agents', 'travels' (every performed travel) and
+                'aggregates' (counts of travels by origin, destination,
+                transport mode and hour, mode shares by hour and
+                production of regions, updated during simulation, so
+                travels do not have to be saved to get them).
+            results_format: str
+                'pickle' - pickled DataFrames,
+                'parquet' - compressed Parquet datasets partitioned by
+                scenario and replicate, with dictionary encoded categories
+                and compact integer columns (needs pyarrow).
+            precision: Dict[str, float]
+                If given, simulations are run in batches of batch_size
+                until the largest half-width of confidence intervals of
+                means of each given metric (see METRICS_AXES, e.g.
+                {'mode_share': 0.005, 'region_mode_share': 0.05}) is not
+                greater than its precision, but at least min_simulations
+                and at most num_simulations simulations. Needs 'travels'
+                or 'aggregates' output.
+            confidence: float
+                Confidence level of intervals checked against precision.
+            cache_dir: str
+                If given, population, schedules and trips of simulations
+                are cached in this folder keyed by hash of their input
+                distributions and seed (see StageCache), so a simulation
+                recomputes only stages whose inputs changed. With
+                common_random_numbers, simulation number r of scenarios
+                which change only transport mode inputs distributions
+                reuses trips of any of them. Needs agent_streams.
+            verbose: bool
+                If True, half-widths of confidence intervals are printed
+                after each batch of simulations (with precision).
+
+        Returns
+        -------
+            num_done: int
+                Number of simulations run.
     """
 
-    def flatten_dist(data,prev_keys=list(), sep="", lvl=0, max_level=1, normal=False):
-        if lvl == max_level:
-            return [
-                (sep.join(prev_keys),
-                ((np.array(list(data.keys())), np.array(list(data.values())))) if not normal else data)
-            ]
-        return [
-            (flat_key, flay_val) 
-            for key, value in data.items() 
-            for flat_key, flay_val in flatten_dist(value, [*prev_keys, key], sep, lvl + 1, max_level, normal)
-        ]
-
-    def load_dist(name, in_dir='out'):
-        file_name = name if name.endswith('.json') else (name + '.json')
-        file_path = os.path.join(in_dir, file_name)
-
-        with open(file_path, 'r') as f:
-            return json.load(f)
-            
-
-    # Demography distributions
-    data_dir = in_dir_path + '/demography/'
-
-    data_file = 'population_dist.json'
-    population_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=0)[0][1]
-
-    data_file = 'demography_dist.json'
-    demography_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=0)[0][1]
-
-    # Decision tree distributions
-    data_dir = in_dir_path + '/decision_tree/'
-
-    data_file = 'pub_trans_comfort_dist.json'
-    pub_trans_comfort_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
-
-    data_file = 'pub_trans_punctuality_dist.json'
-    pub_trans_punctuality_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
-
-    data_file = 'bicycle_infrastr_comfort_dist.json'
-    bicycle_infrastr_comfort_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
-
-    data_file = 'pedestrian_inconvenience_dist.json'
-    pedestrian_inconvenience_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    assert engine in ENGINES
+    assert set(outputs) <= set(OUTPUTS)
+    assert results_format in RESULTS_FORMATS
+    assert num_shards == 1 or agent_streams
+    assert not common_random_numbers or agent_streams
+    assert cache_dir is None or agent_streams
+    assert precision is None or (
+        set(precision) <= set(METRICS_AXES)
+        and ('travels' in outputs or 'aggregates' in outputs)
+    )
 
-    data_file = 'household_persons_dist.json'
-    household_persons_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    params = apply_scenario(
+        load_params(
+            in_dir_path=in_dir_path,
+            num_agents=num_agents,
+            sim_start_time=sim_start_time,
+            sim_step_time=sim_step_time,
+            sim_end_time=sim_end_time,
+            event_driven=event_driven,
+            agent_streams=agent_streams,
+            aggregate='aggregates' in outputs,
+            common_random_numbers=common_random_numbers,
+            cache_dir=cache_dir
+        ),
+        changes
+    )
 
-    data_file = 'household_cars_dist.json'
-    household_cars_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    shards = [
+        (int(shard_agents[0]), len(shard_agents))
+        for shard_agents in np.array_split(np.arange(num_agents), num_shards)
+        if len(shard_agents) > 0
+    ]
+    metrics_names = tuple(precision or ())
+    num_hours = get_num_hours(sim_end_time)
+    seeds_scenario = COMMON_SCENARIO if common_random_numbers else scenario
+
+    # params are passed to each worker once (inherited through fork where
+    # available), so tasks carry only seed, simulation number and output
+    # path instead of pickled distributions
+    with Pool(
+        num_processes,
+        initializer=_init_worker,
+        initargs=(params, engine, outputs, results_format)
+    ) as p:
+        if precision is None:
+            for _ in _run_simulations(
+                p, range(1, num_simulations+1), seed, seeds_scenario,
+                scenario, shards, out_dir_path, results_format,
+                metrics_names, num_hours
+            ):
+                pass
+
+            return num_simulations
+
+        # simulations are run in batches until means of all metrics are
+        # precise enough
+        moments = {}
+        num_done = 0
+        while num_done < num_simulations:
+            run_nums = range(
+                num_done+1, min(num_done + batch_size, num_simulations)+1
+            )
+            for metrics in _run_simulations(
+                p, run_nums, seed, seeds_scenario, scenario, shards,
+                out_dir_path, results_format, metrics_names, num_hours
+            ):
+                for name, values in metrics.items():
+                    moments.setdefault(name, Welford(values.shape))
+                    moments[name].add(values)
+            num_done = run_nums[-1]
+
+            half_widths = {
+                name: get_ci_half_width(moments[name], confidence)
+                for name in precision
+            }
+            if verbose:
+                print(
+                    f'{num_done} simulations done, CI half-widths: '
+                    + ', '.join(
+                        f'{name} {half_width:.4g} '
+                        f'(target {precision[name]:g})'
+                        for name, half_width in half_widths.items()
+                    ),
+                    flush=True
+                )
+            if num_done >= min_simulations and all(
+                half_widths[name] <= precision[name] for name in precision
+            ):
+                break
+
+        return num_done
+
+
+def _run_simulations(
+    p: Pool,
+    run_nums: Sequence[int],
+    seed: int,
+    seeds_scenario: Union[int, str],
+    scenario: Union[int, str],
+    shards: List[Tuple[int, int]],
+    out_dir_path: str,
+    results_format: str,
+    metrics_names: Tuple[str, ...],
+    num_hours: int
+) -> Iterator[Optional[Dict[str, np.ndarray]]]:
+    # runs simulations with given numbers on pool p, saves their results
+    # and yields their metrics (None if metrics_names is empty) over
+    # num_hours hours, seeds are keyed by seeds_scenario
+    if len(shards) == 1:
+        yield from p.imap(
+            run_single,
+            [
+                (
+                    get_replicate_seed(seed, seeds_scenario, run_num),
+                    scenario,
+                    run_num,
+                    out_dir_path,
+                    metrics_names,
+                    num_hours
+                )
+                for run_num in run_nums
+            ]
+        )
+        return
 
-    data_file = 'household_bicycles_dist.json'
-    household_bicycles_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    shards_tasks = [
+        (
+            get_replicate_seed(seed, seeds_scenario, run_num),
+            first_agent_id,
+            size
+        )
+        for run_num in run_nums
+        for first_agent_id, size in shards
+    ]
+    shards_results = p.imap(run_shard, shards_tasks)
+
+    # shards come in order of tasks, so results of each simulation are
+    # merged as soon as all its shards are done
+    for run_num in run_nums:
+        results = merge_shards_results([
+            next(shards_results) for _ in shards
+        ])
+        save_results(
+            results, scenario, run_num, out_dir_path, results_format
+        )
+        yield _select_metrics(results, metrics_names, num_hours)
 
-    # Travel planning distributions
-    data_dir = in_dir_path + '/travel_planning/'
 
-    data_file = 'any_travel_dist.json'
-    any_travel_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+def run_scenarios(
+    scenarios: List[Tuple[Union[int, str], str, str]],
+    num_agents: int = 635701,
+    sim_start_time: int = 4*60,
+    sim_step_time: int = 60,
+    sim_end_time: int = 24*60,
+    num_simulations: int = 100,
+    num_processes: int = 3,
+    engine: str = 'mesa',
+    event_driven: bool = False,
+    seed: int = GLOBAL_SEED,
+    agent_streams: bool = False,
+    outputs: Sequence[str] = ('agents', 'travels'),
+    results_format: str = 'pickle',
+    common_random_numbers: bool = False,
+    cache_dir: Optional[str] = None
+):
+    """
+    Runs num_simulations simulations of each of many scenarios on one
+    long-lived pool. All (scenario, simulation) jobs are put in a single
+    queue and handed out one by one to free workers, so workers do not
+    wait for the slowest simulation of a scenario before the next
+    scenario starts. Each worker keeps recently used base distributions
+    loaded (see SCENARIOS_CACHE_SIZE) and derives parameters of scenarios
+    from them in memory (see apply_scenario). Throughput is printed after
+    each finished simulation.
 
-    data_file = 'travel_chains_dist.json'
-    travel_chains_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+        Parameters
+        ----------
+            scenarios: List[Tuple[int or str, str, str, List]]
+                List of (scenario, in_dir_path, out_dir_path, changes),
+                where scenario is scenario number or name (keys seeds,
+                see run), in_dir_path is folder of base distributions,
+                out_dir_path is folder of results and changes is list of
+                [dist_name-up/down, value] (see run). With 'parquet'
+                results_format scenarios can share out_dir_path.
+            Other parameters are the same as in run.
+    """
 
-    data_file = 'start_hour_dist.json'
-    start_hour_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    assert engine in ENGINES
+    assert set(outputs) <= set(OUTPUTS)
+    assert results_format in RESULTS_FORMATS
+    assert not common_random_numbers or agent_streams
+    assert cache_dir is None or agent_streams
+
+    settings = {
+        'num_agents': num_agents,
+        'sim_start_time': sim_start_time,
+        'sim_step_time': sim_step_time,
+        'sim_end_time': sim_end_time,
+        'event_driven': event_driven,
+        'agent_streams': agent_streams,
+        'aggregate': 'aggregates' in outputs,
+        'common_random_numbers': common_random_numbers,
+        'cache_dir': cache_dir
+    }
 
-    data_file = 'other_travels_dist.json'
-    other_travels_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    jobs = [
+        (
+            scenario,
+            get_replicate_seed(
+                seed,
+                COMMON_SCENARIO if common_random_numbers else scenario,
+                i+1
+            ),
+            i+1,
+            in_dir_path,
+            changes,
+            out_dir_path
+        )
+        for scenario, in_dir_path, out_dir_path, changes in scenarios
+        for i in range(num_simulations)
+    ]
+
+    start_time = time.perf_counter()
+
+    with Pool(
+        num_processes,
+        initializer=_init_scenarios_worker,
+        initargs=(settings, engine, outputs, results_format)
+    ) as p:
+        for num_done, (scenario, run_num) in enumerate(
+            p.imap_unordered(run_scenario_job, jobs),
+            start=1
+        ):
+            elapsed = time.perf_counter() - start_time
+            sims_per_hour = num_done / elapsed * 3600
+            eta = (len(jobs) - num_done) * elapsed / num_done
+
+            print(
+                f'{num_done}/{len(jobs)} simulations done '
+                f'(scenario {scenario}, simulation {run_num}), '
+                f'{sims_per_hour:.1f} simulations/h, '
+                f'{num_done * num_agents / elapsed:.0f} agents/s, '
+                f'ETA {eta / 60:.1f} min',
+                flush=True
+            )
+
+
+def run_queue(
+    queue_path: str,
+    prepare_scenario: Callable[[Job], Tuple[str, str, List]],
+    num_agents: int = 635701,
+    sim_start_time: int = 4*60,
+    sim_step_time: int = 60,
+    sim_end_time: int = 24*60,
+    num_processes: int = 3,
+    engine: str = 'mesa',
+    event_driven: bool = False,
+    seed: int = GLOBAL_SEED,
+    agent_streams: bool = False,
+    lease_timeout: float = 600.,
+    outputs: Sequence[str] = ('agents', 'travels'),
+    results_format: str = 'pickle',
+    common_random_numbers: bool = False,
+    cache_dir: Optional[str] = None
+):
+    """
+    Runs num_processes workers which lease (scenario, replicate) jobs
+    from JobQueue until there are no pending jobs. Any number of such
+    workers (e.g. one per container or node) can share one queue.
 
-    data_file = 'spend_time_dist_params.json'
-    spend_time_dist_params = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=2, normal=True)
+        Parameters
+        ----------
+            queue_path: str
+                Path to JobQueue SQLite file.
+            prepare_scenario: Callable[[Job], Tuple[str, str, List]]
+                Picklable function returning (in_dir_path, out_dir_path,
+                changes) of job's scenario (as in run_scenarios).
+            lease_timeout: float
+                Seconds after which job of a worker which stopped sending
+                heartbeats is given to another worker.
+            Other parameters are the same as in run (job's scenario and
+            replicate key its seed).
+    """
 
-    data_file = 'trip_cancel_prob.json'
-    trip_cancel_prob = load_dist(name=data_file, in_dir=data_dir)
+    assert engine in ENGINES
+    assert set(outputs) <= set(OUTPUTS)
+    assert results_format in RESULTS_FORMATS
+    assert not common_random_numbers or agent_streams
+    assert cache_dir is None or agent_streams
+
+    settings = {
+        'num_agents': num_agents,
+        'sim_start_time': sim_start_time,
+        'sim_step_time': sim_step_time,
+        'sim_end_time': sim_end_time,
+        'event_driven': event_driven,
+        'agent_streams': agent_streams,
+        'aggregate': 'aggregates' in outputs,
+        'common_random_numbers': common_random_numbers,
+        'cache_dir': cache_dir
+    }
 
-    data_file = 'gravity_dist.json'
-    gravity_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir), max_level=2)
+    workers = [
+        Process(
+            target=_run_queue_worker,
+            args=(
+                queue_path, prepare_scenario, settings, engine, seed,
+                lease_timeout, outputs, results_format
+            )
+        )
+        for _ in range(num_processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
 
-    data_file = 'drivers_dist.json'
-    drivers_dist = flatten_dist(load_dist(name=data_file, in_dir=data_dir))
+    queue = JobQueue(queue_path)
+    print('Jobs: ' + str(queue.counts()))
+    queue.close()
 
-    # Interregional distances and decision tree classifier
-    data_dir = in_dir_path.replace(in_dir_path.split('/')[-1], '')
 
-    # interregional distances
-    data_file = 'interregional_distances.json'
-    interregional_distances = load_dist(name=data_file, in_dir=data_dir)
+def _run_queue_worker(
+    queue_path, prepare_scenario, settings, engine, seed, lease_timeout,
+    outputs, results_format
+):
+    _init_scenarios_worker(settings, engine, outputs, results_format)
+
+    worker_id = get_worker_id()
+    queue = JobQueue(queue_path, lease_timeout=lease_timeout)
+    common_random_numbers = settings['common_random_numbers']
+
+    while True:
+        job = queue.lease(worker_id)
+        if job is None:
+            break
+
+        try:
+            with queue.keep_alive(job, worker_id):
+                in_dir_path, out_dir_path, changes = prepare_scenario(job)
+                run_scenario_job((
+                    job.scenario,
+                    get_replicate_seed(
+                        seed,
+                        COMMON_SCENARIO if common_random_numbers
+                        else job.scenario,
+                        job.replicate
+                    ),
+                    job.replicate,
+                    in_dir_path,
+                    changes,
+                    out_dir_path
+                ))
+        except Exception:
+            traceback.print_exc()
+            queue.release(job, worker_id)
+            continue
+
+        if queue.complete(job, worker_id):
+            print(
+                f'{worker_id} finished scenario {job.scenario}, '
+                f'simulation {job.replicate}',
+                flush=True
+            )
+
+    queue.close()
+
+
+def load_params(
+    in_dir_path: str,
+    num_agents: int,
+    sim_start_time: int,
+    sim_step_time: int,
+    sim_end_time: int,
+    event_driven: bool = False,
+    agent_streams: bool = False,
+    aggregate: bool = False,
+    common_random_numbers: bool = False,
+    cache_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Loads distributions from in_dir_path (see run) and returns model
+    parameters.
+    """
 
-    # decision tree
-    data_file = 'decision_tree.pickle'
-    data_path = os.path.join(data_dir, data_file)
-    with open(data_path, 'rb') as f:
-        decision_tree = pickle.load(f)
+    # distributions are compiled to binary bundle next to in_dir_path on
+    # first use (see load_distributions)
+    distributions = load_distributions(in_dir_path)
 
     params = {
         'N': num_agents,
-        'population_dist': population_dist,
-        'demography_dist': demography_dist,
-        'pub_trans_comfort_dist': pub_trans_comfort_dist,
-        'pub_trans_punctuality_dist': pub_trans_punctuality_dist,
-        'bicycle_infrastr_comfort_dist': bicycle_infrastr_comfort_dist,
-        'pedestrian_inconvenience_dist': pedestrian_inconvenience_dist,
-        'household_persons_dist': household_persons_dist,
-        'household_cars_dist': household_cars_dist,
-        'household_bicycles_dist': household_bicycles_dist,
-        'any_travel_dist': any_travel_dist,
-        'travel_chains_dist': travel_chains_dist,
-        'start_hour_dist': start_hour_dist,
-        'other_travels_dist': other_travels_dist,
-        'spend_time_dist_params': spend_time_dist_params,
-        'trip_cancel_prob': trip_cancel_prob,
-        'decision_tree': decision_tree,
-        'gravity_dist': gravity_dist,
-        'drivers_dist': drivers_dist,
-        'interregional_distances': interregional_distances,
+        **distributions,
         'start_time': sim_start_time,
         'step_time': sim_step_time,
         'end_time': sim_end_time,
+        'event_driven': event_driven,
+        'agent_streams': agent_streams,
+        'aggregate': aggregate,
+        'common_random_numbers': common_random_numbers,
+        'stage_cache': None if cache_dir is None else StageCache(cache_dir)
     }
 
-    with Pool(num_processes) as p:
-        p.map(
-            run_single,
-            [[params, i+1, out_dir_path] for i in range(num_simulations)]
-        )
+    return params
+
+
+def _init_worker(params, engine, outputs, results_format):
+    global _worker_params, _worker_engine, _worker_outputs, \
+        _worker_results_format
 
+    _worker_params = params
+    _worker_engine = engine
+    _worker_outputs = outputs
+    _worker_results_format = results_format
 
-def run_single(params):
-    model_params, run_num, out_dir_path = params
-    model = TrafficModel(**model_params)
+
+def simulate(
+    model_params: Dict[str, Any],
+    engine: str,
+    seed: np.random.SeedSequence,
+    outputs: Sequence[str] = ('agents', 'travels')
+) -> Dict[str, Any]:
+    model = ENGINES[engine](**model_params, seed=seed)
 
     for _ in range(
         model_params['start_time'],
@@ -191,25 +625,127 @@ def run_single(params):
     ):
         model.step()
 
-    agents_results = model.agent_data_collector.get_agent_vars_dataframe()
-    travels_results = model.travels_data_collector.get_agent_vars_dataframe()
-    travels_results = explode(
-        travels_results[travels_results['start_region'].astype(str) != '[]'],
-        [
-            'start_region', 'start_place_type', 'dest_region',
-            'dest_place_type', 'travel_start_time', 'dest_activity_dur_time',
-            'transport_mode', 'is_driver'
-        ],
-        fill_value=''
+    results = {}
+    if 'agents' in outputs:
+        results['agents'] = model.get_agents_results()
+    if 'travels' in outputs:
+        results['travels'] = model.get_travels_results()
+    if 'aggregates' in outputs:
+        results['aggregates'] = model.get_trip_aggregates()
+
+    return results
+
+
+def merge_shards_results(
+    shards_results: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Merges results of population shards of a simulation (in order of
+    agents' ids): tables are concatenated and aggregates are summed.
+    """
+
+    results = {}
+
+    for name in shards_results[0]:
+        values = [shard_results[name] for shard_results in shards_results]
+        if name == 'aggregates':
+            results[name] = reduce(TripAggregates.merge, values)
+        elif name == 'agents':
+            results[name] = pd.concat(values)
+        else:
+            results[name] = pd.concat(values, ignore_index=True)
+
+    return results
+
+
+def _select_metrics(results, metrics_names, num_hours):
+    if len(metrics_names) == 0:
+        return None
+
+    metrics, _ = get_results_metrics(results, num_hours)
+
+    return {name: metrics[name] for name in metrics_names}
+
+
+def run_single(task):
+    seed, scenario, run_num, out_dir_path, metrics_names, num_hours = task
+
+    results = simulate(_worker_params, _worker_engine, seed, _worker_outputs)
+    save_results(
+        results, scenario, run_num, out_dir_path, _worker_results_format
     )
 
-    if not os.path.exists(out_dir_path):
-        os.makedirs(out_dir_path)
+    # only metrics needed by run are sent back from worker
+    return _select_metrics(results, metrics_names, num_hours)
+
+
+def run_shard(task):
+    seed, first_agent_id, num_agents = task
+
+    return simulate(
+        {**_worker_params, 'N': num_agents, 'first_agent_id': first_agent_id},
+        _worker_engine,
+        seed,
+        _worker_outputs
+    )
+
+
+def _init_scenarios_worker(settings, engine, outputs, results_format):
+    global _worker_settings, _worker_engine, _worker_outputs, \
+        _worker_results_format, _worker_scenarios
+
+    _worker_settings = settings
+    _worker_engine = engine
+    _worker_outputs = outputs
+    _worker_results_format = results_format
+    _worker_scenarios = OrderedDict()
+
+
+def _get_base_params(in_dir_path):
+    # LRU cache of base model parameters used by this worker
+    if in_dir_path in _worker_scenarios:
+        _worker_scenarios.move_to_end(in_dir_path)
+    else:
+        _worker_scenarios[in_dir_path] = load_params(
+            in_dir_path=in_dir_path, **_worker_settings
+        )
+        if len(_worker_scenarios) > SCENARIOS_CACHE_SIZE:
+            _worker_scenarios.popitem(last=False)
+
+    return _worker_scenarios[in_dir_path]
+
+
+def run_scenario_job(task):
+    scenario, seed, run_num, in_dir_path, changes, out_dir_path = task
+
+    results = simulate(
+        apply_scenario(_get_base_params(in_dir_path), changes),
+        _worker_engine,
+        seed,
+        _worker_outputs
+    )
+    save_results(
+        results, scenario, run_num, out_dir_path, _worker_results_format
+    )
+
+    return scenario, run_num
+
+
+def save_results(
+    results, scenario, run_num, out_dir_path, results_format='pickle'
+):
+    results = dict(results)
+    if 'aggregates' in results:
+        results.update(results.pop('aggregates').get_results())
+
+    if results_format == 'parquet':
+        save_parquet_results(results, scenario, run_num, out_dir_path)
+        return
 
-    file_name = 'agents_results_' + str(run_num) + '.pkl'
-    out_file = os.path.join(out_dir_path, file_name)
-    agents_results.to_pickle(out_file)
+    # many workers save replicates of one scenario at the same time
+    os.makedirs(out_dir_path, exist_ok=True)
 
-    file_name = 'travels_results_' + str(run_num) + '.pkl'
-    out_file = os.path.join(out_dir_path, file_name)
-    travels_results.to_pickle(out_file)
+    for name, table in results.items():
+        file_name = name + '_results_' + str(run_num) + '.pkl'
+        out_file = os.path.join(out_dir_path, file_name)
+        table.to_pickle(out_file)
@@ -1,20 +1,207 @@
-from typing import Any, Dict, List, Tuple
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # import geopandas as gpd
 import numpy as np
 from numpy.random import default_rng, MT19937
 
 
-from .data_models import ScheduleElement, TransportModeInputs
+from .data_models import (MISSING_INPUT, Population, ScheduleElement,
+                          Schedules, TransportModeInputs)
+from .streams import (AGE_SEX_STREAM, ANY_TRAVEL_STREAM, HOME_REGION_STREAM,
+                      OTHER_TRAVEL_STREAM, SPEND_TIME_STREAM,
+                      START_HOUR_STREAM, START_MINUTES_STREAM,
+                      TRANSPORT_MODE_INPUTS_STREAM, TRAVEL_CHAIN_STREAM,
+                      TRIP_CANCEL_STREAM, AgentRandomStreams)
+from .vocabulary import Vocabularies, Vocabulary
 
 
 GLOBAL_SEED = 2137
+# used only by samplers created without their own generator (models pass
+# generator of the replicate to all samplers)
 GLOBAL_RNG = default_rng(MT19937(GLOBAL_SEED))
 RNG_BUFFER = 32
 
+AGE_MAPPING = {
+    "0-5": 0,
+    "6-15_K": 0,
+    "6-15_M": 0,
+    "16-19_K": 1,
+    "16-19_M": 1,
+    "20-24_K": 2,
+    "20-24_M": 2,
+    "25-44_K": 3,
+    "25-44_M": 3,
+    "45-60_K": 4,
+    "45-65_M": 4,
+    "61-x_K": 5,
+    "66-x_M": 5
+}
+
 
 DistributionFloatTuple = Tuple[List[str], List[float]]
 
+
+def get_replicate_seed(
+    root_seed: int,
+    scenario: Union[int, str],
+    replicate: int
+) -> np.random.SeedSequence:
+    """
+    Returns seed of given replicate of given scenario. It is the node of
+    SeedSequence(root_seed) spawn tree at path (scenario, replicate), so
+    it does not depend on order of simulations or on worker running it.
+
+    Parameters
+    ----------
+        root_seed: int
+            Seed of all simulations.
+        scenario: int or str
+            Scenario number or name (names are hashed to stable ints).
+        replicate: int
+            Replicate number.
+
+    Returns
+    -------
+        seed: np.random.SeedSequence
+    """
+
+    if isinstance(scenario, str):
+        scenario = int.from_bytes(
+            hashlib.sha256(scenario.encode('utf-8')).digest()[:8], 'little'
+        )
+
+    return np.random.SeedSequence(root_seed, spawn_key=(scenario, replicate))
+
+
+class AliasTable:
+    """
+    Precompiled discrete distribution (Walker/Vose alias method). Tables
+    are built once and every next sample is drawn in O(1) time. Cumulative
+    probabilities are kept too, for monotone inverse CDF mapping of
+    uniform numbers (see sample_from_uniforms).
+    """
+
+    def __init__(
+        self,
+        probs: List[float]
+    ):
+        """
+        Constructs AliasTable for given probabilities.
+
+        Parameters
+        ----------
+            probs : list
+                Probabilities of selecting elements. They are normalized
+                before building the table.
+        """
+
+        probs = np.asarray(probs, dtype=np.float64)
+        size = len(probs)
+
+        scaled_probs = probs * (size / np.sum(probs))
+        self.prob = np.ones(size, dtype=np.float64)
+        self.alias = np.arange(size, dtype=np.intp)
+
+        small = np.nonzero(scaled_probs < 1.)[0].tolist()
+        large = np.nonzero(scaled_probs >= 1.)[0].tolist()
+        scaled_probs = scaled_probs.tolist()
+
+        while small and large:
+            small_idx = small.pop()
+            large_idx = large.pop()
+
+            self.prob[small_idx] = scaled_probs[small_idx]
+            self.alias[small_idx] = large_idx
+
+            scaled_probs[large_idx] = (
+                scaled_probs[large_idx] + scaled_probs[small_idx] - 1.
+            )
+            if scaled_probs[large_idx] < 1.:
+                small.append(large_idx)
+            else:
+                large.append(large_idx)
+
+        # remaining columns (also numerical leftovers) are always selected
+        # by themselves - their probs are already set to 1
+
+        self.size = size
+
+        # last cumulative probability is exactly 1, so every number from
+        # [0, 1) falls into some element (never into one with zero prob)
+        self.cdf = np.cumsum(probs)
+        self.cdf /= self.cdf[-1]
+
+    def sample(
+        self,
+        rng: np.random.Generator,
+        size: int
+    ) -> np.ndarray:
+        """
+        Sample indices of elements.
+
+        Parameters
+        ----------
+            rng : np.random.Generator
+                Random numbers generator.
+            size : int
+                Number of samples.
+
+        Returns
+        -------
+            indices : np.ndarray
+                Indices of sampled elements.
+        """
+
+        return self.sample_from_uniforms(rng.random(size))
+
+    def sample_from_uniforms(
+        self,
+        uniforms: np.ndarray,
+        inverse_cdf: bool = False
+    ) -> np.ndarray:
+        """
+        Map uniform [0, 1) numbers to indices of elements. Integer part of
+        scaled number selects column and fractional part decides between
+        column and its alias.
+
+        With inverse_cdf, number u selects the first element whose
+        cumulative probability is greater than u (O(log n) binary search).
+        This mapping is monotone, so a small change of probabilities
+        changes samples of only a small share of numbers, while alias
+        columns of a changed table may be paired in a different way (see
+        AgentRandomStreams.inverse_cdf).
+
+        Parameters
+        ----------
+            uniforms : np.ndarray
+                Numbers from uniform [0, 1) distribution.
+            inverse_cdf : bool
+                If True, inverse CDF mapping is used instead of the alias
+                table.
+
+        Returns
+        -------
+            indices : np.ndarray
+                Indices of sampled elements.
+        """
+
+        if inverse_cdf:
+            return np.minimum(
+                np.searchsorted(self.cdf, uniforms, side='right'),
+                self.size - 1
+            )
+
+        scaled = uniforms * self.size
+        columns = np.minimum(scaled.astype(np.intp), self.size - 1)
+
+        return np.where(
+            scaled - columns < self.prob[columns],
+            columns,
+            self.alias[columns]
+        )
+
+
 class BaseSampler:
     """
     Sampler class to select some object for given distribution.
@@ -24,6 +211,7 @@ class BaseSampler:
         self,
         prob_dist: Tuple[List[Any], List[float]],
         num_samples: int = RNG_BUFFER,
+        rng: Optional[np.random.Generator] = None
     ):
         """
         Constructs BaseSampler with given probability distribution.
@@ -33,16 +221,20 @@ class BaseSampler:
             prob_dist : dict
                 Dictionary {object_id: T : probability: float} contains
                 probabilities of selecting elements.
+            rng : np.random.Generator
+                Random numbers generator (GLOBAL_RNG if not given).
         """
 
         self.object_ids_samples = None
-        self.object_ids = prob_dist[0]
+        self.object_ids = np.asarray(prob_dist[0])
         self.probs = prob_dist[1]
-        self.rng = GLOBAL_RNG
+        self.alias_table = AliasTable(self.probs)
+        self.rng = GLOBAL_RNG if rng is None else rng
         self.counter = 0
         self.num_samples = num_samples
 
-        # assert 0.99 < np.around(np.sum(self.probs), decimals=2) <= 1
+        # probabilities are validated and normalized when distributions
+        # bundle is compiled (see bundle.validate_distributions)
 
     
     def __call__(
@@ -58,17 +250,162 @@ class BaseSampler:
 
         if self.counter % self.num_samples == 0:
             self.counter = self.counter % self.num_samples
-            self.object_ids_samples = self.rng.choice(
-                self.object_ids,
-                size=self.num_samples,
-                p=self.probs
-            )
+            self.object_ids_samples = self.object_ids[
+                self.alias_table.sample(self.rng, self.num_samples)
+            ]
         
         value = self.object_ids_samples[self.counter]
         self.counter = self.counter + 1
 
         return value
 
+    def sample(
+        self,
+        size: int
+    ) -> np.ndarray:
+        """
+        Sample many objects at once, bypassing the samples buffer.
+
+        Parameters
+        ----------
+            size : int
+                Number of samples.
+
+        Returns
+        -------
+            object_ids : np.ndarray
+        """
+
+        return self.object_ids[self.alias_table.sample(self.rng, size)]
+
+    def sample_from_uniforms(
+        self,
+        uniforms: np.ndarray,
+        inverse_cdf: bool = False
+    ) -> np.ndarray:
+        """
+        Map uniform [0, 1) numbers (e.g. from AgentRandomStreams) to
+        objects.
+
+        Parameters
+        ----------
+            uniforms : np.ndarray
+                Numbers from uniform [0, 1) distribution.
+            inverse_cdf : bool
+                If True, inverse CDF mapping is used (see
+                AliasTable.sample_from_uniforms).
+
+        Returns
+        -------
+            object_ids : np.ndarray
+        """
+
+        return self.object_ids[
+            self.alias_table.sample_from_uniforms(uniforms, inverse_cdf)
+        ]
+
+
+class StackedSampler:
+    """
+    BaseSamplers of one kind (e.g. destination region samplers of all
+    (dest_type, start_region) pairs) stacked into flat alias arrays, so
+    objects for many different keys are sampled with a single call.
+    """
+
+    def __init__(
+        self,
+        samplers: Dict[Any, BaseSampler]
+    ):
+        """
+        Constructs StackedSampler.
+
+        Parameters
+        ----------
+            samplers: dict
+                Dictionary {key: int or Tuple[int, ...] : sampler} of
+                samplers keyed by (tuples of) category codes.
+        """
+
+        keys = list(samplers)
+        keys_array = np.array(keys, dtype=np.int64).reshape(len(keys), -1)
+
+        # dense index of samplers keyed by codes (-1 means no sampler)
+        self.table_index = np.full(
+            tuple(keys_array.max(axis=0) + 1), -1, dtype=np.int64
+        )
+        self.table_index[tuple(keys_array.T)] = np.arange(len(keys))
+
+        alias_tables = [samplers[key].alias_table for key in keys]
+        self.sizes = np.array(
+            [alias_table.size for alias_table in alias_tables],
+            dtype=np.int64
+        )
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+        self.prob = np.concatenate(
+            [alias_table.prob for alias_table in alias_tables]
+        )
+        self.alias = np.concatenate([
+            alias_table.alias + offset
+            for alias_table, offset in zip(alias_tables, self.offsets)
+        ])
+        self.object_ids = np.concatenate(
+            [samplers[key].object_ids for key in keys]
+        )
+        # cumulative probabilities of i-th table are shifted by i, so one
+        # sorted array is searched for all keys at once
+        self.cdf = np.concatenate([
+            alias_table.cdf + i
+            for i, alias_table in enumerate(alias_tables)
+        ])
+
+    def sample_from_uniforms(
+        self,
+        keys: Union[np.ndarray, Tuple[np.ndarray, ...]],
+        uniforms: np.ndarray,
+        inverse_cdf: bool = False
+    ) -> np.ndarray:
+        """
+        Samples one object for every key, the same as
+        samplers[key].sample_from_uniforms would do.
+
+        Parameters
+        ----------
+            keys: np.ndarray or Tuple[np.ndarray, ...]
+                Keys codes (tuple of codes arrays for tuple keys).
+            uniforms: np.ndarray
+                Numbers from uniform [0, 1) distribution.
+            inverse_cdf: bool
+                If True, inverse CDF mapping is used (see
+                AliasTable.sample_from_uniforms).
+
+        Returns
+        -------
+            object_ids : np.ndarray
+        """
+
+        tables = self.table_index[keys]
+        if np.any(tables < 0):
+            raise KeyError('No sampler for some of given keys.')
+
+        if inverse_cdf:
+            # shifted numbers may be rounded up to the next table's range
+            elements = np.minimum(
+                np.searchsorted(self.cdf, tables + uniforms, side='right'),
+                self.offsets[tables] + self.sizes[tables] - 1
+            )
+            return self.object_ids[elements]
+
+        sizes = self.sizes[tables]
+        scaled = uniforms * sizes
+        columns = np.minimum(scaled.astype(np.intp), sizes - 1)
+        elements = self.offsets[tables] + columns
+
+        return self.object_ids[np.where(
+            scaled - columns < self.prob[elements],
+            elements,
+            self.alias[elements]
+        )]
+
 
 class BaseNormalSampler:
     """
@@ -79,7 +416,8 @@ class BaseNormalSampler:
         self,
         loc: int,
         scale: int,
-        min_value: int
+        min_value: int,
+        rng: Optional[np.random.Generator] = None
     ):
         """
         Constructs NormalSampler with given params.
@@ -93,6 +431,8 @@ class BaseNormalSampler:
             min_value: int
                 Minimal output value. If sampled value is less than
                 min_value then min_value is returned.
+            rng: np.random.Generator
+                Random numbers generator (GLOBAL_RNG if not given).
         """
 
         assert scale >= 0
@@ -101,7 +441,7 @@ class BaseNormalSampler:
         self.scale = scale
         self.min_value = min_value
         self.samples = None
-        self.rng = GLOBAL_RNG
+        self.rng = GLOBAL_RNG if rng is None else rng
         self.counter = 0
 
     def __call__(self) -> int:
@@ -130,18 +470,22 @@ class BaseNormalSampler:
 
 class RegionSampler(BaseSampler):
     """
-    Sampler class to select region for given distribution.
+    Sampler class to select region for given distribution. Sampled
+    regions are codes from given region vocabulary.
     """
 
     def __init__(
         self,
         prob_dist: DistributionFloatTuple,
-        num_samples: int = RNG_BUFFER
+        vocabulary: Vocabulary,
+        num_samples: int = RNG_BUFFER,
+        rng: Optional[np.random.Generator] = None
     ):
         BaseSampler.__init__(
             self,
-            prob_dist,
-            num_samples
+            (vocabulary.encode(prob_dist[0]), prob_dist[1]),
+            num_samples,
+            rng
         )
 
 
@@ -149,18 +493,22 @@ class AgeSexSampler(BaseSampler):
     """
     Sampler class to select age and sex combination for given distribution.
     Combinations are strings like: "0-5", "6-15_K", "6-15_M" ...
-    ... "45-60_K", "45-65_M", "61-x_K", "66-x_M".
+    ... "45-60_K", "45-65_M", "61-x_K", "66-x_M". Sampled combinations
+    are codes from given age and sex vocabulary.
     """
 
     def __init__(
         self,
         prob_dist: DistributionFloatTuple,
-        num_samples: int = RNG_BUFFER
+        vocabulary: Vocabulary,
+        num_samples: int = RNG_BUFFER,
+        rng: Optional[np.random.Generator] = None
     ):
         BaseSampler.__init__(
             self,
-            prob_dist,
-            num_samples
+            (vocabulary.encode(prob_dist[0]), prob_dist[1]),
+            num_samples,
+            rng
         )
 
 
@@ -180,7 +528,9 @@ class TransportModeInputsSampler:
         household_persons_dist: List[Tuple[str, DistributionFloatTuple]],
         household_cars_dist: List[Tuple[str, DistributionFloatTuple]],
         household_bicycles_dist: List[Tuple[str, DistributionFloatTuple]],
-        num_samples: int = RNG_BUFFER
+        age_sex_vocabulary: Vocabulary,
+        num_samples: int = RNG_BUFFER,
+        rng: Optional[np.random.Generator] = None
     ):
         """
         Constructs TransportModeInputsSampler with given probability
@@ -237,86 +587,79 @@ class TransportModeInputsSampler:
                 }
                 contains probabilities for household_bicycles input.
                 Sampled household_bicycles will be converted to int.
+            age_sex_vocabulary: Vocabulary
+                Vocabulary of age and sex combinations. Samplers are kept
+                by combination codes.
             num_samples: int
                 Number of actors to somehow adjust BaseSampler
+            rng: np.random.Generator
+                Random numbers generator of all inputs samplers.
         """
 
         approx_num_samples = num_samples // 12
+        self.age_sex_vocabulary = age_sex_vocabulary
 
         self.pub_trans_comfort_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in pub_trans_comfort_dist
         }
 
         self.pub_trans_punctuality_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in pub_trans_punctuality_dist
         }
 
         self.bicycle_infrastr_comfort_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in bicycle_infrastr_comfort_dist
         }
 
         self.pedestrian_inconvenience_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in pedestrian_inconvenience_dist
         }
 
         self.household_persons_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in household_persons_dist
         }
 
         self.household_cars_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in household_cars_dist
         }
 
         self.household_bicycles_samplers = {
-            age_sex: BaseSampler((input_dist[0].astype(np.int), input_dist[1]), approx_num_samples)
+            age_sex_vocabulary.add(age_sex): BaseSampler((input_dist[0].astype(np.int64), input_dist[1]), approx_num_samples, rng)
             for age_sex, input_dist in household_bicycles_dist
         }
 
     
     def __call__(
         self,
-        age_sex: str
+        age_sex: int
     ) -> TransportModeInputs:
         """
         Samples and returns TransportModeInputs
 
         Parameters
         ----------
-            age_sex: str
-                Age and sex combination string like "0-5", "16-19_K"...
-                Age from this string will be mapped to int 0-5 value.
+            age_sex: int
+                Code of age and sex combination string like "0-5",
+                "16-19_K"... Age from this string will be mapped to int
+                0-5 value.
 
         Returns
         -------
             input_values: TransportModeInputs
         """
 
-        age_mapping = {
-            "0-5": 0,
-            "6-15_K": 0,
-            "6-15_M": 0,
-            "16-19_K": 1,
-            "16-19_M": 1,
-            "20-24_K": 2,
-            "20-24_M": 2,
-            "25-44_K": 3,
-            "25-44_M": 3,
-            "45-60_K": 4,
-            "45-65_M": 4,
-            "61-x_K": 5,
-            "66-x_M": 5
-        }
+        age_sex_category = self.age_sex_vocabulary.categories[age_sex]
 
-        if age_sex != "0-5":
+        if age_sex_category != "0-5":
 
             input_values = TransportModeInputs(
-                age=age_mapping[age_sex],
+                age=AGE_MAPPING[age_sex_category],
                 pub_trans_comfort= self.pub_trans_comfort_samplers[age_sex](),
                 pub_trans_punctuality=self.pub_trans_punctuality_samplers[age_sex](),
                 bicycle_infrastr_comfort=self.bicycle_infrastr_comfort_samplers[age_sex](),
@@ -329,7 +672,7 @@ class TransportModeInputsSampler:
         else:
 
             input_values = TransportModeInputs(
-                age=age_mapping[age_sex],
+                age=AGE_MAPPING[age_sex_category],
                 pub_trans_comfort=None,
                 pub_trans_punctuality=None,
                 bicycle_infrastr_comfort=None,
@@ -341,6 +684,233 @@ class TransportModeInputsSampler:
 
         return input_values
 
+    def sample(
+        self,
+        age_sex: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Samples TransportModeInputs values for many agents at once. Agents
+        are grouped by age_sex and every input is drawn for whole group
+        with a single call.
+
+        Parameters
+        ----------
+            age_sex: np.ndarray
+                Age and sex combination codes of agents.
+
+        Returns
+        -------
+            input_values: dict
+                Dictionary {input_name: str : values: np.ndarray} with
+                TransportModeInputs fields as keys. Agents from "0-5" group
+                have no inputs and get MISSING_INPUT values.
+        """
+
+        num_agents = len(age_sex)
+        input_values = {
+            name: np.full(num_agents, MISSING_INPUT, dtype=np.int64)
+            for name in TransportModeInputs.__dataclass_fields__
+        }
+
+        input_samplers = self._get_input_samplers()
+
+        for age_sex_value in np.unique(age_sex):
+            group = np.nonzero(age_sex == age_sex_value)[0]
+            age_sex_category = self.age_sex_vocabulary.categories[
+                age_sex_value
+            ]
+            input_values['age'][group] = AGE_MAPPING[age_sex_category]
+
+            if age_sex_category == "0-5":
+                continue
+
+            for name, samplers in input_samplers.items():
+                input_values[name][group] = samplers[age_sex_value].sample(
+                    len(group)
+                )
+
+        return input_values
+
+    def sample_from_streams(
+        self,
+        age_sex: np.ndarray,
+        agent_ids: np.ndarray,
+        streams: AgentRandomStreams
+    ) -> Dict[str, np.ndarray]:
+        """
+        Samples TransportModeInputs values for many agents at once using
+        agents' counter-based random streams (i-th input uses i-th number
+        of TRANSPORT_MODE_INPUTS_STREAM).
+
+        Parameters
+        ----------
+            age_sex: np.ndarray
+                Age and sex combination codes of agents.
+            agent_ids: np.ndarray
+                Agents ids.
+            streams: AgentRandomStreams
+                Agents' random streams.
+
+        Returns
+        -------
+            input_values: dict
+                The same as sample method result.
+        """
+
+        categories = np.array(self.age_sex_vocabulary.categories, dtype=object)
+        ages = np.array([
+            AGE_MAPPING.get(category, MISSING_INPUT) for category in categories
+        ], dtype=np.int64)
+
+        input_values = {
+            name: np.full(len(age_sex), MISSING_INPUT, dtype=np.int64)
+            for name in TransportModeInputs.__dataclass_fields__
+        }
+        input_values['age'] = ages[age_sex]
+
+        adults = np.flatnonzero(categories[age_sex] != "0-5")
+
+        for i, (name, samplers) in enumerate(
+            self._get_input_samplers().items()
+        ):
+            input_values[name][adults] = StackedSampler(
+                samplers
+            ).sample_from_uniforms(
+                age_sex[adults],
+                streams.uniforms(
+                    agent_ids[adults], TRANSPORT_MODE_INPUTS_STREAM, i
+                ),
+                streams.inverse_cdf
+            )
+
+        return input_values
+
+    def _get_input_samplers(self) -> Dict[str, Dict[int, BaseSampler]]:
+        return {
+            'pub_trans_comfort': self.pub_trans_comfort_samplers,
+            'pub_trans_punctuality': self.pub_trans_punctuality_samplers,
+            'bicycle_infrastr_comfort': self.bicycle_infrastr_comfort_samplers,
+            'pedestrian_inconvenience': self.pedestrian_inconvenience_samplers,
+            'household_persons': self.household_persons_samplers,
+            'household_cars': self.household_cars_samplers,
+            'household_bicycles': self.household_bicycles_samplers
+        }
+
+
+class PopulationSampler:
+    """
+    Sampler class to synthesize attributes of whole population at once.
+    """
+
+    def __init__(
+        self,
+        home_region_sampler: RegionSampler,
+        age_sex_sampler: AgeSexSampler,
+        transport_mode_inputs_sampler: TransportModeInputsSampler
+    ):
+        """
+        Constructs PopulationSampler with given samplers.
+
+        Parameters
+        ----------
+            home_region_sampler: RegionSampler
+                Sampler of agents' home regions.
+            age_sex_sampler: AgeSexSampler
+                Sampler of agents' age and sex combinations.
+            transport_mode_inputs_sampler: TransportModeInputsSampler
+                Sampler of agents' transport mode classifier inputs.
+        """
+
+        self.home_region_sampler = home_region_sampler
+        self.age_sex_sampler = age_sex_sampler
+        self.transport_mode_inputs_sampler = transport_mode_inputs_sampler
+
+    def __call__(
+        self,
+        num_agents: int
+    ) -> Population:
+        """
+        Samples attributes of num_agents agents.
+
+        Parameters
+        ----------
+            num_agents: int
+                Population size.
+
+        Returns
+        -------
+            population: Population
+                Columnar agents' attributes.
+        """
+
+        home_region = self.home_region_sampler.sample(num_agents)
+        age_sex = self.age_sex_sampler.sample(num_agents)
+
+        return Population(
+            home_region=home_region,
+            age_sex=age_sex,
+            **self.transport_mode_inputs_sampler.sample(age_sex)
+        )
+
+    def sample_from_streams(
+        self,
+        agent_ids: np.ndarray,
+        streams: AgentRandomStreams
+    ) -> Population:
+        """
+        Samples attributes of agents with given ids using their
+        counter-based random streams, so attributes of an agent do not
+        depend on other sampled agents.
+
+        Parameters
+        ----------
+            agent_ids: np.ndarray
+                Agents ids.
+            streams: AgentRandomStreams
+                Agents' random streams.
+
+        Returns
+        -------
+            population: Population
+                Columnar agents' attributes.
+        """
+
+        demography = self.sample_demography_from_streams(agent_ids, streams)
+
+        return Population(
+            **demography,
+            **self.transport_mode_inputs_sampler.sample_from_streams(
+                demography['age_sex'], agent_ids, streams
+            )
+        )
+
+    def sample_demography_from_streams(
+        self,
+        agent_ids: np.ndarray,
+        streams: AgentRandomStreams
+    ) -> Dict[str, np.ndarray]:
+        """
+        Samples home regions and age and sex combinations of agents with
+        given ids using their counter-based random streams (without
+        transport mode inputs, see sample_from_streams).
+
+        Returns
+        -------
+            demography: Dict[str, np.ndarray]
+                Codes of home_region and age_sex of agents.
+        """
+
+        return {
+            'home_region': self.home_region_sampler.sample_from_uniforms(
+                streams.uniforms(agent_ids, HOME_REGION_STREAM),
+                streams.inverse_cdf
+            ),
+            'age_sex': self.age_sex_sampler.sample_from_uniforms(
+                streams.uniforms(agent_ids, AGE_SEX_STREAM),
+                streams.inverse_cdf
+            )
+        }
+
 
 class DayScheduleSampler:
     """
@@ -354,8 +924,10 @@ class DayScheduleSampler:
         travel_chains_dist: List[Tuple[str, DistributionFloatTuple]],
         start_hour_dist: List[Tuple[str, DistributionFloatTuple]],
         other_travels_dist: List[Tuple[str, DistributionFloatTuple]],
-        spend_time_dist_params: List[Tuple[str,  Dict[str, int]]],
-        trip_cancel_prob: List[Tuple[str, float]]
+        spend_time_dist_params: List[Tuple[Tuple[str, str], Dict[str, int]]],
+        trip_cancel_prob: Dict[str, float],
+        vocabularies: Vocabularies,
+        rng: Optional[np.random.Generator] = None
     ):
         """
         Constructs DayScheduleSampler with given probability
@@ -405,47 +977,93 @@ class DayScheduleSampler:
                 {place_type: str : probability: float}}
                 contains probabilities of cancellation of activities
                 associated with a specific destination place type.
+            vocabularies: Vocabularies
+                Categories vocabularies. Samplers are kept by age_sex
+                and place type codes and sampled schedules contain place
+                type codes.
+            rng: np.random.Generator
+                Random numbers generator of all schedule samplers
+                (GLOBAL_RNG if not given).
         """
 
+        self.rng = GLOBAL_RNG if rng is None else rng
+
+        age_sex_vocabulary = vocabularies.age_sex
+        place_type_vocabulary = vocabularies.place_type
+        travel_chain_vocabulary = vocabularies.travel_chain
+
         self.any_travel_samplers = {
-            age_sex: BaseSampler(dist) for age_sex, dist in any_travel_dist
+            age_sex_vocabulary.add(age_sex): BaseSampler(dist, rng=self.rng)
+            for age_sex, dist in any_travel_dist
         }
 
         self.travel_chains_samplers = {
-            age_sex: BaseSampler(dist) for age_sex, dist in travel_chains_dist
+            age_sex_vocabulary.add(age_sex): BaseSampler(
+                (travel_chain_vocabulary.encode(dist[0]), dist[1]),
+                rng=self.rng
+            )
+            for age_sex, dist in travel_chains_dist
+        }
+
+        # chains are split into place type codes once
+        self.travel_chains = {
+            travel_chain: place_type_vocabulary.encode(
+                travel_chain_vocabulary.categories[travel_chain].split(',')
+            ).tolist()
+            for samplers in self.travel_chains_samplers.values()
+            for travel_chain in samplers.object_ids.tolist()
         }
 
         self.start_hours_samplers = {
-            dest_type: BaseSampler((dist[0].astype(np.int), dist[1]))
+            place_type_vocabulary.add(dest_type): BaseSampler(
+                (dist[0].astype(np.int64), dist[1]),
+                rng=self.rng
+            )
             for dest_type, dist in start_hour_dist
         }
 
         self.other_travels_samplers = {
-            age_sex: BaseSampler(dist) for age_sex, dist in other_travels_dist
+            age_sex_vocabulary.add(age_sex): BaseSampler(
+                (place_type_vocabulary.encode(dist[0]), dist[1]),
+                rng=self.rng
+            )
+            for age_sex, dist in other_travels_dist
         }
 
         self.spend_time_samplers = {
-            key: BaseNormalSampler(
+            (
+                age_sex_vocabulary.add(age_sex),
+                place_type_vocabulary.add(place_type)
+            ): BaseNormalSampler(
                     loc=params['loc'],
                     scale=params['scale'],
-                    min_value=10
-            ) for key, params in spend_time_dist_params
+                    min_value=10,
+                    rng=self.rng
+            ) for (age_sex, place_type), params in spend_time_dist_params
         }
 
-        self.trip_cancel_prob = trip_cancel_prob
+        self.trip_cancel_prob = {
+            place_type_vocabulary.add(place_type): prob
+            for place_type, prob in trip_cancel_prob.items()
+        }
+
+        self.age_sex_vocabulary = age_sex_vocabulary
+        self.place_type_vocabulary = place_type_vocabulary
+        self.other_place_type = place_type_vocabulary.add('inne')
+        self.stream_tables = None
 
     
     def __call__(
         self,
-        age_sex: str
+        age_sex: int
     ) -> List[ScheduleElement]:
         """
             Sample day schedule list sorted by travels start time.
 
             Parameters
             ----------
-                age_sex: str
-                    Age and sex comination string.
+                age_sex: int
+                    Age and sex comination code.
 
             Returns
             -------
@@ -455,27 +1073,27 @@ class DayScheduleSampler:
 
         schedule = []
 
-        if age_sex != "0-5":
+        if self.age_sex_vocabulary.categories[age_sex] != "0-5":
             any_travel = self.any_travel_samplers[
                 age_sex
             ]()
 
             if any_travel == '1':
-                travel_chain = self.travel_chains_samplers[
-                    age_sex
-                ]().split(',')
+                travel_chain = self.travel_chains[
+                    self.travel_chains_samplers[age_sex]()
+                ]
 
-                cancel_states = GLOBAL_RNG.random(len(travel_chain)).tolist()
+                cancel_states = self.rng.random(len(travel_chain)).tolist()
 
                 first_destination = travel_chain[0]
 
-                if first_destination == 'inne':
+                if first_destination == self.other_place_type:
                     first_destination_with_other_split = self.other_travels_samplers[age_sex]()
                 else:
                     first_destination_with_other_split = first_destination
 
                 first_start_time = self.start_hours_samplers[first_destination]() * 60 + self._sample_minutes()
-                first_spend_time = self.spend_time_samplers[age_sex + first_destination_with_other_split]()
+                first_spend_time = self.spend_time_samplers[age_sex, first_destination_with_other_split]()
 
                 if self.trip_cancel_prob[first_destination_with_other_split] <= cancel_states.pop():
                     # do not cancel this trip, so add it to schedule
@@ -491,13 +1109,13 @@ class DayScheduleSampler:
                 prev_spend_time = first_spend_time
 
                 for next_destination in travel_chain[1:]:  # will work fine (min travels in chain = 2)
-                    if next_destination == 'inne':
+                    if next_destination == self.other_place_type:
                         next_destination_with_other_split = self.other_travels_samplers[age_sex]()
                     else:
                         next_destination_with_other_split = next_destination
 
                     next_start_time = prev_start_time + prev_spend_time
-                    next_spend_time = self.spend_time_samplers[age_sex + next_destination_with_other_split]()
+                    next_spend_time = self.spend_time_samplers[age_sex, next_destination_with_other_split]()
 
                     if self.trip_cancel_prob[next_destination_with_other_split] <= cancel_states.pop():
                         # do not cancel this trip, so add it to schedule
@@ -513,10 +1131,225 @@ class DayScheduleSampler:
 
         return schedule
 
+    def sample_schedules(
+        self,
+        age_sex: np.ndarray
+    ) -> Schedules:
+        """
+            Sample day schedules of many agents and store them in CSR
+            layout.
+
+            Parameters
+            ----------
+                age_sex: np.ndarray
+                    Age and sex comination codes of agents.
+
+            Returns
+            -------
+                schedules: Schedules
+        """
+
+        offsets = np.zeros(len(age_sex) + 1, dtype=np.int64)
+        travel_start_time = []
+        dest_activity_type = []
+        dest_activity_dur_time = []
+
+        for i, agent_age_sex in enumerate(age_sex):
+            schedule = self(agent_age_sex)
+            offsets[i + 1] = offsets[i] + len(schedule)
+
+            for schedule_element in schedule:
+                travel_start_time.append(schedule_element.travel_start_time)
+                dest_activity_type.append(schedule_element.dest_activity_type)
+                dest_activity_dur_time.append(
+                    schedule_element.dest_activity_dur_time
+                )
+
+        return Schedules(
+            offsets=offsets,
+            travel_start_time=np.array(travel_start_time, dtype=np.float64),
+            dest_activity_type=np.array(dest_activity_type, dtype=np.int64),
+            dest_activity_dur_time=np.array(
+                dest_activity_dur_time, dtype=np.float64
+            )
+        )
+
+    def sample_schedules_from_streams(
+        self,
+        age_sex: np.ndarray,
+        agent_ids: np.ndarray,
+        streams: AgentRandomStreams
+    ) -> Schedules:
+        """
+            Sample day schedules of many agents at once using agents'
+            counter-based random streams. Every decision of j-th chain
+            element uses j-th number of its stream, so schedule of an
+            agent does not depend on other sampled agents. Schedules have
+            the same distribution as schedules sampled by __call__.
+
+            Parameters
+            ----------
+                age_sex: np.ndarray
+                    Age and sex comination codes of agents.
+                agent_ids: np.ndarray
+                    Agents ids.
+                streams: AgentRandomStreams
+                    Agents' random streams.
+
+            Returns
+            -------
+                schedules: Schedules
+        """
+
+        tables = self._get_stream_tables()
+        agent_ids = np.asarray(agent_ids)
+
+        travelling = np.flatnonzero(
+            np.array(self.age_sex_vocabulary.categories, dtype=object)[age_sex]
+            != "0-5"
+        )
+        any_travel = tables['any_travel'].sample_from_uniforms(
+            age_sex[travelling],
+            streams.uniforms(agent_ids[travelling], ANY_TRAVEL_STREAM),
+            streams.inverse_cdf
+        )
+        travelling = travelling[any_travel == '1']
+
+        travel_chains = tables['travel_chains'].sample_from_uniforms(
+            age_sex[travelling],
+            streams.uniforms(agent_ids[travelling], TRAVEL_CHAIN_STREAM),
+            streams.inverse_cdf
+        )
+
+        # one element per destination of every sampled chain
+        chain_lengths = tables['chain_lengths'][travel_chains]
+        elements_agents = np.repeat(travelling, chain_lengths)
+        elements_ids = agent_ids[elements_agents]
+        elements_age_sex = age_sex[elements_agents]
+        chains_starts = np.cumsum(chain_lengths) - chain_lengths
+        elements_nums = np.arange(len(elements_agents)) \
+            - np.repeat(chains_starts, chain_lengths)
+        destinations = tables['chain_place_types'][
+            np.repeat(tables['chain_offsets'][travel_chains], chain_lengths)
+            + elements_nums
+        ]
+
+        destinations_with_other_split = destinations.copy()
+        other = np.flatnonzero(destinations == self.other_place_type)
+        destinations_with_other_split[other] = tables[
+            'other_travels'
+        ].sample_from_uniforms(
+            elements_age_sex[other],
+            streams.uniforms(
+                elements_ids[other], OTHER_TRAVEL_STREAM, elements_nums[other]
+            ),
+            streams.inverse_cdf
+        )
+
+        # first travel start time depends on chain's first destination
+        first_start_time = tables['start_hours'].sample_from_uniforms(
+            destinations[chains_starts],
+            streams.uniforms(agent_ids[travelling], START_HOUR_STREAM),
+            streams.inverse_cdf
+        ) * 60 + np.floor(
+            streams.uniforms(agent_ids[travelling], START_MINUTES_STREAM) * 60
+        )
+
+        spend_time_keys = (elements_age_sex, destinations_with_other_split)
+        spend_time = np.maximum(
+            np.floor(
+                tables['spend_time_loc'][spend_time_keys]
+                + tables['spend_time_scale'][spend_time_keys]
+                * streams.normals(
+                    elements_ids, SPEND_TIME_STREAM, elements_nums
+                )
+            ),
+            tables['spend_time_min'][spend_time_keys]
+        )
+        if np.any(np.isnan(spend_time)):
+            raise KeyError('No spend time params for some destinations.')
+
+        # next travel starts when previous activity ends (also when
+        # previous travel was cancelled)
+        spend_time_before = np.cumsum(spend_time) - spend_time
+        travel_start_time = np.repeat(first_start_time, chain_lengths) \
+            + spend_time_before \
+            - np.repeat(spend_time_before[chains_starts], chain_lengths)
+
+        cancel_prob = tables['trip_cancel_prob'][destinations_with_other_split]
+        if np.any(np.isnan(cancel_prob)):
+            raise KeyError('No cancel probability for some destinations.')
+        not_cancelled = cancel_prob <= streams.uniforms(
+            elements_ids, TRIP_CANCEL_STREAM, elements_nums
+        )
+
+        offsets = np.zeros(len(age_sex) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(
+            elements_agents[not_cancelled], minlength=len(age_sex)
+        ))
+
+        return Schedules(
+            offsets=offsets,
+            travel_start_time=travel_start_time[not_cancelled].astype(
+                np.float64
+            ),
+            dest_activity_type=destinations_with_other_split[
+                not_cancelled
+            ].astype(np.int64),
+            dest_activity_dur_time=spend_time[not_cancelled]
+        )
+
+    def _get_stream_tables(self) -> Dict[str, Any]:
+        # built on first use, when vocabularies are complete
+        if self.stream_tables is not None:
+            return self.stream_tables
+
+        num_age_sex = len(self.age_sex_vocabulary)
+        num_place_types = len(self.place_type_vocabulary)
+
+        chains = sorted(self.travel_chains)
+        chain_lengths = np.zeros(max(chains) + 1, dtype=np.int64)
+        chain_lengths[chains] = [
+            len(self.travel_chains[chain]) for chain in chains
+        ]
+        chain_offsets = np.cumsum(chain_lengths) - chain_lengths
+        chain_place_types = np.zeros(chain_lengths.sum(), dtype=np.int64)
+        for chain in chains:
+            chain_place_types[
+                chain_offsets[chain]:chain_offsets[chain] + chain_lengths[chain]
+            ] = self.travel_chains[chain]
+
+        spend_time_params = {
+            name: np.full((num_age_sex, num_place_types), np.nan)
+            for name in ['spend_time_loc', 'spend_time_scale', 'spend_time_min']
+        }
+        for key, sampler in self.spend_time_samplers.items():
+            spend_time_params['spend_time_loc'][key] = sampler.loc
+            spend_time_params['spend_time_scale'][key] = sampler.scale
+            spend_time_params['spend_time_min'][key] = sampler.min_value
+
+        trip_cancel_prob = np.full(num_place_types, np.nan)
+        for place_type, prob in self.trip_cancel_prob.items():
+            trip_cancel_prob[place_type] = prob
+
+        self.stream_tables = {
+            'any_travel': StackedSampler(self.any_travel_samplers),
+            'travel_chains': StackedSampler(self.travel_chains_samplers),
+            'start_hours': StackedSampler(self.start_hours_samplers),
+            'other_travels': StackedSampler(self.other_travels_samplers),
+            'chain_lengths': chain_lengths,
+            'chain_offsets': chain_offsets,
+            'chain_place_types': chain_place_types,
+            'trip_cancel_prob': trip_cancel_prob,
+            **spend_time_params
+        }
+
+        return self.stream_tables
+
     def _sample_minutes(
         self
     ) -> int:
-        return GLOBAL_RNG.integers(0, 60)
+        return self.rng.integers(0, 60)
 
 
 class GravitySampler:
@@ -528,7 +1361,9 @@ class GravitySampler:
     
     def __init__(
         self,
-        gravity_dist: List[Tuple[str, DistributionFloatTuple]]
+        gravity_dist: List[Tuple[Tuple[str, str], DistributionFloatTuple]],
+        vocabularies: Vocabularies,
+        rng: Optional[np.random.Generator] = None
     ):
         """
         Constructs GravitySampler with given distribution.
@@ -544,42 +1379,103 @@ class GravitySampler:
                 }}
                 contains probability for destination region for travel
                 with given start region and destination type (like 'szkola'...)
+            vocabularies: Vocabularies
+                Categories vocabularies. Samplers are kept by
+                (dest_type, start_region) codes and sample region codes.
+            rng: np.random.Generator
+                Random numbers generator (GLOBAL_RNG if not given).
         """
 
-        self.dest_region_samplers = {
-            key: BaseSampler(dist, 10)
-            for key, dist in gravity_dist
-        }
+        self.gravity_dist = gravity_dist
+        self.vocabularies = vocabularies
+        self.rng = rng
+        self._dest_region_samplers = None
+        self.stacked_samplers = None
+
+    @property
+    def dest_region_samplers(self) -> Dict[Tuple[int, int], BaseSampler]:
+        # samplers of all (dest_type, start_region) pairs are built on
+        # first use, so models which reuse cached trips (see StageCache)
+        # never build them
+        if self._dest_region_samplers is None:
+            region_vocabulary = self.vocabularies.region
+            place_type_vocabulary = self.vocabularies.place_type
+
+            self._dest_region_samplers = {
+                (
+                    place_type_vocabulary.add(dest_type),
+                    region_vocabulary.add(start_region)
+                ): BaseSampler(
+                    (region_vocabulary.encode(dist[0]), dist[1]), 10, self.rng
+                )
+                for (dest_type, start_region), dist in self.gravity_dist
+            }
+
+        return self._dest_region_samplers
 
 
     def __call__(
         self,
-        start_region: str,
-        dest_type: str
-    ) -> str:
+        start_region: int,
+        dest_type: int
+    ) -> int:
         """
-        Returns destination region id for given start region id
-        and destination type.
+        Returns destination region code for given start region code
+        and destination type code.
 
         Parameters
         ----------
-            start_region: str
-                Start region id.
-            dest_type: str
-                Travel destination type like "szkola", "dom", "praca", "inne",
-                "uczelnia".
+            start_region: int
+                Start region code.
+            dest_type: int
+                Code of travel destination type like "szkola", "dom",
+                "praca", "inne", "uczelnia".
 
         Returns
         -------
-            dest_region: str
-                Sampled destination region id.
+            dest_region: int
+                Sampled destination region code.
         """
 
-        dest_region = self.dest_region_samplers[dest_type + start_region]()
-        # print(self.dest_region_samplers[dest_type + start_region].counter)
+        dest_region = self.dest_region_samplers[dest_type, start_region]()
 
         return dest_region
 
+    def sample_from_uniforms(
+        self,
+        start_regions: np.ndarray,
+        dest_types: np.ndarray,
+        uniforms: np.ndarray,
+        inverse_cdf: bool = False
+    ) -> np.ndarray:
+        """
+        Returns destination region codes of many travels at once, mapped
+        from given uniform [0, 1) numbers (see AgentRandomStreams).
+
+        Parameters
+        ----------
+            start_regions: np.ndarray
+                Start regions codes.
+            dest_types: np.ndarray
+                Destination types codes.
+            uniforms: np.ndarray
+                Numbers from uniform [0, 1) distribution.
+            inverse_cdf: bool
+                If True, inverse CDF mapping is used (see
+                AliasTable.sample_from_uniforms).
+
+        Returns
+        -------
+            dest_regions: np.ndarray
+        """
+
+        if self.stacked_samplers is None:
+            self.stacked_samplers = StackedSampler(self.dest_region_samplers)
+
+        return self.stacked_samplers.sample_from_uniforms(
+            (dest_types, start_regions), uniforms, inverse_cdf
+        )
+
 
 class DriverSampler:
     """
@@ -587,7 +1483,9 @@ class DriverSampler:
     """
     def __init__(
         self,
-        drivers_dist: List[Tuple[str, DistributionFloatTuple]]
+        drivers_dist: List[Tuple[str, DistributionFloatTuple]],
+        age_sex_vocabulary: Vocabulary,
+        rng: Optional[np.random.Generator] = None
     ):
         """
         Constructs DriverSampler with given probability distribution.
@@ -600,22 +1498,30 @@ class DriverSampler:
                 }
                 contains probabilities for drivers_dist input. Sampled
                 drivers_dist will be converted to int.
+            age_sex_vocabulary: Vocabulary
+                Vocabulary of age and sex combinations. Samplers are kept
+                by combination codes.
+            rng: np.random.Generator
+                Random numbers generator (GLOBAL_RNG if not given).
         """
         self.drivers_samplers = { 
-            age_sex: BaseSampler(input_dist) for age_sex, input_dist in drivers_dist
+            age_sex_vocabulary.add(age_sex): BaseSampler(input_dist, rng=rng)
+            for age_sex, input_dist in drivers_dist
         }
+        self.stacked_samplers = None
 
     def __call__(
         self,
-        age_sex: str
+        age_sex: int
     ) -> str:
         """
         Samples and returns DriverInputs
 
         Parameters
         ----------
-            age_sex: str
-                Age and sex combination string like "0-5", "16-19_K"...
+            age_sex: int
+                Code of age and sex combination string like "0-5",
+                "16-19_K"...
 
         Returns
         -------
@@ -626,3 +1532,64 @@ class DriverSampler:
         is_driver = self.drivers_samplers[age_sex]()
 
         return is_driver
+
+    def sample(
+        self,
+        age_sex: np.ndarray
+    ) -> np.ndarray:
+        """
+        Samples DriverInputs for many travels at once (grouped by age_sex).
+
+        Parameters
+        ----------
+            age_sex: np.ndarray
+                Age and sex combination codes of travelling agents.
+
+        Returns
+        -------
+            is_driver: np.ndarray
+                Sampled passenger ('0') or driver ('1') values.
+        """
+
+        is_driver = np.empty(len(age_sex), dtype=object)
+
+        for age_sex_value in np.unique(age_sex):
+            group = np.nonzero(age_sex == age_sex_value)[0]
+            is_driver[group] = self.drivers_samplers[age_sex_value].sample(
+                len(group)
+            )
+
+        return is_driver
+
+    def sample_from_uniforms(
+        self,
+        age_sex: np.ndarray,
+        uniforms: np.ndarray,
+        inverse_cdf: bool = False
+    ) -> np.ndarray:
+        """
+        Samples DriverInputs for many travels at once, mapped from given
+        uniform [0, 1) numbers (see AgentRandomStreams).
+
+        Parameters
+        ----------
+            age_sex: np.ndarray
+                Age and sex combination codes of travelling agents.
+            uniforms: np.ndarray
+                Numbers from uniform [0, 1) distribution.
+            inverse_cdf: bool
+                If True, inverse CDF mapping is used (see
+                AliasTable.sample_from_uniforms).
+
+        Returns
+        -------
+            is_driver: np.ndarray
+                Sampled passenger ('0') or driver ('1') values.
+        """
+
+        if self.stacked_samplers is None:
+            self.stacked_samplers = StackedSampler(self.drivers_samplers)
+
+        return self.stacked_samplers.sample_from_uniforms(
+            age_sex, uniforms, inverse_cdf
+        ).astype(object)
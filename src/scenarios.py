@@ -0,0 +1,116 @@
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def change_probs(
+    object_ids: np.ndarray,
+    probs: np.ndarray,
+    value: float
+) -> np.ndarray:
+    """
+    Moves probability mass between neighbouring objects of a distribution
+    (objects ordered by their ids as strings). For value > 0 each object
+    gives value of its probability to the next object ("up"), for
+    value < 0 to the previous one ("down").
+
+    Parameters
+    ----------
+        object_ids: np.ndarray
+            Ids of objects.
+        probs: np.ndarray
+            Probabilities of objects.
+        value: float
+            Fraction of probability moved.
+
+    Returns
+    -------
+        new_probs: np.ndarray
+            Changed probabilities (in order of object_ids).
+    """
+
+    probs = np.asarray(probs, dtype=np.float64)
+    if value == 0 or len(probs) < 2:
+        return probs
+
+    order = np.argsort(np.asarray(object_ids, dtype=str), kind='stable')
+    if value > 0:
+        order = order[::-1]
+    value = abs(value)
+
+    ordered_probs = probs[order]
+    new_probs = ordered_probs - value * ordered_probs
+    new_probs[0] = ordered_probs[0]
+    new_probs[:-1] += value * ordered_probs[1:]
+
+    changed_probs = np.empty_like(probs)
+    changed_probs[order] = new_probs
+
+    return changed_probs
+
+
+def change_dist(
+    dist: List[Tuple[str, Tuple[np.ndarray, np.ndarray]]],
+    value: float
+) -> List[Tuple[str, Tuple[np.ndarray, np.ndarray]]]:
+    """
+    Returns copy of flattened distribution (list of (key, (object_ids,
+    probs))) with probabilities of each key changed by change_probs.
+    """
+
+    return [
+        (key, (object_ids, change_probs(object_ids, probs, value)))
+        for key, (object_ids, probs) in dist
+    ]
+
+
+def parse_change(
+    dist_name: str,
+    value: float
+) -> Tuple[str, float]:
+    """
+    Parses scenario change, e.g. ('decision_tree/household_cars_dist-down',
+    0.1) -> ('household_cars_dist', -0.1).
+    """
+
+    if dist_name.endswith('-up'):
+        dist_name = dist_name[:-len('-up')]
+    elif dist_name.endswith('-down'):
+        value = -1 * value
+        dist_name = dist_name[:-len('-down')]
+    else:
+        raise Exception('No -up or -down in distribution name!')
+
+    return dist_name.split('/')[-1], value
+
+
+def apply_scenario(
+    params: Dict[str, Any],
+    changes: Iterable[Sequence]
+) -> Dict[str, Any]:
+    """
+    Returns model parameters of a scenario as an overlay on base
+    parameters (see runners.load_params): changed distributions are new
+    objects, all others are shared with params, which are not modified.
+
+    Parameters
+    ----------
+        params: Dict[str, Any]
+            Base model parameters.
+        changes: Iterable[Sequence]
+            Scenario as list of [dist_name-up/down, value].
+
+    Returns
+    -------
+        scenario_params: Dict[str, Any]
+    """
+
+    scenario_params = dict(params)
+
+    for dist_name, value in changes:
+        param_name, value = parse_change(dist_name, value)
+        scenario_params[param_name] = change_dist(
+            scenario_params[param_name], value
+        )
+
+    return scenario_params
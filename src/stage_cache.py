@@ -0,0 +1,206 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+
+# version of artifacts layout, artifacts of other versions are never read
+STAGE_CACHE_VERSION = 1
+
+# stages of a simulation with agent streams and stages whose artifacts
+# they use - population (home regions, age and sex), transport mode
+# classifier inputs of agents, day schedules and performed trips (regions,
+# times and distances, without transport modes). Transport modes are not
+# cached, they are chosen from cached trips in every simulation
+STAGES_UPSTREAM = {
+    'population': (),
+    'mode_inputs': ('population',),
+    'schedules': ('population',),
+    'trips': ('schedules',)
+}
+
+
+def _update_hash(
+    hasher: 'hashlib._Hash',
+    value: Any
+):
+    # hashes content of parameters, so equal distributions have equal
+    # hashes whether they are loaded from bundle or changed by scenario
+    if isinstance(value, np.ndarray):
+        hasher.update(f'array{value.dtype.str}{value.shape}'.encode())
+        if value.dtype.hasobject:
+            hasher.update(repr(value.tolist()).encode())
+        else:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _update_hash(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(f'dict{len(value)}'.encode())
+        for key, item in value.items():
+            _update_hash(hasher, key)
+            _update_hash(hasher, item)
+    elif value is None or isinstance(value, (str, bytes, int, float, bool)):
+        hasher.update(f'{type(value).__name__}{value!r}'.encode())
+    else:
+        # e.g. DistanceMatrix
+        hasher.update(type(value).__name__.encode())
+        _update_hash(hasher, vars(value))
+
+
+def get_inputs_hash(*inputs: Any) -> str:
+    """
+    Returns hex digest of SHA-256 hash of content of given inputs (NumPy
+    arrays, lists, tuples, dicts, scalars and objects of other classes by
+    their attributes).
+    """
+
+    hasher = hashlib.sha256()
+    _update_hash(hasher, (STAGE_CACHE_VERSION, inputs))
+
+    return hasher.hexdigest()
+
+
+def get_stage_keys(
+    context: Any,
+    stages_inputs: Dict[str, Sequence[Any]]
+) -> Dict[str, str]:
+    """
+    Returns keys of artifacts of all stages (see STAGES_UPSTREAM). Key of
+    a stage hashes context (e.g. seed and agents ids), inputs of the stage
+    and keys of its upstream stages, so it changes with inputs of any
+    stage it depends on.
+
+    Parameters
+    ----------
+        context: Any
+            Inputs shared by all stages.
+        stages_inputs: Dict[str, Sequence[Any]]
+            Inputs (e.g. distributions) of each stage.
+
+    Returns
+    -------
+        stage_keys: Dict[str, str]
+    """
+
+    stage_keys = {}
+
+    for stage, upstream in STAGES_UPSTREAM.items():
+        stage_keys[stage] = get_inputs_hash(
+            stage,
+            context,
+            [stage_keys[upstream_stage] for upstream_stage in upstream],
+            stages_inputs[stage]
+        )
+
+    return stage_keys
+
+
+class StageCache:
+    """
+    Artifacts of stages of simulations (see STAGES_UPSTREAM) saved as .npz
+    files in cache folder (<cache_dir>/<stage>/<key>.npz), keyed by hash
+    of their inputs (see get_stage_keys). A scenario which changes only
+    some distributions recomputes only stages which depend on them, e.g.
+    a scenario which changes transport mode inputs distributions samples
+    only new inputs and chooses transport modes of cached trips. Any
+    number of processes (also on different nodes) can share one cache
+    folder.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str
+    ):
+        """
+        Constructs StageCache.
+
+        Parameters
+        ----------
+            cache_dir: str
+                Cache folder, created when first artifact is saved.
+        """
+
+        self.cache_dir = cache_dir
+
+    def get_path(
+        self,
+        stage: str,
+        key: str
+    ) -> str:
+        """
+        Returns path of artifact of stage with given key.
+        """
+
+        return os.path.join(self.cache_dir, stage, key + '.npz')
+
+    def load(
+        self,
+        stage: str,
+        key: str
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns arrays of artifact of stage with given key or None if it is
+        not cached or its file can not be read (e.g. it is corrupted), so
+        it is computed and saved again.
+        """
+
+        path = self.get_path(stage, key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as artifact:
+                return {name: artifact[name] for name in artifact.files}
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
+
+    def save(
+        self,
+        stage: str,
+        key: str,
+        arrays: Dict[str, np.ndarray]
+    ):
+        """
+        Saves arrays as artifact of stage with given key. File is written
+        to a uniquely named temporary file first, so other processes (also
+        in other containers, whose PIDs may be equal) never read or write
+        a partially written artifact.
+        """
+
+        path = self.get_path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(
+            suffix='.tmp', prefix=key + '.', dir=os.path.dirname(path)
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def get(
+        self,
+        stage: str,
+        key: str,
+        compute: Callable[[], Dict[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns cached artifact of stage with given key, computed (and
+        saved) first if it is not cached.
+        """
+
+        arrays = self.load(stage, key)
+
+        if arrays is None:
+            arrays = compute()
+            self.save(stage, key, arrays)
+
+        return arrays
@@ -0,0 +1,185 @@
+from typing import Union
+
+import numpy as np
+from numpy.random import SeedSequence
+
+
+# Philox4x32-10 constants (Salmon et al., "Parallel random numbers: as
+# easy as 1, 2, 3", SC'11)
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint32(0x9E3779B9)
+PHILOX_W1 = np.uint32(0xBB67AE85)
+PHILOX_ROUNDS = 10
+
+LOW_32_BITS = np.uint64(0xFFFFFFFF)
+
+# ids of agents' random streams - every random decision of an agent has
+# its own stream, so it does not depend on any other decision
+HOME_REGION_STREAM = 0
+AGE_SEX_STREAM = 1
+TRANSPORT_MODE_INPUTS_STREAM = 2
+ANY_TRAVEL_STREAM = 3
+TRAVEL_CHAIN_STREAM = 4
+OTHER_TRAVEL_STREAM = 5
+START_HOUR_STREAM = 6
+START_MINUTES_STREAM = 7
+SPEND_TIME_STREAM = 8
+TRIP_CANCEL_STREAM = 9
+DEST_REGION_STREAM = 10
+DRIVER_STREAM = 11
+
+
+def philox4x32(
+    counters: np.ndarray,
+    key: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized Philox4x32-10 counter-based generator.
+
+    Parameters
+    ----------
+        counters: np.ndarray
+            (n x 4) uint32 counters.
+        key: np.ndarray
+            Two uint32 key words.
+
+    Returns
+    -------
+        blocks: np.ndarray
+            (n x 4) uint32 random blocks.
+    """
+
+    counters = np.asarray(counters, dtype=np.uint32)
+    x0, x1, x2, x3 = (counters[:, i].astype(np.uint64) for i in range(4))
+    k0, k1 = np.asarray(key, dtype=np.uint32)
+
+    with np.errstate(over='ignore'):
+        for round_num in range(PHILOX_ROUNDS):
+            if round_num > 0:
+                k0 = k0 + PHILOX_W0
+                k1 = k1 + PHILOX_W1
+
+            product0 = PHILOX_M0 * x0
+            product1 = PHILOX_M1 * x2
+            x0, x1, x2, x3 = (
+                (product1 >> np.uint64(32)) ^ x1 ^ np.uint64(k0),
+                product1 & LOW_32_BITS,
+                (product0 >> np.uint64(32)) ^ x3 ^ np.uint64(k1),
+                product0 & LOW_32_BITS
+            )
+
+    return np.stack([x0, x1, x2, x3], axis=1).astype(np.uint32)
+
+
+class AgentRandomStreams:
+    """
+    Counter-based random numbers of agents. Every number is a function of
+    replicate key, agent id, stream id and index of number in the stream
+    (Philox4x32-10 block of counter (agent_id, stream, index, 0)), so it
+    does not depend on order of agents or on how population is split
+    between processes.
+
+    If inverse_cdf is set, samplers map numbers of streams to categories
+    by inverse CDF (see AliasTable.sample_from_uniforms), so with the same
+    seed (common random numbers) models of scenarios with slightly
+    changed distributions make the same decisions for most agents.
+    """
+
+    def __init__(
+        self,
+        seed: Union[int, SeedSequence, None],
+        inverse_cdf: bool = False
+    ):
+        """
+        Constructs AgentRandomStreams.
+
+        Parameters
+        ----------
+            seed: int or SeedSequence
+                Replicate seed (see get_replicate_seed), Philox key is
+                derived from it.
+            inverse_cdf: bool
+                If True, numbers are mapped to categories by inverse CDF
+                instead of alias tables.
+        """
+
+        seed_sequence = (
+            seed if isinstance(seed, SeedSequence) else SeedSequence(seed)
+        )
+        self.key = seed_sequence.generate_state(2, np.uint32)
+        self.inverse_cdf = inverse_cdf
+
+    def get_blocks(
+        self,
+        agent_ids: np.ndarray,
+        stream: int,
+        index: Union[int, np.ndarray] = 0
+    ) -> np.ndarray:
+        """
+        Returns (n x 4) uint32 random blocks of given agents.
+        """
+
+        agent_ids = np.asarray(agent_ids)
+        counters = np.zeros((len(agent_ids), 4), dtype=np.uint32)
+        counters[:, 0] = agent_ids
+        counters[:, 1] = stream
+        counters[:, 2] = index
+
+        return philox4x32(counters, self.key)
+
+    def uniforms(
+        self,
+        agent_ids: np.ndarray,
+        stream: int,
+        index: Union[int, np.ndarray] = 0
+    ) -> np.ndarray:
+        """
+        Returns numbers from uniform [0, 1) distribution (53 random bits
+        each), one per agent.
+
+        Parameters
+        ----------
+            agent_ids: np.ndarray
+                Agents ids.
+            stream: int
+                Stream id (e.g. DEST_REGION_STREAM).
+            index: int or np.ndarray
+                Index of number in agent's stream (e.g. travel number).
+
+        Returns
+        -------
+            uniforms: np.ndarray
+        """
+
+        blocks = self.get_blocks(agent_ids, stream, index)
+
+        return _to_uniforms(blocks[:, 0], blocks[:, 1])
+
+    def normals(
+        self,
+        agent_ids: np.ndarray,
+        stream: int,
+        index: Union[int, np.ndarray] = 0
+    ) -> np.ndarray:
+        """
+        Returns numbers from standard normal distribution (Box-Muller
+        transform of two uniforms of one block), one per agent.
+        """
+
+        blocks = self.get_blocks(agent_ids, stream, index)
+        uniforms_1 = _to_uniforms(blocks[:, 0], blocks[:, 1])
+        uniforms_2 = _to_uniforms(blocks[:, 2], blocks[:, 3])
+
+        return np.sqrt(-2. * np.log1p(-uniforms_1)) \
+            * np.cos(2. * np.pi * uniforms_2)
+
+
+def _to_uniforms(
+    high_words: np.ndarray,
+    low_words: np.ndarray
+) -> np.ndarray:
+    bits = (high_words.astype(np.uint64) << np.uint64(32)) \
+        | low_words.astype(np.uint64)
+
+    return (bits >> np.uint64(11)).astype(np.float64) * 2. ** -53
@@ -0,0 +1,739 @@
+import glob
+import os
+import re
+from functools import partial
+from multiprocessing import Pool
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple)
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .aggregates import MINUTES_PER_HOUR, NUM_TRANSPORT_MODES, get_num_hours
+from .results_writer import read_parquet_results
+
+
+QUANTILES = (0.05, 0.5, 0.95)
+CONFIDENCE = 0.95
+
+# quantiles of up to this number of replicates are exact, P-square
+# estimates start from them (P-square with 5 initial values is poor for
+# tails of few replicates)
+EXACT_QUANTILES_REPLICATES = 20
+
+# tables with travels of a replicate, aggregated od_counts are preferred
+# (they are much smaller than travels)
+REPLICATE_TABLES = ('od_counts', 'travels')
+
+# replicate is (results_format, path, scenario, run_num, table_name), where
+# path is scenario folder (pickle) or root of datasets (parquet)
+Replicate = Tuple[str, str, str, int, str]
+
+# axes of metrics (see get_replicate_metrics), labels of regions come from
+# replicates, other axes are integer codes
+METRICS_AXES = {
+    'trips': (),
+    'mode_share': ('transport_mode',),
+    'mode_share_by_hour': ('hour', 'transport_mode'),
+    'production': ('start_region',),
+    'region_mode_share': ('start_region', 'transport_mode'),
+    'od_flows': ('start_region', 'dest_region')
+}
+
+
+class Welford:
+    """
+    Running mean and variance of arrays of fixed shape (one array per
+    replicate), updated with Welford's algorithm, so replicates do not
+    have to be kept in memory.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...]
+    ):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+
+    def add(
+        self,
+        values: np.ndarray
+    ):
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+
+    def merge(
+        self,
+        other: 'Welford'
+    ) -> 'Welford':
+        """
+        Adds other accumulator (e.g. of other replicates processed in
+        parallel) with Chan's formula and returns self.
+        """
+
+        count = self.count + other.count
+        if count == 0:
+            return self
+
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 \
+            + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+        return self
+
+    def get_std(self) -> np.ndarray:
+        """
+        Returns sample standard deviation (NaN for less than 2 values).
+        """
+
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def get_confidence_interval(
+        self,
+        confidence: float = CONFIDENCE
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns bounds of Student's t confidence interval of the mean.
+        """
+
+        if self.count < 2:
+            half_width = np.full_like(self.mean, np.nan)
+        else:
+            half_width = stats.t.ppf((1 + confidence) / 2, self.count - 1) \
+                * self.get_std() / np.sqrt(self.count)
+
+        return self.mean - half_width, self.mean + half_width
+
+
+class P2Quantile:
+    """
+    Streaming estimate of a quantile of arrays of fixed shape (one array
+    per replicate) with P-square algorithm (Jain and Chlamtac, 1985), which
+    keeps 5 markers per element instead of all values.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...],
+        quantile: float
+    ):
+        self.quantile = quantile
+        self.count = 0
+        # marker heights, their positions and desired positions (positions
+        # are 1-based, as in the paper)
+        self.heights = np.zeros((5, *shape), dtype=np.float64)
+        self.positions = np.tile(
+            np.arange(1., 6.).reshape((5,) + (1,) * len(shape)),
+            (1, *shape)
+        )
+        self.desired_positions = np.array([
+            1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5
+        ])
+        self.increments = np.array([
+            0, quantile / 2, quantile, (1 + quantile) / 2, 1
+        ])
+
+    @classmethod
+    def from_values(
+        cls,
+        values: np.ndarray,
+        quantile: float
+    ) -> 'P2Quantile':
+        """
+        Constructs P2Quantile from first values (array of shape
+        (num_values, *shape), at least 5 values): markers are placed at
+        their desired positions, with exact quantiles as heights.
+        """
+
+        assert len(values) >= 5
+
+        estimator = cls(values.shape[1:], quantile)
+        estimator.count = len(values)
+        marker_quantiles = np.array([
+            0, quantile / 2, quantile, (1 + quantile) / 2, 1
+        ])
+        estimator.desired_positions = 1 + (len(values) - 1) * marker_quantiles
+        estimator.heights = np.quantile(values, marker_quantiles, axis=0)
+        estimator.positions = np.broadcast_to(
+            estimator.desired_positions.reshape(
+                (5,) + (1,) * (values.ndim - 1)
+            ),
+            estimator.heights.shape
+        ).copy()
+
+        return estimator
+
+    def add(
+        self,
+        values: np.ndarray
+    ):
+        # first 5 values are kept as they are
+        if self.count < 5:
+            self.heights[self.count] = values
+            self.count += 1
+            if self.count == 5:
+                self.heights.sort(axis=0)
+            return
+
+        self.count += 1
+        heights = self.heights
+        positions = self.positions
+
+        heights[0] = np.minimum(heights[0], values)
+        heights[4] = np.maximum(heights[4], values)
+        # cell k of value: heights[k] <= value < heights[k+1]
+        cell = (values >= heights[1]).astype(np.int64) \
+            + (values >= heights[2]) + (values >= heights[3])
+        for i in range(1, 5):
+            positions[i] += cell < i
+        self.desired_positions = self.desired_positions + self.increments
+
+        for i in range(1, 4):
+            d = self.desired_positions[i] - positions[i]
+            adjust = (
+                ((d >= 1) & (positions[i+1] - positions[i] > 1))
+                | ((d <= -1) & (positions[i-1] - positions[i] < -1))
+            )
+            if not adjust.any():
+                continue
+
+            # elements which are not adjusted get d = +1, so formulas are
+            # defined for them too
+            d = np.where(d <= -1, -1., 1.)
+            parabolic = heights[i] + d / (positions[i+1] - positions[i-1]) * (
+                (positions[i] - positions[i-1] + d)
+                * (heights[i+1] - heights[i])
+                / (positions[i+1] - positions[i])
+                + (positions[i+1] - positions[i] - d)
+                * (heights[i] - heights[i-1])
+                / (positions[i] - positions[i-1])
+            )
+            neighbour = np.where(d > 0, i + 1, i - 1)
+            neighbour_heights = np.choose(neighbour, heights)
+            neighbour_positions = np.choose(neighbour, positions)
+            linear = heights[i] + d * (neighbour_heights - heights[i]) \
+                / (neighbour_positions - positions[i])
+
+            is_parabolic = (heights[i-1] < parabolic) \
+                & (parabolic < heights[i+1])
+            heights[i] = np.where(
+                adjust,
+                np.where(is_parabolic, parabolic, linear),
+                heights[i]
+            )
+            positions[i] += np.where(adjust, d, 0)
+
+    def get_quantile(self) -> np.ndarray:
+        """
+        Returns estimated quantile (exact for up to 5 values).
+        """
+
+        if self.count == 0:
+            return np.full(self.heights.shape[1:], np.nan)
+        if self.count <= 5:
+            return np.quantile(
+                self.heights[:self.count], self.quantile, axis=0
+            )
+
+        return self.heights[2].copy()
+
+
+class StreamingQuantiles:
+    """
+    Quantiles of arrays of fixed shape (one array per replicate): exact
+    for up to max_exact_values arrays, then estimated with P2Quantile
+    started from them.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...],
+        quantiles: Sequence[float] = QUANTILES,
+        max_exact_values: int = EXACT_QUANTILES_REPLICATES
+    ):
+        assert max_exact_values >= 5
+
+        self.quantiles = quantiles
+        self.count = 0
+        self.values = np.zeros((max_exact_values, *shape), dtype=np.float64)
+        self.estimators = None
+
+    def add(
+        self,
+        values: np.ndarray
+    ):
+        if self.estimators is not None:
+            for estimator in self.estimators:
+                estimator.add(values)
+            return
+
+        self.values[self.count] = values
+        self.count += 1
+
+        if self.count == len(self.values):
+            self.estimators = [
+                P2Quantile.from_values(self.values, quantile)
+                for quantile in self.quantiles
+            ]
+            self.values = None
+
+    def get_quantiles(self) -> List[np.ndarray]:
+        if self.estimators is not None:
+            return [estimator.get_quantile() for estimator in self.estimators]
+        if self.count == 0:
+            return [
+                np.full(self.values.shape[1:], np.nan) for _ in self.quantiles
+            ]
+
+        return list(
+            np.quantile(self.values[:self.count], self.quantiles, axis=0)
+        )
+
+
+class ReplicatesSummary:
+    """
+    Summary of metrics of many replicates of a scenario (see
+    get_replicate_metrics): running means, standard deviations, confidence
+    intervals of means and quantiles. Memory use does not depend on number
+    of replicates.
+    """
+
+    def __init__(
+        self,
+        quantiles: Sequence[float] = QUANTILES,
+        confidence: float = CONFIDENCE
+    ):
+        self.quantiles = quantiles
+        self.confidence = confidence
+        self.labels = None
+        self.moments = {}
+        self.quantile_estimators = {}
+
+    def add(
+        self,
+        metrics: Dict[str, np.ndarray],
+        labels: Dict[str, np.ndarray]
+    ):
+        """
+        Adds metrics of one replicate.
+
+        Parameters
+        ----------
+            metrics: Dict[str, np.ndarray]
+                Metrics of replicate (see get_replicate_metrics).
+            labels: Dict[str, np.ndarray]
+                Labels of metrics' axes (e.g. regions), which must be the
+                same in all replicates.
+        """
+
+        if self.labels is None:
+            self.labels = labels
+            for name, values in metrics.items():
+                self.moments[name] = Welford(values.shape)
+                self.quantile_estimators[name] = StreamingQuantiles(
+                    values.shape, self.quantiles
+                )
+        else:
+            for name, values in labels.items():
+                if not np.array_equal(values, self.labels[name]):
+                    raise ValueError(
+                        f'Replicates have different {name} labels.'
+                    )
+
+        for name, values in metrics.items():
+            self.moments[name].add(values)
+            self.quantile_estimators[name].add(values)
+
+    def get_results(self) -> Dict[str, pd.DataFrame]:
+        """
+        Returns summary table of each metric: label columns (e.g.
+        start_region and transport_mode), mean, std, ci_low, ci_high and
+        quantiles (e.g. q5, q50, q95). OD flows table has only pairs of
+        regions with any travel.
+        """
+
+        results = {}
+
+        for name, moments in self.moments.items():
+            axes = METRICS_AXES[name]
+            ci_low, ci_high = moments.get_confidence_interval(
+                self.confidence
+            )
+            columns = {
+                'mean': moments.mean,
+                'std': moments.get_std(),
+                'ci_low': ci_low,
+                'ci_high': ci_high,
+                **{
+                    'q' + format(100 * quantile, 'g'): values
+                    for quantile, values in zip(
+                        self.quantiles,
+                        self.quantile_estimators[name].get_quantiles()
+                    )
+                }
+            }
+
+            indices = np.indices(moments.mean.shape).reshape(
+                len(axes), moments.mean.size
+            )
+            table = pd.DataFrame({
+                **{
+                    axis: self.labels[axis][axis_indices]
+                    for axis, axis_indices in zip(axes, indices)
+                },
+                **{
+                    column: values.reshape(-1)
+                    for column, values in columns.items()
+                }
+            })
+            if name == 'od_flows':
+                table = table[table['mean'] > 0].reset_index(drop=True)
+
+            results[name] = table.assign(num_replicates=moments.count)
+
+        return results
+
+
+def get_replicate_metrics(
+    start_region: np.ndarray,
+    dest_region: np.ndarray,
+    transport_mode: np.ndarray,
+    hour: np.ndarray,
+    count: np.ndarray,
+    num_regions: int,
+    num_hours: int
+) -> Dict[str, np.ndarray]:
+    """
+    Returns metrics of a replicate from counts of travels by start and
+    destination region codes, transport mode and hour (one of num_hours
+    start hours, see get_num_hours): number of trips,
+    mode share, mode share by hour (0 in hours without travels), trip
+    production of regions, mode share of trips starting in each region (0
+    in regions without travels) and OD flows between regions.
+    """
+
+    count = np.asarray(count, dtype=np.float64)
+    trips = count.sum()
+
+    mode_trips = np.bincount(
+        transport_mode, weights=count, minlength=NUM_TRANSPORT_MODES
+    )
+    hour_mode_trips = np.bincount(
+        hour * NUM_TRANSPORT_MODES + transport_mode,
+        weights=count,
+        minlength=num_hours * NUM_TRANSPORT_MODES
+    ).reshape(num_hours, NUM_TRANSPORT_MODES)
+    hour_trips = hour_mode_trips.sum(axis=1, keepdims=True)
+    region_mode_trips = np.bincount(
+        start_region * NUM_TRANSPORT_MODES + transport_mode,
+        weights=count,
+        minlength=num_regions * NUM_TRANSPORT_MODES
+    ).reshape(num_regions, NUM_TRANSPORT_MODES)
+    region_trips = region_mode_trips.sum(axis=1, keepdims=True)
+
+    return {
+        'trips': np.array(trips),
+        'mode_share': mode_trips / trips if trips > 0 else mode_trips,
+        'mode_share_by_hour': np.divide(
+            hour_mode_trips,
+            hour_trips,
+            out=np.zeros_like(hour_mode_trips),
+            where=hour_trips > 0
+        ),
+        'production': region_trips[:, 0],
+        'region_mode_share': np.divide(
+            region_mode_trips,
+            region_trips,
+            out=np.zeros_like(region_mode_trips),
+            where=region_trips > 0
+        ),
+        'od_flows': np.bincount(
+            start_region * num_regions + dest_region,
+            weights=count,
+            minlength=num_regions * num_regions
+        ).reshape(num_regions, num_regions)
+    }
+
+
+def _region_codes(
+    regions: pd.Series,
+    categories: np.ndarray
+) -> np.ndarray:
+    codes = pd.Categorical(regions, categories=categories).codes
+
+    return codes.astype(np.int64)
+
+
+def load_replicate_metrics(
+    replicate: Replicate,
+    num_hours: int,
+    regions: Optional[Sequence[str]] = None
+) -> Tuple[str, Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Loads travels (or od_counts) table of a replicate and returns its
+    scenario, metrics (see get_table_metrics) and labels of metrics'
+    axes. Only the needed columns are kept in memory.
+    """
+
+    results_format, path, scenario, run_num, table_name = replicate
+
+    if table_name == 'travels':
+        columns = [
+            'start_region', 'dest_region', 'transport_mode',
+            'travel_start_time'
+        ]
+    else:
+        columns = [
+            'start_region', 'dest_region', 'transport_mode', 'hour', 'count'
+        ]
+
+    if results_format == 'parquet':
+        table = read_parquet_results(
+            path,
+            table_name,
+            columns=columns,
+            filters=[('scenario', '=', scenario), ('replicate', '=', run_num)]
+        )
+    else:
+        table = pd.read_pickle(os.path.join(
+            path, table_name + '_results_' + str(run_num) + '.pkl'
+        ))[columns]
+
+    return (
+        scenario, *get_table_metrics(table, table_name, num_hours, regions)
+    )
+
+
+def get_table_metrics(
+    table: pd.DataFrame,
+    table_name: str,
+    num_hours: int,
+    regions: Optional[Sequence[str]] = None
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Returns metrics (see get_replicate_metrics) of travels or od_counts
+    results table with travels starting in num_hours hours and labels of
+    metrics' axes. Regions are labels of region axes, if not given they
+    are all start and destination regions of table.
+    """
+
+    if table_name == 'travels':
+        hour = table['travel_start_time'].to_numpy() // MINUTES_PER_HOUR
+        count = np.ones(len(table))
+    else:
+        hour = table['hour'].to_numpy()
+        count = table['count'].to_numpy()
+
+    # categories of regions of model results are all regions of model (see
+    # Vocabularies), so they are the same in all replicates. Region columns
+    # of legacy results are strings, so their regions are only regions
+    # with travels (replicates may need regions to have equal labels)
+    if regions is None:
+        regions = np.union1d(*[
+            np.asarray(table[column].astype('category').cat.categories)
+            for column in ['start_region', 'dest_region']
+        ])
+    regions = np.asarray(regions, dtype=str)
+
+    metrics = get_replicate_metrics(
+        start_region=_region_codes(table['start_region'], regions),
+        dest_region=_region_codes(table['dest_region'], regions),
+        transport_mode=table['transport_mode'].to_numpy(dtype=np.int64),
+        hour=hour.astype(np.int64),
+        count=count,
+        num_regions=len(regions),
+        num_hours=num_hours
+    )
+    labels = {
+        'transport_mode': np.arange(NUM_TRANSPORT_MODES),
+        'hour': np.arange(num_hours),
+        'start_region': regions,
+        'dest_region': regions
+    }
+
+    return metrics, labels
+
+
+def get_results_metrics(
+    results: Dict[str, Any],
+    num_hours: Optional[int] = None
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Returns metrics and labels (see get_table_metrics) of results of a
+    simulation (see runners.simulate) with aggregates or travels. Hours
+    of aggregates are hours of their counts tensor, num_hours is needed
+    only for travels.
+    """
+
+    if 'aggregates' in results:
+        aggregates = results['aggregates']
+        return get_table_metrics(
+            aggregates.get_od_counts(), 'od_counts', aggregates.num_hours
+        )
+
+    assert num_hours is not None
+
+    return get_table_metrics(results['travels'], 'travels', num_hours)
+
+
+def get_ci_half_width(
+    moments: Welford,
+    confidence: float = CONFIDENCE
+) -> float:
+    """
+    Returns the largest half-width of confidence intervals of elements of
+    metric (inf for less than 2 replicates).
+    """
+
+    if moments.count < 2:
+        return np.inf
+
+    ci_low, ci_high = moments.get_confidence_interval(confidence)
+
+    return float(np.max((ci_high - ci_low) / 2))
+
+
+def find_replicates(
+    results_path: str
+) -> Dict[str, List[Replicate]]:
+    """
+    Finds replicates of all scenarios in results folder, which is either
+    root of Parquet datasets (see save_parquet_results) or folder of
+    scenarios' folders with pickled results (see save_results).
+
+    Returns
+    -------
+        replicates: Dict[str, List[Replicate]]
+            Replicates of each scenario, ordered by replicate number.
+    """
+
+    replicates = {}
+
+    for table_name in REPLICATE_TABLES:
+        partitions = glob.glob(os.path.join(
+            results_path, table_name, 'scenario=*', 'replicate=*'
+        ))
+        for partition in partitions:
+            scenario_dir, replicate_dir = os.path.split(partition)
+            scenario = os.path.basename(scenario_dir)[len('scenario='):]
+            run_num = int(replicate_dir[len('replicate='):])
+            replicates.setdefault(scenario, {}).setdefault(
+                run_num,
+                ('parquet', results_path, scenario, run_num, table_name)
+            )
+
+        pattern = re.compile(re.escape(table_name) + r'_results_(\d+)\.pkl$')
+        for file_path in glob.glob(os.path.join(
+            results_path, '*', table_name + '_results_*.pkl'
+        )):
+            match = pattern.search(os.path.basename(file_path))
+            if match is None:
+                continue
+            scenario_path = os.path.dirname(file_path)
+            run_num = int(match.group(1))
+            replicates.setdefault(os.path.basename(scenario_path), {}) \
+                .setdefault(
+                    run_num,
+                    ('pickle', scenario_path, os.path.basename(scenario_path),
+                     run_num, table_name)
+                )
+
+    return {
+        scenario: [
+            scenario_replicates[run_num]
+            for run_num in sorted(scenario_replicates)
+        ]
+        for scenario, scenario_replicates in sorted(replicates.items())
+    }
+
+
+def summarize_replicates(
+    replicates: Dict[str, List[Replicate]],
+    num_processes: int = 1,
+    quantiles: Sequence[float] = QUANTILES,
+    confidence: float = CONFIDENCE,
+    sim_end_time: int = 24*60,
+    regions: Optional[Sequence[str]] = None
+) -> Iterator[Tuple[str, Dict[str, pd.DataFrame]]]:
+    """
+    Streams replicates of each scenario (see find_replicates) into
+    ReplicatesSummary and yields (scenario, summary tables) as soon as
+    all replicates of a scenario are added. Replicates are loaded one at
+    a time by each of num_processes workers, so memory use does not depend
+    on number of replicates or scenarios. Replicates come from simulations
+    ending at sim_end_time (see runners.run), which gives hours of travels
+    (see get_num_hours). Regions (e.g. DistanceMatrix.regions) are labels
+    of region axes of all replicates (see get_table_metrics).
+    """
+
+    tasks = [
+        replicate
+        for scenario_replicates in replicates.values()
+        for replicate in scenario_replicates
+    ]
+
+    with Pool(num_processes) as p:
+        # results come in order of tasks, so scenarios are completed one
+        # after another
+        replicates_metrics = p.imap(
+            partial(
+                load_replicate_metrics,
+                num_hours=get_num_hours(sim_end_time),
+                regions=regions
+            ),
+            tasks
+        )
+
+        for scenario, scenario_replicates in replicates.items():
+            summary = ReplicatesSummary(quantiles, confidence)
+            for _ in scenario_replicates:
+                _, metrics, labels = next(replicates_metrics)
+                summary.add(metrics, labels)
+
+            yield scenario, summary.get_results()
+
+
+def save_summaries(
+    results_path: str,
+    summary_path: str,
+    num_processes: int = 1,
+    scenarios: Optional[Iterable[str]] = None,
+    sim_end_time: int = 24*60,
+    regions: Optional[Sequence[str]] = None
+) -> List[str]:
+    """
+    Summarizes replicates of scenarios in results_path (see
+    summarize_replicates) and writes <summary_path>/<scenario>/<metric>.csv
+    files. Returns names of summarized scenarios.
+    """
+
+    replicates = find_replicates(results_path)
+    if scenarios is not None:
+        replicates = {
+            scenario: replicates[scenario] for scenario in scenarios
+        }
+
+    for scenario, results in summarize_replicates(
+        replicates,
+        num_processes=num_processes,
+        sim_end_time=sim_end_time,
+        regions=regions
+    ):
+        scenario_path = os.path.join(summary_path, scenario)
+        os.makedirs(scenario_path, exist_ok=True)
+
+        for name, table in results.items():
+            table.to_csv(
+                os.path.join(scenario_path, name + '.csv'), index=False
+            )
+
+    return list(replicates)
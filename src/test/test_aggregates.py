@@ -0,0 +1,49 @@
+import numpy as np
+
+from ..aggregates import NUM_TRANSPORT_MODES, TripAggregates
+from ..vocabulary import Vocabularies
+
+
+def test_trip_aggregates():
+    aggregates = TripAggregates(
+        Vocabularies(regions=['1', '2', '3']), end_time=24*60
+    )
+    aggregates.add(
+        start_region=np.array([0, 0, 2]),
+        dest_region=np.array([1, 1, 0]),
+        transport_mode=np.array([1, 1, 0]),
+        travel_start_time=np.array([420., 479., 1440.])
+    )
+    other_aggregates = TripAggregates(
+        Vocabularies(regions=['1', '2', '3']), end_time=24*60
+    )
+    other_aggregates.add(
+        start_region=np.array([1]),
+        dest_region=np.array([1]),
+        transport_mode=np.array([2]),
+        travel_start_time=np.array([480.])
+    )
+    aggregates.merge(other_aggregates)
+
+    od_counts = aggregates.get_od_counts()
+
+    assert od_counts['start_region'].tolist() == ['1', '2', '3']
+    assert od_counts['dest_region'].tolist() == ['2', '2', '1']
+    assert od_counts['hour'].tolist() == [7, 8, 24]
+    assert od_counts['count'].tolist() == [2, 1, 1]
+
+    mode_share = aggregates.get_mode_share().set_index(
+        ['hour', 'transport_mode']
+    )
+
+    assert len(mode_share) == 25 * NUM_TRANSPORT_MODES
+    assert mode_share.loc[(7, 1), 'share'] == 1.
+    assert mode_share.loc[(8, 2), 'count'] == 1
+    assert np.isnan(mode_share.loc[(12, 0), 'share'])
+
+    production = aggregates.get_production().set_index(
+        ['start_region', 'transport_mode']
+    )['count']
+
+    assert production.sum() == 4
+    assert production[('1', 1)] == 2
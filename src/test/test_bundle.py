@@ -0,0 +1,112 @@
+import pickle
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..bundle import (BUNDLE_VERSION, load_bundle, save_bundle,
+                      validate_distributions)
+from ..classifiers import CompiledDecisionTree
+from ..distances import DistanceMatrix
+from ..models import ArrayTrafficModel
+from ..samplers import get_replicate_seed
+from .test_models import simulate
+
+
+SETTINGS = ['N', 'start_time', 'step_time', 'end_time']
+
+
+def test_bundle(
+    model_params: Dict[str, Any],
+    tmp_path
+):
+    distributions = validate_distributions({
+        name: value for name, value in model_params.items()
+        if name not in SETTINGS
+    })
+    path = str(tmp_path / 'base_distributions.bundle')
+    save_bundle(distributions, path)
+
+    assert [file_path.name for file_path in tmp_path.iterdir()] \
+        == ['base_distributions.bundle']
+
+    loaded = load_bundle(path)
+
+    assert list(loaded) == list(distributions)
+    for name in ['population_dist', 'demography_dist']:
+        assert np.array_equal(loaded[name][0], distributions[name][0])
+        assert np.array_equal(loaded[name][1], distributions[name][1])
+    for name in ['travel_chains_dist', 'gravity_dist', 'drivers_dist']:
+        assert [key for key, _ in loaded[name]] \
+            == [key for key, _ in distributions[name]]
+        for (_, (ids, probs)), (_, (other_ids, other_probs)) in zip(
+            loaded[name], distributions[name]
+        ):
+            assert np.array_equal(ids, other_ids)
+            assert np.array_equal(probs, other_probs)
+    assert loaded['spend_time_dist_params'] \
+        == distributions['spend_time_dist_params']
+    assert loaded['trip_cancel_prob'] == distributions['trip_cancel_prob']
+    assert isinstance(loaded['decision_tree'], CompiledDecisionTree)
+
+    # memory mapped matrix is pickled as its place in bundle
+    interregional_distances = loaded['interregional_distances']
+    assert isinstance(interregional_distances.matrix, np.memmap)
+    unpickled = pickle.loads(pickle.dumps(interregional_distances))
+    assert isinstance(unpickled.matrix, np.memmap)
+    assert np.array_equal(
+        unpickled.matrix, model_params['interregional_distances'].matrix
+    )
+
+    # model gives the same results with bundled distributions
+    seed = get_replicate_seed(1, 0, 1)
+    params = {
+        **{name: model_params[name] for name in SETTINGS}, **loaded
+    }
+    bundle_results = simulate(ArrayTrafficModel, params, seed=seed)
+    results = simulate(
+        ArrayTrafficModel,
+        {**model_params, **distributions},
+        seed=seed
+    )
+    for bundle_result, result in zip(bundle_results, results):
+        pd.testing.assert_frame_equal(bundle_result, result)
+
+
+def test_bundle_version(tmp_path):
+    path = str(tmp_path / 'base_distributions.bundle')
+    save_bundle({'trip_cancel_prob': {'dom': 0.}}, path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data.replace(
+            b'"version":' + str(BUNDLE_VERSION).encode(), b'"version":0'
+        ))
+
+    with pytest.raises(ValueError):
+        load_bundle(path)
+
+
+def test_validate_distributions():
+    ids = np.array(['a', 'b'])
+    distributions = validate_distributions({
+        'population_dist': (ids, np.array([0.5, 0.501])),
+        'drivers_dist': [('K', (ids, np.array([0.2, 0.795])))],
+        'interregional_distances': DistanceMatrix(['1'], np.zeros((1, 1)))
+    })
+
+    assert np.isclose(distributions['population_dist'][1].sum(), 1.)
+    assert np.allclose(distributions['drivers_dist'][0][1][1].sum(), 1.)
+
+    for invalid in [
+        {'population_dist': (ids, np.array([0.5, 0.4]))},
+        {'drivers_dist': [('K', (ids, np.array([1.2, -0.2])))]},
+        {'drivers_dist': [('K', (ids, np.array([0.5, np.nan])))]},
+        {'drivers_dist': [('K', (ids[:0], np.array([])))]},
+        {'trip_cancel_prob': {'dom': 1.5}},
+        {'spend_time_dist_params': [(('K', 'dom'), {'loc': 1, 'scale': -1})]}
+    ]:
+        with pytest.raises(ValueError):
+            validate_distributions(invalid)
@@ -1,6 +1,10 @@
+import pickle
+
+import numpy as np
 from sklearn.tree import DecisionTreeClassifier
 
-from ..classifiers import TranportModeDecisionTree
+from ..classifiers import (CompiledDecisionTree, TranportModeDecisionTree,
+                           compile_decision_tree, load_decision_tree)
 from ..data_models import TransportModeInputs
 
 
@@ -19,3 +23,106 @@ def test_transport_mode_decision_tree(
 
     assert type(prediction) == int
     assert prediction in [0, 1, 2, 3]
+
+
+def test_transport_mode_decision_tree_batch(
+    decision_tree: DecisionTreeClassifier,
+    transport_mode_inputs: TransportModeInputs
+):
+
+    tranport_mode_tree = TranportModeDecisionTree(
+        decision_tree=decision_tree
+    )
+
+    distances = np.linspace(0, 20000, 200)
+    inputs = np.stack([
+        transport_mode_inputs.get_input_vector(distance)
+        for distance in distances
+    ])
+
+    predictions = tranport_mode_tree.predict_batch(inputs)
+
+    assert predictions.shape == (len(distances),)
+    assert list(predictions) == [
+        tranport_mode_tree(input_vector) for input_vector in inputs
+    ]
+    assert len(tranport_mode_tree.predict_batch(np.empty((0, 9)))) == 0
+
+
+def test_compiled_decision_tree(
+    decision_tree: DecisionTreeClassifier
+):
+    rng = np.random.default_rng(0)
+    inputs = np.column_stack([
+        rng.integers(0, 13, size=(100000, 8)),
+        rng.uniform(0, 20000, size=100000)
+    ]).astype(np.float64)
+    # values equal to split thresholds
+    thresholds = decision_tree.tree_.threshold[
+        decision_tree.tree_.feature == 8
+    ]
+    inputs[:len(thresholds), 8] = thresholds
+
+    compiled_tree = CompiledDecisionTree.from_sklearn(decision_tree)
+
+    assert np.array_equal(
+        compiled_tree.predict(inputs),
+        decision_tree.predict(inputs)
+    )
+
+
+def test_compiled_decision_tree_save_load(
+    decision_tree: DecisionTreeClassifier,
+    tmp_path
+):
+    tree_path = str(tmp_path / 'tree.pickle')
+    with open(tree_path, 'wb') as f:
+        pickle.dump(decision_tree, f)
+
+    compiled_path = compile_decision_tree(tree_path)
+    loaded_tree = load_decision_tree(tree_path)
+
+    inputs = np.random.default_rng(0).uniform(0, 10, size=(1000, 9))
+
+    assert compiled_path == str(tmp_path / 'tree.npz')
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'tree.npz', 'tree.pickle'
+    ]
+    assert np.array_equal(
+        loaded_tree.predict(inputs),
+        decision_tree.predict(inputs)
+    )
+    assert TranportModeDecisionTree(loaded_tree)(inputs[0]) == \
+        decision_tree.predict(inputs[:1])[0]
+
+
+def test_mode_choice_cache(
+    decision_tree: DecisionTreeClassifier
+):
+    rng = np.random.default_rng(0)
+    profiles = rng.integers(-1, 13, size=(300, 8)).astype(np.float64)
+    agents_profiles = profiles[rng.integers(0, 300, size=20000)]
+    distances = rng.uniform(0, 20000, size=20000)
+    # distances equal to split thresholds and next float32 values
+    thresholds = decision_tree.tree_.threshold[
+        decision_tree.tree_.feature == 8
+    ]
+    distances[:len(thresholds)] = thresholds
+    distances[len(thresholds):2 * len(thresholds)] = np.nextafter(
+        thresholds.astype(np.float32), np.float32(np.inf)
+    )
+
+    tranport_mode_tree = TranportModeDecisionTree(
+        decision_tree=decision_tree
+    )
+    profile_ids = tranport_mode_tree.get_profile_ids(agents_profiles)
+
+    assert profile_ids.max() < len(profiles)
+    assert np.array_equal(
+        tranport_mode_tree.get_profile_ids(agents_profiles[:100]),
+        profile_ids[:100]
+    )
+    assert np.array_equal(
+        tranport_mode_tree.predict_profiles(profile_ids, distances),
+        decision_tree.predict(np.column_stack([agents_profiles, distances]))
+    )
@@ -0,0 +1,61 @@
+import pickle
+
+import numpy as np
+import ujson as json
+
+from ..distances import (DistanceMatrix, compile_distance_matrix,
+                         load_distance_matrix)
+
+
+INTERREGIONAL_DISTANCES = {
+    '1': {'1': 0., '2': 1200.5, '10': 3000.},
+    '2': {'1': 1200.5, '2': 0., '10': 1800.},
+    '10': {'1': 3000., '2': 1800., '10': 0.}
+}
+
+
+def test_distance_matrix():
+    distance_matrix = DistanceMatrix.from_dict(INTERREGIONAL_DISTANCES)
+
+    assert distance_matrix.matrix.dtype == np.float32
+    assert distance_matrix.matrix.shape == (3, 3)
+
+    for start_region, distances in INTERREGIONAL_DISTANCES.items():
+        for dest_region, distance in distances.items():
+            assert distance_matrix.get_distance(
+                *distance_matrix.get_indices([start_region, dest_region])
+            ) == distance
+
+    assert np.array_equal(
+        distance_matrix.get_distances(
+            distance_matrix.get_indices(['1', '10', '2']),
+            distance_matrix.get_indices(['10', '2', '2'])
+        ),
+        [3000., 1800., 0.]
+    )
+
+
+def test_distance_matrix_save_load(tmp_path):
+    distances_path = str(tmp_path / 'distances.json')
+    with open(distances_path, 'w') as f:
+        json.dump(INTERREGIONAL_DISTANCES, f)
+
+    compiled_path = compile_distance_matrix(distances_path)
+    distance_matrix = load_distance_matrix(distances_path)
+
+    assert compiled_path == str(tmp_path / 'distances.npy')
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'distances.json', 'distances.npy', 'distances_regions.npy'
+    ]
+    assert isinstance(distance_matrix.matrix, np.memmap)
+    assert distance_matrix.get_distance(
+        *distance_matrix.get_indices(['2', '10'])
+    ) == 1800.
+
+    # pickled memory mapped matrix is mapped again, not copied
+    unpickled_matrix = pickle.loads(pickle.dumps(distance_matrix))
+
+    assert isinstance(unpickled_matrix.matrix, np.memmap)
+    assert unpickled_matrix.get_distance(
+        *unpickled_matrix.get_indices(['10', '1'])
+    ) == 3000.
@@ -0,0 +1,57 @@
+import time
+
+from ..job_queue import DONE, FAILED, LEASED, PENDING, JobQueue
+
+
+def test_job_queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'))
+
+    assert queue.add_jobs([('a', 1, [['x-up', 0.1]]), ('a', 2, None)]) == 2
+    # jobs already in queue are skipped
+    assert queue.add_jobs([('a', 2, None), ('b', 1, None)]) == 1
+
+    job = queue.lease('worker_1')
+    assert (job.scenario, job.replicate, job.payload) \
+        == ('a', 1, [['x-up', 0.1]])
+    other_job = queue.lease('worker_2')
+    assert (other_job.scenario, other_job.replicate) == ('a', 2)
+
+    assert queue.heartbeat(job, 'worker_1')
+    assert not queue.heartbeat(job, 'worker_2')
+    assert queue.complete(job, 'worker_1')
+    assert not queue.complete(job, 'worker_1')
+
+    queue.release(other_job, 'worker_2')
+    assert queue.counts() == {PENDING: 2, LEASED: 0, DONE: 1, FAILED: 0}
+
+    assert queue.lease('worker_1').replicate == 2
+    assert queue.lease('worker_1').scenario == 'b'
+    assert queue.lease('worker_1') is None
+
+
+def test_job_queue_expired_lease(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    queue = JobQueue(path, lease_timeout=0.05, max_attempts=2)
+    queue.add_jobs([('a', 1, None)])
+
+    job = queue.lease('worker_1')
+    time.sleep(0.1)
+
+    # lease of worker which stopped sending heartbeats is given to
+    # other worker
+    other_queue = JobQueue(path, lease_timeout=0.05, max_attempts=2)
+    lost_job = other_queue.lease('worker_2')
+    assert lost_job.id == job.id and lost_job.attempts == 1
+    assert not queue.heartbeat(job, 'worker_1')
+    assert not queue.complete(job, 'worker_1')
+
+    # heartbeats keep the lease
+    with other_queue.keep_alive(lost_job, 'worker_2', interval=0.01):
+        time.sleep(0.1)
+        assert queue.requeue_expired() == 0
+    time.sleep(0.1)
+
+    # job is failed after max_attempts expired leases
+    assert queue.requeue_expired() == 1
+    assert queue.counts()[FAILED] == 1
+    assert queue.lease('worker_1') is None
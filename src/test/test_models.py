@@ -0,0 +1,434 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..models import (CATEGORICAL_COLUMNS, ArrayTrafficModel, TrafficModel,
+                      TravelEventQueue)
+from ..samplers import GLOBAL_SEED, get_replicate_seed
+from ..scenarios import apply_scenario
+from ..stage_cache import StageCache
+
+
+def simulate(
+    model_class,
+    model_params: Dict[str, Any],
+    seed=GLOBAL_SEED,
+    **kwargs
+):
+    model = model_class(**model_params, seed=seed, **kwargs)
+
+    for _ in range(
+        model_params['start_time'],
+        model_params['end_time']+1,
+        model_params['step_time']
+    ):
+        model.step()
+
+    return model.get_agents_results(), model.get_travels_results()
+
+
+def test_array_traffic_model_results_structure(
+    model_params: Dict[str, Any]
+):
+    agents_results, travels_results = simulate(TrafficModel, model_params)
+    array_agents_results, array_travels_results = simulate(
+        ArrayTrafficModel, model_params
+    )
+
+    assert list(array_agents_results.columns) == list(agents_results.columns)
+    assert array_agents_results.index.names == agents_results.index.names
+    assert len(array_agents_results) == len(agents_results)
+    assert list(array_travels_results.columns) == \
+        list(travels_results.columns)
+    assert len(array_travels_results) > 0
+
+    for results in [
+        agents_results, array_agents_results,
+        travels_results, array_travels_results
+    ]:
+        for column in CATEGORICAL_COLUMNS:
+            if column in results:
+                assert isinstance(results[column].dtype, pd.CategoricalDtype)
+
+    assert set(array_agents_results['age_sex']) <= \
+        {"0-5", "16-19_K", "45-65_M"}
+    assert set(array_travels_results['dest_region']) <= {'1', '2', '3'}
+
+
+def test_array_traffic_model_results(
+    model_params: Dict[str, Any]
+):
+    agents_results, travels_results = simulate(
+        TrafficModel, model_params, seed=3
+    )
+    array_agents_results, array_travels_results = simulate(
+        ArrayTrafficModel, model_params, seed=3
+    )
+
+    # both engines synthesize the same population and schedules from the
+    # same seed
+    pd.testing.assert_frame_equal(array_agents_results, agents_results)
+    assert agents_results['household_cars'].isna().any()
+
+    travels_results, array_travels_results = [
+        results.sort_values(['agent_id', 'travel_start_time'])
+        .reset_index(drop=True)
+        for results in [travels_results, array_travels_results]
+    ]
+    schedule_columns = [
+        'agent_id', 'start_place_type', 'dest_place_type',
+        'travel_start_time', 'dest_activity_dur_time'
+    ]
+    pd.testing.assert_frame_equal(
+        array_travels_results[schedule_columns],
+        travels_results[schedule_columns]
+    )
+
+    # destinations and transport modes are drawn in other order, so only
+    # their shares are close
+    for column in ['dest_region', 'transport_mode']:
+        shares = travels_results[column].value_counts(normalize=True)
+        array_shares = array_travels_results[column].value_counts(
+            normalize=True
+        )
+        assert np.allclose(
+            array_shares.reindex(shares.index, fill_value=0), shares,
+            atol=0.1
+        )
+
+
+def test_array_traffic_model_travels(
+    model_params: Dict[str, Any]
+):
+    agents_results, travels_results = simulate(
+        ArrayTrafficModel, model_params
+    )
+
+    travels_num = travels_results.groupby('agent_id').size()
+    assert np.all(
+        travels_num <= agents_results.set_index('agent_id')['travels_num']
+        .loc[travels_num.index]
+    )
+
+    for _, agent_travels in travels_results.groupby('agent_id'):
+        assert agent_travels['travel_start_time'].is_monotonic_increasing
+        assert agent_travels['start_place_type'].iloc[0] == 'dom'
+        assert np.all(
+            agent_travels['start_region'].values[1:]
+            == agent_travels['dest_region'].values[:-1]
+        )
+
+    drivers = travels_results['transport_mode'] == 0
+    assert travels_results.loc[drivers, 'is_driver'].isin(['0', '1']).all()
+    assert pd.isnull(travels_results.loc[~drivers, 'is_driver']).all()
+
+
+def test_travel_event_queue():
+    travel_queue = TravelEventQueue(start_time=240, step_time=60)
+
+    travel_queue.push(
+        np.array([0, 1, 2, 3, 4]),
+        np.array([100., 240., 241., 300., 1000.])
+    )
+
+    assert set(travel_queue.pop(240)) == {0, 1}
+    assert set(travel_queue.pop(300)) == {2, 3}
+    assert len(travel_queue.pop(360)) == 0
+    assert set(travel_queue.pop(1020)) == {4}
+
+
+def test_event_driven_traffic_model(
+    model_params: Dict[str, Any]
+):
+    model = TrafficModel(**{**model_params, 'event_driven': True})
+
+    for _ in range(
+        model_params['start_time'],
+        model_params['end_time']+1,
+        model_params['step_time']
+    ):
+        model.step()
+
+    travels_results = model.get_travels_results()
+
+    # only travels planned after the end of simulation are left
+    for agent in model.agents:
+        for schedule_element in agent.schedule:
+            assert schedule_element.travel_start_time > \
+                model_params['end_time']
+    assert len(travels_results) > 0
+    assert list(travels_results.columns) == \
+        list(simulate(TrafficModel, model_params)[1].columns)
+
+
+def test_array_traffic_model_minute_steps(
+    model_params: Dict[str, Any]
+):
+    model = ArrayTrafficModel(**{**model_params, 'step_time': 1})
+
+    for _ in range(
+        model_params['start_time'],
+        model_params['end_time']+1,
+        1
+    ):
+        model.step()
+
+    travels_results = model.get_travels_results()
+
+    assert len(travels_results) == np.sum(
+        model.schedules.travel_start_time <= model_params['end_time']
+    )
+
+
+def test_models_reproducible(
+    model_params: Dict[str, Any]
+):
+    for model_class in [TrafficModel, ArrayTrafficModel]:
+        agents_results, travels_results = simulate(
+            model_class, model_params, seed=get_replicate_seed(1, 'a', 1)
+        )
+        same_agents_results, same_travels_results = simulate(
+            model_class, model_params, seed=get_replicate_seed(1, 'a', 1)
+        )
+        _, other_travels_results = simulate(
+            model_class, model_params, seed=get_replicate_seed(1, 'a', 2)
+        )
+
+        pd.testing.assert_frame_equal(agents_results, same_agents_results)
+        pd.testing.assert_frame_equal(travels_results, same_travels_results)
+        assert not travels_results.equals(other_travels_results)
+
+        # models built without seed use GLOBAL_SEED
+        for name in ['home_region', 'age_sex', 'household_cars']:
+            assert np.array_equal(
+                getattr(model_class(**model_params).population, name),
+                getattr(
+                    model_class(**model_params, seed=GLOBAL_SEED).population,
+                    name
+                )
+            )
+
+
+def test_array_traffic_model_agent_streams(
+    model_params: Dict[str, Any]
+):
+    seed = get_replicate_seed(1, 'a', 1)
+    model = ArrayTrafficModel(**model_params, seed=seed, agent_streams=True)
+    other_model = ArrayTrafficModel(
+        **{**model_params, 'N': 2 * model_params['N']},
+        seed=seed,
+        agent_streams=True
+    )
+
+    # agents' attributes and schedules do not depend on population size
+    for name in ['home_region', 'age_sex', 'household_cars']:
+        assert np.array_equal(
+            getattr(model.population, name),
+            getattr(other_model.population, name)[:model.num_agents]
+        )
+    num_travels = model.schedules.offsets[-1]
+    assert np.array_equal(
+        model.schedules.offsets,
+        other_model.schedules.offsets[:model.num_agents + 1]
+    )
+    assert np.array_equal(
+        model.schedules.travel_start_time,
+        other_model.schedules.travel_start_time[:num_travels]
+    )
+
+    agents_results, travels_results = simulate(
+        ArrayTrafficModel, model_params, seed=seed, agent_streams=True
+    )
+    _, other_travels_results = simulate(
+        ArrayTrafficModel,
+        {**model_params, 'N': 2 * model_params['N']},
+        seed=seed,
+        agent_streams=True
+    )
+    other_travels_results = other_travels_results[
+        other_travels_results['agent_id'] < model_params['N']
+    ]
+
+    pd.testing.assert_frame_equal(travels_results, other_travels_results)
+
+    with pytest.raises(ValueError):
+        TrafficModel(**model_params, agent_streams=True)
+
+
+def test_array_traffic_model_shards(
+    model_params: Dict[str, Any]
+):
+    seed = get_replicate_seed(1, 'a', 1)
+    agents_results, travels_results = simulate(
+        ArrayTrafficModel, model_params, seed=seed, agent_streams=True
+    )
+
+    shards_results = [
+        simulate(
+            ArrayTrafficModel,
+            {**model_params, 'N': num_agents},
+            seed=seed,
+            agent_streams=True,
+            first_agent_id=first_agent_id
+        )
+        for first_agent_id, num_agents in [
+            (0, model_params['N'] // 3),
+            (model_params['N'] // 3, model_params['N'] - model_params['N'] // 3)
+        ]
+    ]
+
+    # merged shards are the same as not sharded simulation
+    pd.testing.assert_frame_equal(
+        agents_results,
+        pd.concat([agents for agents, _ in shards_results])
+    )
+    pd.testing.assert_frame_equal(
+        travels_results.reset_index(drop=True),
+        pd.concat(
+            [travels for _, travels in shards_results], ignore_index=True
+        )
+    )
+
+    with pytest.raises(ValueError):
+        ArrayTrafficModel(**model_params, first_agent_id=10)
+
+
+def test_array_traffic_model_common_random_numbers(
+    model_params: Dict[str, Any]
+):
+    seed = get_replicate_seed(1, 0, 1)
+    model = ArrayTrafficModel(
+        **model_params,
+        seed=seed,
+        agent_streams=True,
+        common_random_numbers=True
+    )
+    changed_model = ArrayTrafficModel(
+        **apply_scenario(
+            model_params, [['decision_tree/household_cars_dist-down', 0.1]]
+        ),
+        seed=seed,
+        agent_streams=True,
+        common_random_numbers=True
+    )
+
+    # only draws from changed distribution differ, and only for few agents
+    for name in ['home_region', 'age_sex', 'household_persons']:
+        assert np.array_equal(
+            getattr(model.population, name),
+            getattr(changed_model.population, name)
+        )
+    assert np.array_equal(
+        model.schedules.travel_start_time,
+        changed_model.schedules.travel_start_time
+    )
+    assert 0 < np.mean(
+        model.population.household_cars
+        != changed_model.population.household_cars
+    ) < 0.2
+
+    with pytest.raises(ValueError):
+        ArrayTrafficModel(**model_params, common_random_numbers=True)
+
+
+def test_array_traffic_model_stage_cache(
+    model_params: Dict[str, Any],
+    tmp_path
+):
+    seed = get_replicate_seed(1, 0, 1)
+    stage_cache = StageCache(str(tmp_path))
+    agents_results, travels_results = simulate(
+        ArrayTrafficModel,
+        model_params,
+        seed=seed,
+        agent_streams=True,
+        common_random_numbers=True
+    )
+
+    # results of models which compute stages and which reuse them are the
+    # same as results without cache
+    for _ in range(2):
+        cached_agents_results, cached_travels_results = simulate(
+            ArrayTrafficModel,
+            model_params,
+            seed=seed,
+            agent_streams=True,
+            common_random_numbers=True,
+            stage_cache=stage_cache
+        )
+        pd.testing.assert_frame_equal(cached_agents_results, agents_results)
+        pd.testing.assert_frame_equal(cached_travels_results, travels_results)
+
+    # scenario which changes only transport mode inputs reuses trips
+    scenario_params = apply_scenario(
+        model_params, [['decision_tree/household_cars_dist-down', 0.1]]
+    )
+    model = ArrayTrafficModel(
+        **scenario_params,
+        seed=seed,
+        agent_streams=True,
+        common_random_numbers=True,
+        stage_cache=stage_cache
+    )
+    assert model.cached_trips is not None
+    _, scenario_travels_results = simulate(
+        ArrayTrafficModel,
+        scenario_params,
+        seed=seed,
+        agent_streams=True,
+        common_random_numbers=True,
+        stage_cache=stage_cache
+    )
+    _, expected_travels_results = simulate(
+        ArrayTrafficModel,
+        scenario_params,
+        seed=seed,
+        agent_streams=True,
+        common_random_numbers=True
+    )
+    pd.testing.assert_frame_equal(
+        scenario_travels_results, expected_travels_results
+    )
+    assert len(list((tmp_path / 'trips').iterdir())) == 1
+    assert len(list((tmp_path / 'mode_inputs').iterdir())) == 2
+
+    with pytest.raises(ValueError):
+        ArrayTrafficModel(**model_params, stage_cache=stage_cache)
+
+
+@pytest.mark.parametrize('model_class', [TrafficModel, ArrayTrafficModel])
+def test_traffic_model_aggregates(
+    model_params: Dict[str, Any],
+    model_class
+):
+    model = model_class(**model_params, aggregate=True)
+
+    for _ in range(
+        model_params['start_time'],
+        model_params['end_time']+1,
+        model_params['step_time']
+    ):
+        model.step()
+
+    travels_results = model.get_travels_results()
+    od_counts = model.get_trip_aggregates().get_od_counts()
+
+    # aggregates updated during simulation are the same as aggregated
+    # travels results
+    expected_od_counts = travels_results.assign(
+        hour=travels_results['travel_start_time'] // 60
+    ).groupby(
+        ['start_region', 'dest_region', 'transport_mode', 'hour'],
+        observed=True
+    ).size()
+    pd.testing.assert_series_equal(
+        od_counts.set_index(
+            ['start_region', 'dest_region', 'transport_mode', 'hour']
+        )['count'].sort_index().astype(np.int64),
+        expected_od_counts.sort_index().astype(np.int64),
+        check_names=False,
+        check_index_type=False
+    )
+    assert TrafficModel(**model_params).get_trip_aggregates() is None
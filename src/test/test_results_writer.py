@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..results_writer import (
+    TRAVELS_RESULTS_TYPES, read_parquet_results, results_to_arrow,
+    save_parquet_results
+)
+
+
+def get_travels_results(agent_ids) -> pd.DataFrame:
+    return pd.DataFrame({
+        'agent_id': np.array(agent_ids),
+        'start_region': pd.Categorical(['1', '3'], categories=['1', '2', '3']),
+        'start_place_type': pd.Categorical(['dom', 'praca']),
+        'dest_region': pd.Categorical(['2', '1'], categories=['1', '2', '3']),
+        'dest_place_type': pd.Categorical(['praca', 'dom']),
+        'travel_start_time': np.array([420., 960.]),
+        'dest_activity_dur_time': np.array([480., 0.]),
+        'transport_mode': np.array([0, 2]),
+        'is_driver': np.array(['1', None], dtype=object)
+    })
+
+
+def get_agents_results() -> pd.DataFrame:
+    return pd.DataFrame({
+        'agent_id': np.array([0, 1]),
+        'home_region': pd.Categorical(['1', '3']),
+        'age_sex': pd.Categorical(['0-5', '25-44_K']),
+        **{
+            column: np.array([np.nan, 2.])
+            for column in [
+                'pub_trans_comfort', 'pub_trans_punctuality',
+                'bicycle_infrastr_comfort', 'pedestrian_inconvenience',
+                'household_persons', 'household_cars', 'household_bicycles'
+            ]
+        },
+        'travels_num': np.array([0, 2])
+    })
+
+
+def test_results_to_arrow():
+    pa = pytest.importorskip('pyarrow')
+
+    table = results_to_arrow(
+        get_travels_results([0, 1]), TRAVELS_RESULTS_TYPES
+    )
+
+    assert table.column_names == list(TRAVELS_RESULTS_TYPES)
+    assert table.column('start_region').type.value_type == pa.string()
+    assert table.column('travel_start_time').type == pa.int16()
+    assert table.column('transport_mode').type == pa.int8()
+    assert table.column('is_driver').to_pylist() == ['1', None]
+
+    travels_results = get_travels_results([0, 1])
+    travels_results['travel_start_time'] = [420., 420.5]
+    with pytest.raises(pa.ArrowInvalid):
+        results_to_arrow(travels_results, TRAVELS_RESULTS_TYPES)
+
+
+def test_save_parquet_results(tmp_path):
+    pytest.importorskip('pyarrow')
+
+    for scenario, run_num in [(0, 1), (0, 2), ('cars_dist-down_0_1', 1)]:
+        save_parquet_results(
+            {
+                'agents': get_agents_results(),
+                'travels': get_travels_results([run_num, 10])
+            },
+            scenario,
+            run_num,
+            str(tmp_path)
+        )
+
+    # temporary files are renamed to final file
+    assert [
+        path.name
+        for path in (tmp_path / 'travels' / 'scenario=0' / 'replicate=2')
+        .iterdir()
+    ] == ['part-0.parquet']
+
+    travels_results = read_parquet_results(
+        str(tmp_path),
+        columns=['agent_id', 'dest_region', 'replicate'],
+        filters=[('scenario', '=', '0')]
+    ).sort_values(['replicate', 'agent_id'])
+
+    assert travels_results['agent_id'].tolist() == [1, 10, 2, 10]
+    assert travels_results['dest_region'].tolist() == ['2', '1', '2', '1']
+
+    agents_results = read_parquet_results(str(tmp_path), 'agents')
+
+    assert len(agents_results) == 6
+    assert agents_results['household_cars'].isna().sum() == 3
+    assert set(agents_results['scenario']) == {'0', 'cars_dist-down_0_1'}
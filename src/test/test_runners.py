@@ -0,0 +1,184 @@
+import os
+from typing import Any, Dict
+
+import pandas as pd
+import pytest
+
+from .. import runners
+from ..bundle import get_bundle_path, save_bundle, validate_distributions
+from ..runners import (SCENARIOS_CACHE_SIZE, _get_base_params,
+                       _init_scenarios_worker, run, run_scenarios)
+
+
+SETTINGS = ['N', 'start_time', 'step_time', 'end_time']
+
+CHANGES = [['decision_tree/household_cars_dist-down', 0.3]]
+
+RUN_SETTINGS = {
+    'num_agents': 200,
+    'sim_start_time': 4 * 60,
+    'sim_step_time': 60,
+    'sim_end_time': 24 * 60,
+    'engine': 'array',
+    'seed': 7
+}
+
+
+def save_distributions(
+    model_params: Dict[str, Any],
+    in_dir_path: str
+) -> str:
+    # bundle of fixture distributions is loaded by runners as if it was
+    # compiled from json files of in_dir_path
+    save_bundle(
+        validate_distributions({
+            name: value for name, value in model_params.items()
+            if name not in SETTINGS
+        }),
+        get_bundle_path(in_dir_path)
+    )
+
+    return in_dir_path
+
+
+def read_results(out_dir_path: str, run_num: int) -> Dict[str, pd.DataFrame]:
+    return {
+        name: pd.read_pickle(
+            os.path.join(out_dir_path, f'{name}_results_{run_num}.pkl')
+        )
+        for name in ['agents', 'travels']
+    }
+
+
+def test_get_base_params(
+    model_params: Dict[str, Any],
+    tmp_path,
+    monkeypatch
+):
+    for name in ['_worker_settings', '_worker_engine', '_worker_outputs',
+                 '_worker_results_format', '_worker_scenarios']:
+        monkeypatch.setattr(runners, name, None)
+
+    in_dir_paths = [
+        save_distributions(model_params, str(tmp_path / f'dists_{i}'))
+        for i in range(SCENARIOS_CACHE_SIZE + 1)
+    ]
+    _init_scenarios_worker(
+        {
+            'num_agents': 200,
+            'sim_start_time': 4 * 60,
+            'sim_step_time': 60,
+            'sim_end_time': 24 * 60
+        },
+        'array', ('agents', 'travels'), 'pickle'
+    )
+
+    params = _get_base_params(in_dir_paths[0])
+
+    assert params['N'] == 200
+    assert _get_base_params(in_dir_paths[0]) is params
+
+    # least recently used parameters are dropped
+    for in_dir_path in in_dir_paths[1:]:
+        _get_base_params(in_dir_path)
+
+    assert list(runners._worker_scenarios) == in_dir_paths[1:]
+    assert _get_base_params(in_dir_paths[0]) is not params
+    assert list(runners._worker_scenarios) \
+        == in_dir_paths[2:] + in_dir_paths[:1]
+
+
+def test_run_scenarios(
+    model_params: Dict[str, Any],
+    tmp_path
+):
+    in_dir_paths = [
+        save_distributions(model_params, str(tmp_path / f'dists_{i}'))
+        for i in range(SCENARIOS_CACHE_SIZE + 1)
+    ]
+    scenarios = [
+        ('base', in_dir_paths[0], [])
+    ] + [
+        (f'cars_{i}', in_dir_path, CHANGES)
+        for i, in_dir_path in enumerate(in_dir_paths)
+    ]
+
+    run_scenarios(
+        scenarios=[
+            (scenario, in_dir_path, str(tmp_path / scenario), changes)
+            for scenario, in_dir_path, changes in scenarios
+        ],
+        num_simulations=2,
+        num_processes=2,
+        **RUN_SETTINGS
+    )
+
+    # each (scenario, simulation) gives the same results as a simulation
+    # of run with the same scenario and seed
+    for scenario, in_dir_path, changes in scenarios:
+        out_dir_path = str(tmp_path / 'run' / scenario)
+        run(
+            in_dir_path=in_dir_path,
+            out_dir_path=out_dir_path,
+            num_simulations=2,
+            num_processes=1,
+            scenario=scenario,
+            changes=changes,
+            **RUN_SETTINGS
+        )
+
+        for run_num in [1, 2]:
+            results = read_results(str(tmp_path / scenario), run_num)
+            expected = read_results(out_dir_path, run_num)
+            for name, table in results.items():
+                pd.testing.assert_frame_equal(table, expected[name])
+
+    # seeds are keyed by scenario and simulation number
+    travels = {
+        (scenario, run_num):
+            read_results(str(tmp_path / scenario), run_num)['travels']
+        for scenario in ['cars_0', 'cars_1']
+        for run_num in [1, 2]
+    }
+
+    assert not travels['cars_0', 1].equals(travels['cars_0', 2])
+    assert not travels['cars_0', 1].equals(travels['cars_1', 1])
+
+
+@pytest.mark.parametrize(
+    'precision,num_expected',
+    [
+        ({'mode_share': 1., 'production': 1e6}, 2),
+        ({'mode_share': 1e-9, 'production': 1.}, 5)
+    ]
+)
+def test_run_precision(
+    model_params: Dict[str, Any],
+    tmp_path,
+    capsys,
+    precision: Dict[str, float],
+    num_expected: int
+):
+    out_dir_path = str(tmp_path / 'results')
+
+    num_done = run(
+        in_dir_path=save_distributions(model_params, str(tmp_path / 'dists')),
+        out_dir_path=out_dir_path,
+        num_simulations=5,
+        num_processes=2,
+        precision=precision,
+        min_simulations=2,
+        batch_size=2,
+        **RUN_SETTINGS
+    )
+
+    # loose precision stops after min_simulations, tight one runs all
+    # simulations (last batch is cut to num_simulations)
+    assert num_done == num_expected
+    assert sorted(os.listdir(out_dir_path)) == sorted(
+        f'{name}_results_{run_num}.pkl'
+        for name in ['agents', 'travels']
+        for run_num in range(1, num_expected+1)
+    )
+    # progress is printed only if verbose
+    assert capsys.readouterr().out == ''
@@ -3,10 +3,96 @@ from typing import Dict
 
 import numpy as np
 
-from ..samplers import (AgeSexSampler, BaseNormalSampler, BaseSampler,
+from ..samplers import (AgeSexSampler, AliasTable, BaseNormalSampler,
+                        BaseSampler, StackedSampler,
                         DayScheduleSampler, DriverSampler,
-                        GravitySampler, RegionSampler,
-                        TransportModeInputsSampler)
+                        GravitySampler, PopulationSampler, RegionSampler,
+                        TransportModeInputsSampler, get_replicate_seed)
+from ..data_models import MISSING_INPUT
+from ..vocabulary import Vocabularies
+
+
+def to_tuple(dist):
+    return np.array(list(dist.keys())), np.array(list(dist.values()))
+
+
+def to_tuples(dists):
+    return [(key, to_tuple(dist)) for key, dist in dists.items()]
+
+
+def get_day_schedule_sampler(
+    any_travel_dist,
+    travel_chains_dist,
+    start_hour_dist,
+    other_travels_dist,
+    spend_time_dist_params,
+    trip_cancel_prob,
+    vocabularies
+):
+    return DayScheduleSampler(
+        any_travel_dist=to_tuples(any_travel_dist),
+        travel_chains_dist=to_tuples(travel_chains_dist),
+        start_hour_dist=to_tuples(start_hour_dist),
+        other_travels_dist=to_tuples(other_travels_dist),
+        spend_time_dist_params=[
+            ((age_sex, place_type), params)
+            for age_sex, place_types in spend_time_dist_params.items()
+            for place_type, params in place_types.items()
+        ],
+        trip_cancel_prob=trip_cancel_prob,
+        vocabularies=vocabularies
+    )
+
+
+def test_alias_table_1():
+    alias_table = AliasTable([1., 0., 0.])
+
+    samples = alias_table.sample(np.random.default_rng(0), 100000)
+
+    assert np.all(samples == 0)
+
+
+def test_alias_table_2():
+    probs = np.array([0.5, 0.3, 0.15, 0.05, 0.])
+    alias_table = AliasTable(probs)
+
+    samples = alias_table.sample(np.random.default_rng(0), 1000000)
+    freqs = np.bincount(samples, minlength=len(probs)) / len(samples)
+
+    assert np.allclose(freqs, probs, atol=0.005)
+    assert freqs[-1] == 0
+
+
+def test_alias_table_3():
+    alias_table = AliasTable([0.2, 0.8])
+
+    samples = alias_table.sample_from_uniforms(
+        np.array([0., 0.1, 0.4, 0.49, 0.5, 0.99, 0.9999999])
+    )
+
+    assert np.all((samples == 0) | (samples == 1))
+    assert samples[0] == 0
+
+
+def test_alias_table_inverse_cdf():
+    probs = np.array([0.5, 0.3, 0.15, 0.05, 0.])
+    uniforms = np.random.default_rng(0).random(1000000)
+
+    samples = AliasTable(probs).sample_from_uniforms(
+        uniforms, inverse_cdf=True
+    )
+    freqs = np.bincount(samples, minlength=len(probs)) / len(samples)
+
+    assert np.allclose(freqs, probs, atol=0.005)
+    assert freqs[-1] == 0
+
+    # the same numbers mapped through slightly changed probabilities give
+    # mostly the same samples
+    changed_samples = AliasTable(
+        [0.45, 0.35, 0.15, 0.05, 0.]
+    ).sample_from_uniforms(uniforms, inverse_cdf=True)
+
+    assert np.mean(samples != changed_samples) < 0.051
 
 
 def test_base_sampler_1():
@@ -15,7 +101,7 @@ def test_base_sampler_1():
         "B": 0
     }
 
-    sampler = BaseSampler(dist)
+    sampler = BaseSampler(to_tuple(dist))
 
     samples = [sampler() for i in range(100000)]
 
@@ -29,7 +115,7 @@ def test_base_sampler_2():
         "C": 0.2
     }
 
-    sampler = BaseSampler(dist)
+    sampler = BaseSampler(to_tuple(dist))
 
     samples = [sampler() for i in range(100000)]
 
@@ -57,9 +143,14 @@ def test_base_normal_sampler():
 def test_region_sampler(
     region_prob_dist: Dict[str, float]
 ):
-    region_sampler = RegionSampler(region_prob_dist)
-    single_sample = region_sampler()
-    multi_sample = [region_sampler() for i in range(100000)]
+    vocabularies = Vocabularies()
+    region_sampler = RegionSampler(
+        to_tuple(region_prob_dist), vocabularies.region
+    )
+    single_sample = vocabularies.region.categories[region_sampler()]
+    multi_sample = vocabularies.region.decode(
+        [region_sampler() for i in range(100000)]
+    )
 
     sorted_dist = dict(
         sorted(region_prob_dist.items(), key=lambda item: item[1])
@@ -68,7 +159,7 @@ def test_region_sampler(
         sorted(Counter(multi_sample).items(), key=lambda item: item[1])
     )
 
-    assert type(single_sample) == str
+    assert isinstance(single_sample, str)
     assert single_sample in region_prob_dist.keys()
     assert sorted_dist.keys() == sorted_samples_counter.keys()
 
@@ -76,10 +167,13 @@ def test_region_sampler(
 def test_age_sex_sampler(
     demography_dist: Dict[str, float]
 ):
-    age_sex_sampler = AgeSexSampler(demography_dist)
-    single_sample = age_sex_sampler()
+    vocabularies = Vocabularies()
+    age_sex_sampler = AgeSexSampler(
+        to_tuple(demography_dist), vocabularies.age_sex
+    )
+    single_sample = vocabularies.age_sex.categories[age_sex_sampler()]
 
-    assert type(single_sample) == str
+    assert isinstance(single_sample, str)
     assert single_sample in demography_dist.keys()
 
 
@@ -92,68 +186,176 @@ def test_transport_mode_inputs_sampler(
     household_cars_dist: Dict[str, Dict[str, float]],
     household_bicycles_dist: Dict[str, Dict[str, float]]
 ):
+    vocabularies = Vocabularies()
     transport_mode_inputs_sampler = TransportModeInputsSampler(
-        pub_trans_comfort_dist=pub_trans_comfort_dist,
-        pub_trans_punctuality_dist=pub_trans_punctuality_dist,
-        bicycle_infrastr_comfort_dist=bicycle_infrastr_comfort_dist,
-        pedestrian_inconvenience_dist=pedestrian_inconvenience_dist,
-        household_persons_dist=household_persons_dist,
-        household_cars_dist=household_cars_dist,
-        household_bicycles_dist=household_bicycles_dist
+        pub_trans_comfort_dist=to_tuples(pub_trans_comfort_dist),
+        pub_trans_punctuality_dist=to_tuples(pub_trans_punctuality_dist),
+        bicycle_infrastr_comfort_dist=to_tuples(
+            bicycle_infrastr_comfort_dist
+        ),
+        pedestrian_inconvenience_dist=to_tuples(
+            pedestrian_inconvenience_dist
+        ),
+        household_persons_dist=to_tuples(household_persons_dist),
+        household_cars_dist=to_tuples(household_cars_dist),
+        household_bicycles_dist=to_tuples(household_bicycles_dist),
+        age_sex_vocabulary=vocabularies.age_sex
     )
 
-    inputs_1 = transport_mode_inputs_sampler("16-19_K")
-    inputs_2 = transport_mode_inputs_sampler("45-65_M")
+    inputs_1 = transport_mode_inputs_sampler(vocabularies.age_sex["16-19_K"])
+    inputs_2 = transport_mode_inputs_sampler(vocabularies.age_sex["45-65_M"])
 
-    assert type(inputs_1.age) == int
+    assert isinstance(inputs_1.age, (int, np.integer))
     assert inputs_1.age == 1
 
-    assert type(inputs_1.pub_trans_comfort) == int
+    assert isinstance(inputs_1.pub_trans_comfort, (int, np.integer))
     assert 0 <= inputs_1.pub_trans_comfort <= 4
 
-    assert type(inputs_1.pub_trans_punctuality) == int
+    assert isinstance(inputs_1.pub_trans_punctuality, (int, np.integer))
     assert 0 <= inputs_1.pub_trans_punctuality <= 4
 
-    assert type(inputs_1.bicycle_infrastr_comfort) == int
+    assert isinstance(inputs_1.bicycle_infrastr_comfort, (int, np.integer))
     assert 0 <= inputs_1.bicycle_infrastr_comfort <= 4
 
-    assert type(inputs_1.pedestrian_inconvenience) == int
+    assert isinstance(inputs_1.pedestrian_inconvenience, (int, np.integer))
     assert 0 <= inputs_1.pedestrian_inconvenience <= 12
 
-    assert type(inputs_1.household_persons) == int
+    assert isinstance(inputs_1.household_persons, (int, np.integer))
     assert 0 <= inputs_1.household_persons <= 8
 
-    assert type(inputs_1.household_cars) == int
+    assert isinstance(inputs_1.household_cars, (int, np.integer))
     assert 0 <= inputs_1.household_cars <= 4
 
-    assert type(inputs_1.household_bicycles) == int
+    assert isinstance(inputs_1.household_bicycles, (int, np.integer))
     assert 0 <= inputs_1.household_bicycles <= 4
 
-    assert type(inputs_2.age) == int
+    assert isinstance(inputs_2.age, (int, np.integer))
     assert inputs_2.age == 4
 
-    assert type(inputs_2.pub_trans_comfort) == int
+    assert isinstance(inputs_2.pub_trans_comfort, (int, np.integer))
     assert 0 <= inputs_2.pub_trans_comfort <= 4
 
-    assert type(inputs_2.pub_trans_punctuality) == int
+    assert isinstance(inputs_2.pub_trans_punctuality, (int, np.integer))
     assert 0 <= inputs_2.pub_trans_punctuality <= 4
 
-    assert type(inputs_2.bicycle_infrastr_comfort) == int
+    assert isinstance(inputs_2.bicycle_infrastr_comfort, (int, np.integer))
     assert 0 <= inputs_2.bicycle_infrastr_comfort <= 4
 
-    assert type(inputs_2.pedestrian_inconvenience) == int
+    assert isinstance(inputs_2.pedestrian_inconvenience, (int, np.integer))
     assert 0 <= inputs_2.pedestrian_inconvenience <= 12
 
-    assert type(inputs_2.household_persons) == int
+    assert isinstance(inputs_2.household_persons, (int, np.integer))
     assert 0 <= inputs_2.household_persons <= 8
 
-    assert type(inputs_2.household_cars) == int
+    assert isinstance(inputs_2.household_cars, (int, np.integer))
     assert 0 <= inputs_2.household_cars <= 4
 
-    assert type(inputs_1.household_bicycles) == int
+    assert isinstance(inputs_1.household_bicycles, (int, np.integer))
     assert 0 <= inputs_1.household_bicycles <= 4
 
 
+def test_stacked_sampler():
+    rng = np.random.default_rng(0)
+    samplers = {
+        (dest_type, region): BaseSampler(
+            (np.arange(region + 3), rng.random(region + 3))
+        )
+        for dest_type in range(2)
+        for region in range(4)
+    }
+    stacked_sampler = StackedSampler(samplers)
+
+    dest_types = rng.integers(0, 2, size=1000)
+    regions = rng.integers(0, 4, size=1000)
+    uniforms = rng.random(1000)
+
+    assert np.array_equal(
+        stacked_sampler.sample_from_uniforms((dest_types, regions), uniforms),
+        [
+            samplers[dest_type, region].sample_from_uniforms(
+                np.array([uniform])
+            )[0]
+            for dest_type, region, uniform in zip(dest_types, regions, uniforms)
+        ]
+    )
+    assert np.array_equal(
+        stacked_sampler.sample_from_uniforms(
+            (dest_types, regions), uniforms, inverse_cdf=True
+        ),
+        [
+            samplers[dest_type, region].sample_from_uniforms(
+                np.array([uniform]), inverse_cdf=True
+            )[0]
+            for dest_type, region, uniform in zip(dest_types, regions, uniforms)
+        ]
+    )
+
+
+def test_get_replicate_seed():
+    seed = get_replicate_seed(2137, 'scenario_1', 3)
+
+    assert seed.spawn_key == get_replicate_seed(2137, 'scenario_1', 3).spawn_key
+    assert seed.spawn_key != get_replicate_seed(2137, 'scenario_2', 3).spawn_key
+    assert np.array_equal(
+        get_replicate_seed(2137, 1, 3).generate_state(4),
+        np.random.SeedSequence(2137).spawn(2)[1].spawn(4)[3].generate_state(4)
+    )
+
+    sampler = BaseSampler(
+        (np.arange(10), np.full(10, 0.1)),
+        rng=np.random.default_rng(seed)
+    )
+    same_sampler = BaseSampler(
+        (np.arange(10), np.full(10, 0.1)),
+        rng=np.random.default_rng(get_replicate_seed(2137, 'scenario_1', 3))
+    )
+
+    assert np.array_equal(sampler.sample(100), same_sampler.sample(100))
+
+
+def test_population_sampler(
+    region_prob_dist: Dict[str, float],
+    demography_dist: Dict[str, float],
+    pub_trans_comfort_dist: Dict[str, Dict[str, float]]
+):
+    demography_dist = {"0-5": 0.3, "16-19_K": 0.3, "45-65_M": 0.4}
+    inputs_dist = to_tuples(pub_trans_comfort_dist)
+
+    vocabularies = Vocabularies()
+    population_sampler = PopulationSampler(
+        home_region_sampler=RegionSampler(
+            to_tuple(region_prob_dist), vocabularies.region
+        ),
+        age_sex_sampler=AgeSexSampler(
+            to_tuple(demography_dist), vocabularies.age_sex
+        ),
+        transport_mode_inputs_sampler=TransportModeInputsSampler(
+            *[inputs_dist for _ in range(7)],
+            age_sex_vocabulary=vocabularies.age_sex
+        )
+    )
+
+    population = population_sampler(10000)
+    age_sex = vocabularies.age_sex.decode(population.age_sex)
+    children = age_sex == "0-5"
+
+    assert len(population) == 10000
+    assert set(vocabularies.region.decode(population.home_region)) <= \
+        set(region_prob_dist.keys())
+    assert set(age_sex) == set(demography_dist.keys())
+    assert np.all(population.age[children] == 0)
+    assert np.all(population.age[age_sex == "16-19_K"] == 1)
+    assert np.all(population.age[age_sex == "45-65_M"] == 4)
+    assert np.all(population.household_cars[children] == MISSING_INPUT)
+    assert np.all(
+        (0 <= population.pub_trans_comfort[~children])
+        & (population.pub_trans_comfort[~children] <= 4)
+    )
+    assert population.get_transport_mode_inputs(
+        np.nonzero(children)[0][0]
+    ).household_cars is None
+
+
 def test_day_schedule_sampler_1(
     any_travel_dist: Dict[str, Dict[str, float]],
     travel_chains_dist: Dict[str, Dict[str, float]],
@@ -173,16 +375,22 @@ def test_day_schedule_sampler_1(
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        any_travel_dist=any_travel_dist,
-        travel_chains_dist=travel_chains_dist,
-        start_hour_dist=start_hour_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
+    dest_types = [
+        vocabularies.place_type.categories[element.dest_activity_type]
+        for element in schedule
+    ]
 
     assert schedule == []
 
@@ -216,24 +424,30 @@ def test_day_schedule_sampler_2(
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        any_travel_dist=any_travel_dist,
-        travel_chains_dist=travel_chains_dist,
-        start_hour_dist=start_hour_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
+    dest_types = [
+        vocabularies.place_type.categories[element.dest_activity_type]
+        for element in schedule
+    ]
 
     assert len(schedule) == 2
-    # assert schedule[0].dest_activity_type in ['dom', 'praca', 'inne']
-    assert schedule[0].dest_activity_type in [
+    # assert dest_types[0] in ['dom', 'praca', 'inne']
+    assert dest_types[0] in [
         'praca', 'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    assert schedule[1].dest_activity_type == 'dom'
+    assert dest_types[1] == 'dom'
     assert schedule[0].travel_start_time < schedule[1].travel_start_time
     assert 0 <= schedule[0].travel_start_time
     assert 0 <= schedule[1].travel_start_time
@@ -268,29 +482,35 @@ def test_day_schedule_sampler_3(
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        any_travel_dist=any_travel_dist,
-        travel_chains_dist=travel_chains_dist,
-        start_hour_dist=start_hour_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
+    dest_types = [
+        vocabularies.place_type.categories[element.dest_activity_type]
+        for element in schedule
+    ]
 
     assert len(schedule) == 3
-    # assert schedule[0].dest_activity_type in ['dom', 'praca', 'inne']
-    assert schedule[0].dest_activity_type in [
+    # assert dest_types[0] in ['dom', 'praca', 'inne']
+    assert dest_types[0] in [
         'praca', 'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    # assert schedule[1].dest_activity_type in ['dom', 'praca', 'inne']
-    assert schedule[1].dest_activity_type in [
+    # assert dest_types[1] in ['dom', 'praca', 'inne']
+    assert dest_types[1] in [
         'praca', 'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    assert schedule[2].dest_activity_type == 'dom'
+    assert dest_types[2] == 'dom'
     assert schedule[0].travel_start_time < schedule[1].travel_start_time
     assert schedule[1].travel_start_time < schedule[2].travel_start_time
     assert 0 <= schedule[0].travel_start_time
@@ -326,35 +546,41 @@ def test_day_schedule_sampler_4(
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        any_travel_dist=any_travel_dist,
-        travel_chains_dist=travel_chains_dist,
-        start_hour_dist=start_hour_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
+    dest_types = [
+        vocabularies.place_type.categories[element.dest_activity_type]
+        for element in schedule
+    ]
 
     assert len(schedule) == 5
-    assert schedule[0].dest_activity_type in [
+    assert dest_types[0] in [
         'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    assert schedule[1].dest_activity_type in [
+    assert dest_types[1] in [
         'dom', 'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    assert schedule[2].dest_activity_type in [
+    assert dest_types[2] in [
         'dom', 'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    assert schedule[3].dest_activity_type in [
+    assert dest_types[3] in [
         'praca', 'culture_and_entertainment',
         'gastronomy', 'grocery_shopping'
     ]
-    assert schedule[4].dest_activity_type == 'dom'
+    assert dest_types[4] == 'dom'
     assert schedule[0].travel_start_time < schedule[1].travel_start_time
     assert schedule[1].travel_start_time < schedule[2].travel_start_time
     assert schedule[2].travel_start_time < schedule[3].travel_start_time
@@ -395,16 +621,22 @@ def test_day_schedule_sampler_5(
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        any_travel_dist=any_travel_dist,
-        travel_chains_dist=travel_chains_dist,
-        start_hour_dist=start_hour_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob_2
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob_2,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
+    dest_types = [
+        vocabularies.place_type.categories[element.dest_activity_type]
+        for element in schedule
+    ]
 
     assert len(schedule) == 0
 
@@ -438,51 +670,67 @@ def test_day_schedule_sampler_6(
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        any_travel_dist=any_travel_dist,
-        travel_chains_dist=travel_chains_dist,
-        start_hour_dist=start_hour_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob_3
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob_3,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
+    dest_types = [
+        vocabularies.place_type.categories[element.dest_activity_type]
+        for element in schedule
+    ]
 
     assert len(schedule) <= 5
-    for schedule_element in schedule:
-        assert schedule_element.dest_activity_type in [
+    for dest_type in dest_types:
+        assert dest_type in [
             'dom', 'gastronomy', 'grocery_shopping'
         ]
 
 
 def test_day_schedule_sampler_7(
-    travels_num_dist: Dict[str, Dict[str, float]],
     start_hour_dist: Dict[str, Dict[str, float]],
-    dest_type_dist: Dict[str, Dict[str, Dict[str, float]]],
     other_travels_dist: Dict[str, Dict[str, float]],
     spend_time_dist_params: Dict[str, Dict[str, Dict[str, int]]],
     trip_cancel_prob: Dict[str, float]
 ):
-    travels_num_dist = {
+    any_travel_dist = {
+        "16-19_K": {
+            "0": 0.0,
+            "1": 1.0
+        },
+        "45-65_M": {
+            "0": 0.0,
+            "1": 1.0
+        }
+    }
+    travel_chains_dist = {
         "16-19_K": {
-            "5": 1
+            "inne,dom,inne,praca,dom": 1.0
         },
         "45-65_M": {
-            "5": 1
+            "inne,dom,inne,praca,dom": 1.0
         }
     }
 
-    day_schedule_sampler = DayScheduleSampler(
-        travels_num_dist=travels_num_dist,
-        start_hour_dist=start_hour_dist,
-        dest_type_dist=dest_type_dist,
-        other_travels_dist=other_travels_dist,
-        spend_time_dist_params=spend_time_dist_params,
-        trip_cancel_prob=trip_cancel_prob
+    vocabularies = Vocabularies()
+    day_schedule_sampler = get_day_schedule_sampler(
+        any_travel_dist,
+        travel_chains_dist,
+        start_hour_dist,
+        other_travels_dist,
+        spend_time_dist_params,
+        trip_cancel_prob,
+        vocabularies
     )
 
-    schedule = day_schedule_sampler("16-19_K")
+    schedule = day_schedule_sampler(vocabularies.age_sex["16-19_K"])
 
     assert len(schedule) == 5
     for i in range(len(schedule)-1):
@@ -495,41 +743,45 @@ def test_day_schedule_sampler_7(
 def test_gravity_sampler(
     gravity_dist: Dict[str, Dict[str, Dict[str, float]]]
 ):
+    vocabularies = Vocabularies()
     gravity_sampler = GravitySampler(
-        gravity_dist=gravity_dist
+        gravity_dist=[
+            ((dest_type, start_region), to_tuple(dist))
+            for dest_type, start_regions in gravity_dist.items()
+            for start_region, dist in start_regions.items()
+        ],
+        vocabularies=vocabularies
     )
 
     dest_region_1 = gravity_sampler(
-        start_region="1",
-        dest_type="praca"
+        start_region=vocabularies.region.add("1"),
+        dest_type=vocabularies.place_type.add("praca")
     )
     dest_region_2 = gravity_sampler(
-        start_region="2",
-        dest_type="culture_and_entertainment"
+        start_region=vocabularies.region.add("2"),
+        dest_type=vocabularies.place_type.add("culture_and_entertainment")
     )
 
-    assert type(dest_region_1) == str
-    assert dest_region_1 in ["1", "2", "3"]
-    assert type(dest_region_2) == str
-    assert dest_region_2 == "1"
+    assert vocabularies.region.categories[dest_region_1] in ["1", "2", "3"]
+    assert vocabularies.region.categories[dest_region_2] == "1"
 
 
 def test_driver_sampler(
     drivers_dist: Dict[str, Dict[str, float]]
 ):
+    vocabularies = Vocabularies()
     driver_sampler = DriverSampler(
-        drivers_dist=drivers_dist
+        drivers_dist=to_tuples(drivers_dist),
+        age_sex_vocabulary=vocabularies.age_sex
     )
 
     driver_1 = driver_sampler(
-        age_sex='16-19_K'
+        age_sex=vocabularies.age_sex["16-19_K"]
     )
 
     driver_2 = driver_sampler(
-        age_sex='45-65_M'
+        age_sex=vocabularies.age_sex["45-65_M"]
     )
 
-    assert type(driver_1) == str
     assert driver_1 in ["0", "1"]
-    assert type(driver_2) == str
     assert driver_2 == "0"
@@ -0,0 +1,82 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from ..scenarios import apply_scenario, change_dist, change_probs
+
+
+def change_dict_dist(dist, value):
+    # previous change_dist of experiments/run_simulations.py, changing
+    # distribution json in place
+    if value != 0:
+        if value < 0:
+            value = abs(value)
+            reverse = False
+        else:
+            reverse = True
+
+        for dist_key in dist.keys():
+            d = dist[dist_key]
+            prev_key = None
+            for k in sorted(d.keys(), reverse=reverse):
+                if prev_key:
+                    change_value = value * d[k]
+                    d[prev_key] = d[prev_key] + change_value
+                    d[k] = d[k] - change_value
+                prev_key = k
+
+    return dist
+
+
+@pytest.mark.parametrize('value', [0., 0.1, -0.1, 0.35, -1.])
+def test_change_probs(value):
+    rng = np.random.default_rng(7)
+    dist = {
+        key: dict(zip(
+            ids, rng.dirichlet(np.ones(len(ids))).tolist()
+        ))
+        for key, ids in [
+            ('a', ['1', '0', '2', '10']),
+            ('b', ['nie', 'tak']),
+            ('c', ['x'])
+        ]
+    }
+
+    expected = change_dict_dist(deepcopy(dist), value)
+
+    for key, d in dist.items():
+        object_ids = np.array(list(d.keys()))
+        probs = change_probs(object_ids, np.array(list(d.values())), value)
+
+        assert np.array_equal(probs, list(expected[key].values()))
+        assert np.isclose(probs.sum(), 1.)
+
+
+def test_apply_scenario():
+    household_cars_dist = [
+        ('M_18-24', (np.array(['0', '1', '2']), np.array([0.5, 0.3, 0.2]))),
+        ('K_18-24', (np.array(['0', '1', '2']), np.array([0.6, 0.3, 0.1])))
+    ]
+    params = {
+        'household_cars_dist': household_cars_dist,
+        'drivers_dist': [('M_18-24', (np.array(['0', '1']), np.ones(2) / 2))]
+    }
+
+    scenario_params = apply_scenario(
+        params, [['decision_tree/household_cars_dist-down', 0.1]]
+    )
+
+    # base params are not changed and unchanged distributions are shared
+    assert params['household_cars_dist'] is household_cars_dist
+    assert household_cars_dist[0][1][1][0] == 0.5
+    assert scenario_params['drivers_dist'] is params['drivers_dist']
+    assert np.allclose(
+        scenario_params['household_cars_dist'][0][1][1], [0.53, 0.29, 0.18]
+    )
+
+    assert change_dist(household_cars_dist, 0)[1][1][1].tolist() \
+        == [0.6, 0.3, 0.1]
+
+    with pytest.raises(Exception):
+        apply_scenario(params, [['decision_tree/household_cars_dist', 0.1]])
@@ -0,0 +1,80 @@
+import numpy as np
+
+from ..stage_cache import StageCache, get_inputs_hash, get_stage_keys
+
+
+def get_stages_inputs(household_cars_probs, any_travel_probs):
+    return {
+        'population': ([('1', (np.array(['0', '1']), np.array([.5, .5])))],),
+        'mode_inputs': (
+            [('25-44_K', (np.array(['0', '1']), household_cars_probs))],
+        ),
+        'schedules': ({'25-44_K': any_travel_probs},),
+        'trips': (4 * 60, 60, 23 * 60)
+    }
+
+
+def test_get_stage_keys():
+    stage_keys = get_stage_keys(
+        (1, 0, 100), get_stages_inputs(np.array([.4, .6]), [.1, .9])
+    )
+
+    # arrays are hashed by content
+    assert stage_keys == get_stage_keys(
+        (1, 0, 100), get_stages_inputs(np.array([.4, .6]).copy(), [.1, .9])
+    )
+    assert get_inputs_hash(np.array([1, 2])) \
+        != get_inputs_hash(np.array([1, 2], dtype=np.int32))
+
+    # only keys of changed stage and stages which depend on it change
+    mode_keys = get_stage_keys(
+        (1, 0, 100), get_stages_inputs(np.array([.5, .5]), [.1, .9])
+    )
+    assert [
+        stage for stage in stage_keys if stage_keys[stage] != mode_keys[stage]
+    ] == ['mode_inputs']
+
+    schedules_keys = get_stage_keys(
+        (1, 0, 100), get_stages_inputs(np.array([.4, .6]), [.2, .8])
+    )
+    assert [
+        stage for stage in stage_keys
+        if stage_keys[stage] != schedules_keys[stage]
+    ] == ['schedules', 'trips']
+
+    # all stages depend on seed
+    seed_keys = get_stage_keys(
+        (2, 0, 100), get_stages_inputs(np.array([.4, .6]), [.1, .9])
+    )
+    assert all(stage_keys[stage] != seed_keys[stage] for stage in stage_keys)
+
+
+def test_stage_cache(tmp_path):
+    stage_cache = StageCache(str(tmp_path / 'cache'))
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return {'offsets': np.array([0, 2]), 'time': np.array([420., 960.])}
+
+    artifact = stage_cache.get('schedules', 'abc', compute)
+    same_artifact = stage_cache.get('schedules', 'abc', compute)
+
+    assert len(computed) == 1
+    assert np.array_equal(same_artifact['offsets'], artifact['offsets'])
+    assert np.array_equal(same_artifact['time'], artifact['time'])
+    assert stage_cache.load('schedules', 'abd') is None
+    assert (tmp_path / 'cache' / 'schedules' / 'abc.npz').exists()
+    assert [path.name for path in (tmp_path / 'cache' / 'schedules').iterdir()] \
+        == ['abc.npz']
+
+    # unreadable artifact is a cache miss and is computed again
+    (tmp_path / 'cache' / 'schedules' / 'abc.npz').write_bytes(b'PK\x03')
+
+    assert stage_cache.load('schedules', 'abc') is None
+
+    artifact = stage_cache.get('schedules', 'abc', compute)
+
+    assert len(computed) == 2
+    assert np.array_equal(artifact['time'], [420., 960.])
+    assert stage_cache.load('schedules', 'abc') is not None
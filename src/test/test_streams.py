@@ -0,0 +1,64 @@
+import numpy as np
+
+from ..streams import (DEST_REGION_STREAM, DRIVER_STREAM, AgentRandomStreams,
+                       philox4x32)
+
+
+def test_philox4x32():
+    # known answer tests of Random123 library
+    counters = np.array([
+        [0, 0, 0, 0],
+        [0xffffffff, 0xffffffff, 0xffffffff, 0xffffffff],
+        [0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344]
+    ], dtype=np.uint32)
+    keys = [
+        [0, 0],
+        [0xffffffff, 0xffffffff],
+        [0xa4093822, 0x299f31d0]
+    ]
+    expected = [
+        [0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8],
+        [0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd],
+        [0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1]
+    ]
+
+    for counter, key, block in zip(counters, keys, expected):
+        assert philox4x32(counter[None, :], np.array(key))[0].tolist() == block
+
+
+def test_agent_random_streams():
+    streams = AgentRandomStreams(np.random.SeedSequence(1))
+    agent_ids = np.arange(100000)
+
+    uniforms = streams.uniforms(agent_ids, DEST_REGION_STREAM, 3)
+
+    assert np.all((0 <= uniforms) & (uniforms < 1))
+    assert abs(uniforms.mean() - 0.5) < 0.01
+    # numbers depend only on (agent, stream, index)
+    assert np.array_equal(
+        streams.uniforms(agent_ids[::-7], DEST_REGION_STREAM, 3),
+        uniforms[::-7]
+    )
+    assert np.array_equal(
+        AgentRandomStreams(np.random.SeedSequence(1)).uniforms(
+            agent_ids[:10], DEST_REGION_STREAM, 3
+        ),
+        uniforms[:10]
+    )
+    assert not np.array_equal(
+        streams.uniforms(agent_ids, DEST_REGION_STREAM, 4), uniforms
+    )
+    assert not np.array_equal(
+        streams.uniforms(agent_ids, DRIVER_STREAM, 3), uniforms
+    )
+    assert not np.array_equal(
+        AgentRandomStreams(np.random.SeedSequence(2)).uniforms(
+            agent_ids, DEST_REGION_STREAM, 3
+        ),
+        uniforms
+    )
+
+    normals = streams.normals(agent_ids, DEST_REGION_STREAM, 3)
+
+    assert abs(normals.mean()) < 0.02
+    assert abs(normals.std() - 1) < 0.02
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from ..aggregates import TripAggregates
+from ..summaries import (P2Quantile, StreamingQuantiles, Welford,
+                         find_replicates, get_ci_half_width,
+                         get_results_metrics, load_replicate_metrics,
+                         summarize_replicates)
+from ..vocabulary import Vocabularies
+
+
+def test_welford():
+    values = np.random.default_rng(0).normal(size=(20, 3))
+
+    moments = Welford((3,))
+    other_moments = Welford((3,))
+    for row in values[:12]:
+        moments.add(row)
+    for row in values[12:]:
+        other_moments.add(row)
+    moments.merge(other_moments)
+
+    assert moments.count == 20
+    assert np.allclose(moments.mean, values.mean(axis=0))
+    assert np.allclose(moments.get_std(), values.std(axis=0, ddof=1))
+
+    ci_low, ci_high = moments.get_confidence_interval(0.95)
+    assert (ci_low < moments.mean).all() and (moments.mean < ci_high).all()
+    assert get_ci_half_width(moments, 0.95) == np.max(ci_high - ci_low) / 2
+    assert get_ci_half_width(moments, 0.99) > get_ci_half_width(moments, 0.95)
+    assert get_ci_half_width(Welford((3,))) == np.inf
+
+
+def test_p2_quantile():
+    values = np.random.default_rng(0).uniform(size=(1000, 2))
+
+    median = P2Quantile((2,), 0.5)
+    for row in values[:3]:
+        median.add(row)
+
+    # exact for up to 5 values
+    assert np.allclose(
+        median.get_quantile(), np.median(values[:3], axis=0)
+    )
+
+    for row in values[3:]:
+        median.add(row)
+
+    assert np.allclose(median.get_quantile(), 0.5, atol=0.05)
+
+    quantiles = StreamingQuantiles((2,), (0.1, 0.9), max_exact_values=10)
+    for row in values[:10]:
+        quantiles.add(row)
+
+    # exact up to max_exact_values, then estimated from them
+    assert np.allclose(
+        quantiles.get_quantiles(),
+        np.quantile(values[:10], [0.1, 0.9], axis=0)
+    )
+
+    for row in values[10:]:
+        quantiles.add(row)
+
+    assert np.allclose(quantiles.get_quantiles(), [[0.1], [0.9]], atol=0.05)
+
+
+def test_summarize_replicates(tmp_path):
+    regions = pd.CategoricalDtype(['1', '2', '3'])
+
+    for run_num, num_travels in [(1, 1), (2, 3), (3, 5)]:
+        os.makedirs(tmp_path / 'scenario_a', exist_ok=True)
+        pd.DataFrame({
+            'start_region': pd.Series(['1'] * num_travels, dtype=regions),
+            'dest_region': pd.Series(['3'] * num_travels, dtype=regions),
+            'transport_mode': [run_num % 2] * num_travels,
+            'travel_start_time': [420.] * num_travels
+        }).to_pickle(
+            tmp_path / 'scenario_a' / f'travels_results_{run_num}.pkl'
+        )
+
+    replicates = find_replicates(str(tmp_path))
+
+    assert list(replicates) == ['scenario_a']
+    assert [replicate[3] for replicate in replicates['scenario_a']] == \
+        [1, 2, 3]
+
+    [(scenario, results)] = list(summarize_replicates(replicates))
+
+    assert scenario == 'scenario_a'
+    assert results['trips']['mean'].tolist() == [3.]
+    assert results['trips']['std'].tolist() == [2.]
+    assert results['trips']['q50'].tolist() == [3.]
+    assert results['mode_share'].set_index('transport_mode')['mean'] \
+        .round(6).tolist() == [0.333333, 0.666667, 0., 0.]
+    assert results['od_flows'][['start_region', 'dest_region']] \
+        .values.tolist() == [['1', '3']]
+    assert results['production']['num_replicates'].unique().tolist() == [3]
+    assert results['region_mode_share'].query('start_region == "2"')[
+        'mean'
+    ].tolist() == [0.] * 4
+
+
+def test_get_results_metrics_hours():
+    # simulation ending after midnight has more than a day of start hours
+    aggregates = TripAggregates(Vocabularies(['1', '2']), 26 * 60)
+    aggregates.add([0, 1], [1, 1], [2, 0], [7 * 60, 25 * 60 + 30])
+    travels = pd.DataFrame({
+        'start_region': pd.Categorical(['1', '2']),
+        'dest_region': pd.Categorical(['2', '2']),
+        'transport_mode': [2, 0],
+        'travel_start_time': [7 * 60, 25 * 60 + 30]
+    })
+
+    metrics, labels = get_results_metrics({'aggregates': aggregates})
+    travels_metrics, travels_labels = get_results_metrics(
+        {'travels': travels}, num_hours=aggregates.num_hours
+    )
+
+    assert metrics['mode_share_by_hour'].shape == (27, 4)
+    assert metrics['mode_share_by_hour'][25].tolist() == [1., 0., 0., 0.]
+    assert labels['hour'].tolist() == list(range(27))
+    for name, values in metrics.items():
+        assert np.array_equal(travels_metrics[name], values)
+    assert np.array_equal(travels_labels['hour'], labels['hour'])
+
+
+def test_summarize_legacy_replicates(tmp_path):
+    # legacy travels tables have string region columns and each replicate
+    # has only regions with travels
+    os.makedirs(tmp_path / 'scenario_a')
+    for run_num, dest_region in [(1, '3'), (2, '2')]:
+        pd.DataFrame({
+            'start_region': ['1', '1', '2'],
+            'dest_region': ['2', dest_region, dest_region],
+            'transport_mode': [0, 1, 1],
+            'travel_start_time': [420., 480., 960.]
+        }).to_pickle(
+            tmp_path / 'scenario_a' / f'travels_results_{run_num}.pkl'
+        )
+
+    _, metrics, labels = load_replicate_metrics(
+        ('pickle', str(tmp_path / 'scenario_a'), 'scenario_a', 1, 'travels'),
+        num_hours=25
+    )
+
+    # region which is only a destination has its label
+    assert labels['dest_region'].tolist() == ['1', '2', '3']
+    assert metrics['od_flows'].tolist() == [[0, 1, 1], [0, 0, 1], [0, 0, 0]]
+    assert metrics['production'].tolist() == [2, 1, 0]
+
+    [(_, results)] = list(summarize_replicates(
+        find_replicates(str(tmp_path)), regions=['1', '2', '3']
+    ))
+
+    assert results['production']['start_region'].tolist() == ['1', '2', '3']
+    assert results['production']['mean'].tolist() == [2., 1., 0.]
+    assert results['od_flows'].set_index(['start_region', 'dest_region'])[
+        'mean'
+    ].to_dict() == {
+        ('1', '2'): 1.5, ('1', '3'): 0.5, ('2', '2'): 0.5, ('2', '3'): 0.5
+    }
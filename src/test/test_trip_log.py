@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..trip_log import TRIP_LOG_COLUMNS, TripLog
+from ..vocabulary import Vocabularies
+
+
+def get_trip_log() -> TripLog:
+    vocabularies = Vocabularies(regions=['1', '2', '3'])
+    vocabularies.place_type.add('praca')
+    trip_log = TripLog(vocabularies, capacity=2)
+
+    # travels are logged in order of time
+    rows = trip_log.extend({
+        'agent_id': np.array([1, 0]),
+        'start_region': np.array([0, 2]),
+        'start_place_type': np.array([0, 0]),
+        'dest_region': np.array([1, 1]),
+        'dest_place_type': np.array([1, 1]),
+        'travel_start_time': np.array([420., 450.]),
+        'dest_activity_dur_time': np.array([480., 30.])
+    })
+    trip_log.set_transport_modes(
+        rows, np.array([0, 2]), np.array(['1', None], dtype=object)
+    )
+    row = trip_log.append(
+        agent_id=1,
+        start_region=1,
+        start_place_type=1,
+        dest_region=0,
+        dest_place_type=0,
+        travel_start_time=900.,
+        dest_activity_dur_time=0.
+    )
+    trip_log.set_transport_modes(
+        np.array([row]), np.array([0]), np.array(['0'], dtype=object)
+    )
+
+    return trip_log
+
+
+def test_trip_log():
+    trip_log = get_trip_log()
+
+    assert len(trip_log) == 3
+    # log grows when capacity is exceeded
+    assert len(trip_log.columns['agent_id']) == 4
+    assert {
+        column: values.dtype for column, values in trip_log.columns.items()
+    } == {column: np.dtype(dtype) for column, dtype in TRIP_LOG_COLUMNS.items()}
+
+    results = trip_log.to_dataframe(agent_ids=np.array([10, 11]))
+
+    assert list(results.columns) == list(TRIP_LOG_COLUMNS)
+    # travels are ordered by agent and then by time
+    assert results['agent_id'].tolist() == [10, 11, 11]
+    assert results['start_region'].tolist() == ['3', '1', '2']
+    assert results['dest_place_type'].tolist() == ['praca', 'praca', 'dom']
+    assert isinstance(results['dest_region'].dtype, pd.CategoricalDtype)
+    assert results['travel_start_time'].tolist() == [450., 420., 900.]
+    assert results['transport_mode'].tolist() == [2, 0, 0]
+    assert results['is_driver'].tolist() == [None, '1', '0']
+
+
+def test_trip_log_to_arrow():
+    pytest.importorskip('pyarrow')
+
+    table = get_trip_log().to_arrow()
+
+    assert table.column_names == list(TRIP_LOG_COLUMNS)
+    assert table.column('start_region').to_pylist() == ['3', '1', '2']
+    assert table.column('is_driver').to_pylist() == [None, '1', '0']
+    assert table.column('transport_mode').type.bit_width == 8
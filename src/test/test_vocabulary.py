@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from ..vocabulary import HOME_PLACE_TYPE_CODE, Vocabularies, Vocabulary
+
+
+def test_vocabulary():
+    vocabulary = Vocabulary(['praca', 'dom'])
+
+    codes = vocabulary.encode(['dom', 'szkola', 'praca', 'szkola'])
+
+    assert list(codes) == [1, 2, 0, 2]
+    assert len(vocabulary) == 3
+    assert vocabulary['szkola'] == 2
+    assert 'inne' not in vocabulary
+    assert list(vocabulary.decode(codes)) == ['dom', 'szkola', 'praca', 'szkola']
+
+    categorical = vocabulary.to_categorical(np.array([0, -1, 2]))
+
+    assert isinstance(categorical, pd.Categorical)
+    assert list(categorical.categories) == ['praca', 'dom', 'szkola']
+    assert categorical[0] == 'praca'
+    assert pd.isnull(categorical[1])
+
+
+def test_vocabularies():
+    vocabularies = Vocabularies(regions=['10', '2'])
+
+    assert vocabularies.region.encode(['2', '10']).tolist() == [1, 0]
+    assert vocabularies.place_type['dom'] == HOME_PLACE_TYPE_CODE
+    assert len(vocabularies.age_sex) == 0
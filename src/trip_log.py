@@ -0,0 +1,304 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .vocabulary import Vocabularies
+
+if TYPE_CHECKING:
+    import pyarrow
+
+
+# trip log columns and their storage types (regions and place types are
+# vocabulary codes, is_driver is code of is_driver vocabulary or -1 for
+# travels not by car)
+TRIP_LOG_COLUMNS = {
+    'agent_id': np.int64,
+    'start_region': np.int32,
+    'start_place_type': np.int16,
+    'dest_region': np.int32,
+    'dest_place_type': np.int16,
+    'travel_start_time': np.float64,
+    'dest_activity_dur_time': np.float64,
+    'transport_mode': np.int8,
+    'is_driver': np.int8
+}
+
+# categorical trip log columns and names of their vocabularies
+TRIP_LOG_CATEGORIES = {
+    'start_region': 'region',
+    'start_place_type': 'place_type',
+    'dest_region': 'region',
+    'dest_place_type': 'place_type'
+}
+
+NO_TRANSPORT_MODE = -1
+NO_DRIVER = -1
+
+
+class TripLog:
+    """
+    Columnar log of performed travels owned by a model. Each column is a
+    preallocated typed NumPy array, which grows (doubles) when full, so
+    travels are appended without per-agent Python lists and results are
+    built without exploding list cells.
+    """
+
+    def __init__(
+        self,
+        vocabularies: Vocabularies,
+        capacity: int = 1024
+    ):
+        """
+        Constructs empty TripLog.
+
+        Parameters
+        ----------
+            vocabularies: Vocabularies
+                Vocabularies of model, used to decode categories.
+            capacity: int
+                Initial number of rows (e.g. number of scheduled
+                travels, so log does not need to grow).
+        """
+
+        self.vocabularies = vocabularies
+        self.size = 0
+        self.columns = {
+            column: np.empty(max(capacity, 1), dtype=dtype)
+            for column, dtype in TRIP_LOG_COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reserve(
+        self,
+        num_rows: int
+    ):
+        capacity = len(self.columns['agent_id'])
+        if self.size + num_rows <= capacity:
+            return
+
+        while capacity < self.size + num_rows:
+            capacity *= 2
+
+        for column, values in self.columns.items():
+            new_values = np.empty(capacity, dtype=values.dtype)
+            new_values[:self.size] = values[:self.size]
+            self.columns[column] = new_values
+
+    def append(
+        self,
+        agent_id: int,
+        start_region: int,
+        start_place_type: int,
+        dest_region: int,
+        dest_place_type: int,
+        travel_start_time: float,
+        dest_activity_dur_time: float
+    ) -> int:
+        """
+        Appends single travel (transport mode is set later, see
+        set_transport_modes).
+
+        Returns
+        -------
+            row: int
+                Row of travel in log.
+        """
+
+        self._reserve(1)
+        row = self.size
+        columns = self.columns
+
+        columns['agent_id'][row] = agent_id
+        columns['start_region'][row] = start_region
+        columns['start_place_type'][row] = start_place_type
+        columns['dest_region'][row] = dest_region
+        columns['dest_place_type'][row] = dest_place_type
+        columns['travel_start_time'][row] = travel_start_time
+        columns['dest_activity_dur_time'][row] = dest_activity_dur_time
+        columns['transport_mode'][row] = NO_TRANSPORT_MODE
+        columns['is_driver'][row] = NO_DRIVER
+
+        self.size += 1
+
+        return row
+
+    def extend(
+        self,
+        travels: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """
+        Appends many travels given as columns (missing transport_mode and
+        is_driver columns are set later, see set_transport_modes).
+
+        Returns
+        -------
+            rows: np.ndarray
+                Rows of travels in log.
+        """
+
+        num_rows = len(travels['agent_id'])
+        self._reserve(num_rows)
+        rows = slice(self.size, self.size + num_rows)
+
+        for column, values in self.columns.items():
+            if column in travels:
+                values[rows] = travels[column]
+            elif column == 'transport_mode':
+                values[rows] = NO_TRANSPORT_MODE
+            elif column == 'is_driver':
+                values[rows] = NO_DRIVER
+            else:
+                raise KeyError(column)
+
+        self.size += num_rows
+
+        return np.arange(rows.start, rows.stop)
+
+    def set_transport_modes(
+        self,
+        rows: np.ndarray,
+        transport_modes: np.ndarray,
+        is_driver: np.ndarray
+    ):
+        """
+        Sets transport modes and sampled is_driver values (None for
+        travels not by car) of travels in given rows.
+        """
+
+        self.columns['transport_mode'][rows] = transport_modes
+        self.columns['is_driver'][rows] = self.encode_is_driver(is_driver)
+
+    def encode_is_driver(
+        self,
+        is_driver: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns is_driver codes of sampled is_driver values (NO_DRIVER
+        for None).
+        """
+
+        is_driver = np.asarray(is_driver, dtype=object)
+        codes = np.full(len(is_driver), NO_DRIVER, dtype=np.int8)
+
+        is_set = np.not_equal(is_driver, None)
+        if is_set.any():
+            values, inverse = np.unique(
+                is_driver[is_set].astype(str), return_inverse=True
+            )
+            codes[is_set] = self.vocabularies.is_driver.encode(values)[inverse]
+
+        return codes
+
+    def get_columns(
+        self,
+        agent_ids: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns columns of logged travels ordered by agent (travels of
+        each agent in order of execution).
+
+        Parameters
+        ----------
+            agent_ids: np.ndarray
+                Global ids of agents, if given, agent_id column is mapped
+                from agents' indices to their ids.
+        """
+
+        columns = {
+            column: values[:self.size]
+            for column, values in self.columns.items()
+        }
+        # travels are logged in order of time, so stable sort keeps
+        # travels of each agent in order of execution
+        order = np.argsort(columns['agent_id'], kind='stable')
+        columns = {column: values[order] for column, values in columns.items()}
+
+        if agent_ids is not None:
+            columns['agent_id'] = np.asarray(agent_ids)[columns['agent_id']]
+
+        return columns
+
+    def _decode_is_driver(
+        self,
+        codes: np.ndarray
+    ) -> np.ndarray:
+        categories = np.array(
+            self.vocabularies.is_driver.categories + [None], dtype=object
+        )
+
+        # NO_DRIVER (-1) points to None at the end of categories
+        return categories[codes]
+
+    def to_dataframe(
+        self,
+        agent_ids: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """
+        Returns travels table with one row per logged travel, regions and
+        place types as pandas Categorical columns.
+
+        Parameters
+        ----------
+            agent_ids: np.ndarray
+                Global ids of agents (see get_columns).
+        """
+
+        columns = self.get_columns(agent_ids)
+        results = pd.DataFrame({
+            'agent_id': columns['agent_id'],
+            **{
+                column: getattr(
+                    self.vocabularies, TRIP_LOG_CATEGORIES[column]
+                ).to_categorical(columns[column])
+                for column in TRIP_LOG_CATEGORIES
+            },
+            'travel_start_time': columns['travel_start_time'],
+            'dest_activity_dur_time': columns['dest_activity_dur_time'],
+            'transport_mode': columns['transport_mode'].astype(np.int64),
+            'is_driver': self._decode_is_driver(columns['is_driver'])
+        })
+
+        return results[list(TRIP_LOG_COLUMNS)]
+
+    def to_arrow(
+        self,
+        agent_ids: Optional[np.ndarray] = None
+    ) -> 'pyarrow.Table':
+        """
+        Returns travels table (see to_dataframe) as pyarrow Table with
+        dictionary encoded regions, place types and is_driver columns and
+        compact integer columns (needs pyarrow).
+        """
+
+        import pyarrow as pa
+
+        columns = self.get_columns(agent_ids)
+        arrays = {'agent_id': pa.array(columns['agent_id'])}
+
+        for column in TRIP_LOG_COLUMNS:
+            if column == 'agent_id':
+                continue
+            if column in TRIP_LOG_CATEGORIES:
+                vocabulary = getattr(
+                    self.vocabularies, TRIP_LOG_CATEGORIES[column]
+                )
+                arrays[column] = pa.DictionaryArray.from_arrays(
+                    pa.array(columns[column]),
+                    pa.array(vocabulary.categories, type=pa.string())
+                )
+            elif column == 'is_driver':
+                codes = columns[column]
+                arrays[column] = pa.DictionaryArray.from_arrays(
+                    pa.array(codes, mask=codes == NO_DRIVER),
+                    pa.array(
+                        self.vocabularies.is_driver.categories,
+                        type=pa.string()
+                    )
+                )
+            else:
+                arrays[column] = pa.array(columns[column])
+
+        return pa.table(arrays)
@@ -0,0 +1,136 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+
+HOME_PLACE_TYPE = 'dom'
+HOME_PLACE_TYPE_CODE = 0
+
+
+class Vocabulary:
+    """
+    Interns category strings (e.g. region ids or place types) to small
+    consecutive integer codes. Categories get codes in order of first
+    appearance, so codes of already interned categories never change.
+    """
+
+    def __init__(
+        self,
+        categories: Iterable[str] = ()
+    ):
+        """
+        Constructs Vocabulary with given initial categories.
+
+        Parameters
+        ----------
+            categories: Iterable[str]
+                Categories interned in the given order.
+        """
+
+        self.categories: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+        for category in categories:
+            self.add(category)
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def __contains__(
+        self,
+        category: str
+    ) -> bool:
+        return category in self.codes
+
+    def __getitem__(
+        self,
+        category: str
+    ) -> int:
+        """
+        Returns code of interned category.
+        """
+
+        return self.codes[category]
+
+    def add(
+        self,
+        category: str
+    ) -> int:
+        """
+        Interns category (if it is new) and returns its code.
+        """
+
+        code = self.codes.get(category)
+
+        if code is None:
+            code = len(self.categories)
+            self.codes[category] = code
+            self.categories.append(category)
+
+        return code
+
+    def encode(
+        self,
+        categories: Iterable[str]
+    ) -> np.ndarray:
+        """
+        Interns categories and returns array of their codes.
+        """
+
+        return np.fromiter(
+            (self.add(category) for category in categories),
+            dtype=np.int64
+        )
+
+    def decode(
+        self,
+        codes: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns array of categories with given codes.
+        """
+
+        return np.array(self.categories, dtype=object)[np.asarray(codes)]
+
+    def to_categorical(
+        self,
+        codes: np.ndarray
+    ) -> pd.Categorical:
+        """
+        Returns pandas Categorical with given codes (-1 means missing
+        value), decoded without building strings array.
+        """
+
+        return pd.Categorical.from_codes(
+            np.asarray(codes, dtype=np.int64),
+            categories=self.categories
+        )
+
+
+class Vocabularies:
+    """
+    Vocabularies of all categories used by a model: regions, age and sex
+    combinations, place types, travel chains and is_driver values. Home
+    place type always has code 0.
+    """
+
+    def __init__(
+        self,
+        regions: Iterable[str] = ()
+    ):
+        """
+        Constructs Vocabularies.
+
+        Parameters
+        ----------
+            regions: Iterable[str]
+                Initial regions, e.g. DistanceMatrix.regions, so that
+                region codes are equal to distance matrix indices.
+        """
+
+        self.region = Vocabulary(regions)
+        self.age_sex = Vocabulary()
+        self.place_type = Vocabulary([HOME_PLACE_TYPE])
+        self.travel_chain = Vocabulary()
+        self.is_driver = Vocabulary()